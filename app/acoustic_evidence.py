@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Acoustic evidence from the recognizer's word details
+
+With return_detailed=True, speech_to_text returns every recognized word
+with Vosk's confidence ("conf", 0..1) and its start / end time in seconds.
+The assessment only compares text, so this module lines those details up
+with the assessment's cleaned spoken words and derives two kinds of
+evidence from the same decode:
+
+- confidence: how sure the recognizer was about the word it heard. Errors
+  on confidently recognized words are stronger evidence than errors on
+  words the recognizer itself was unsure about, and a low-confidence word
+  that still matched the text is worth a second look.
+- timing: a word spoken much faster than its phones allow is "rushed"; a
+  long pause before a word, or a word drawn out far beyond normal speech,
+  is "hesitant".
+
+Usage:
+    details = transcribe_pcm(frames, 16000, return_detailed=True)
+    evidence = align_recognized_words(spoken_words, details["words"])
+    flags = timing_flags(evidence[2], phone_count=4)
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence
+
+from target_grammar import UNKNOWN_WORD
+
+LOW_CONFIDENCE = 0.6                # Below this a matched word is flagged "low_confidence"
+RUSHED_SECONDS_PER_PHONE = 0.045    # Normal speech is around 0.08 s per phone
+DRAWN_OUT_SECONDS_PER_PHONE = 0.3
+HESITATION_GAP = 0.6                # Pause (seconds) before a word that counts as hesitation
+
+
+@dataclass
+class RecognizedWord:
+    """Recognizer details of one spoken word"""
+    word: str
+    confidence: float
+    start: float
+    end: float
+    gap_before: float   # Silence since the previous recognized word (0 for the first)
+
+    @property
+    def duration(self) -> float:
+        return max(0.0, self.end - self.start)
+
+
+def _clean_word(word: str) -> str:
+    """Clean a recognized word the way the assessment cleans spoken text"""
+    return re.sub(r'[^\w\s]', '', word.lower()).strip()
+
+
+def align_recognized_words(
+    spoken_words: Sequence[str],
+    details: Sequence[Dict[str, Any]]
+) -> List[Optional[RecognizedWord]]:
+    """
+    Recognizer details for each cleaned spoken word.
+
+    Args:
+        spoken_words: Words of the cleaned transcript, as the assessment splits them
+        details: The "words" list of a detailed transcription result
+
+    Returns:
+        list: One RecognizedWord per spoken word, or all None if the details
+            do not correspond to the transcript
+    """
+    aligned: List[Optional[RecognizedWord]] = []
+    previous_end: Optional[float] = None
+    for entry in details:
+        start = float(entry.get("start", 0.0))
+        end = float(entry.get("end", start))
+        gap = max(0.0, start - previous_end) if previous_end is not None else 0.0
+        previous_end = end
+        # [unk] is real sound (it closes a gap) but not a word of the transcript
+        word = entry.get("word", "")
+        if word == UNKNOWN_WORD:
+            continue
+        cleaned = _clean_word(word)
+        if not cleaned:
+            continue
+        aligned.append(RecognizedWord(cleaned, float(entry.get("conf", 1.0)), start, end, gap))
+
+    if [word.word for word in aligned] != list(spoken_words):
+        return [None] * len(spoken_words)
+    return aligned
+
+
+def timing_flags(recognized: RecognizedWord, phone_count: int, first: bool = False) -> List[str]:
+    """
+    Timing problems of one word.
+
+    Args:
+        recognized: The recognized word
+        phone_count: Number of phones of the expected word
+        first: True for the first word (no hesitation check before it)
+
+    Returns:
+        list: Any of "rushed" and "hesitant"
+    """
+    flags = []
+    per_phone = recognized.duration / max(1, phone_count)
+    if per_phone < RUSHED_SECONDS_PER_PHONE:
+        flags.append("rushed")
+    if (not first and recognized.gap_before >= HESITATION_GAP) or per_phone > DRAWN_OUT_SECONDS_PER_PHONE:
+        flags.append("hesitant")
+    return flags
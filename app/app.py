@@ -10,15 +10,19 @@ import webbrowser
 from PIL import Image
 import time
 import pyaudio
-import wave
 import subprocess
 import sys
 
 from non_random_word import generate_word
 from non_random_sentence import generate_sentence
-from speech_to_text import transcribe_audio
-from pronunciation_assessment import assess_pronunciation
+from speech_to_text import transcribe_pcm, preload_model, StreamingTranscriber
+from voice_activity import VoiceActivityDetector, speech_chunk_range
+from resampling import PolyphaseResampler, TARGET_SAMPLE_RATE
+from pronunciation_assessment import assess
 from user_statistics import analyze_pronunciation_data
+import ipa_cache
+import tracing
+from tracing import span
 
 class SpeakAndSpeakApp:
     def __init__(self):
@@ -32,13 +36,24 @@ class SpeakAndSpeakApp:
         
         self.load_config()
         
+        tracing_config = self.config["tracing"]
+        tracing.configure(
+            tracing_config.get("file") if tracing_config.get("enabled", True) else None,
+            enabled=tracing_config.get("enabled", True)
+        )
+        ipa_cache.configure(
+            self.config["ipa_cache"].get("size", ipa_cache.DEFAULT_CACHE_SIZE),
+            self.config["ipa_cache"].get("file")
+        )
+        
         # TTS engine sẽ được tạo mới cho mỗi lần phát âm
         self.tts_engine = None
         
         # PyAudio configuration
         self.audio_format = pyaudio.paInt16
         self.channels = 1
-        self.rate = 44100
+        self.rate = TARGET_SAMPLE_RATE  # Rate of the audio handed to Vosk
+        self.fallback_capture_rate = 44100  # Used when the device cannot capture at self.rate
         self.chunk = 1024
         
         self.current_word = ""
@@ -49,6 +64,9 @@ class SpeakAndSpeakApp:
         
         self.create_widgets()
         
+        # Load the Vosk model in the background so the first recording does not wait for it
+        preload_model()
+        
     def load_config(self):
         try:
             with open("app-config.yaml", "r", encoding="utf-8") as f:
@@ -95,6 +113,32 @@ class SpeakAndSpeakApp:
                 "current": "Easy"
             }
             self.save_config()
+        
+        # Ensure speech_recognition exists in config
+        if "speech_recognition" not in self.config:
+            self.config["speech_recognition"] = {
+                "streaming": True,
+                "vad": True,
+                "end_of_speech_hangover_ms": 800,
+                "constrained_decoding": False
+            }
+            self.save_config()
+        
+        # Ensure tracing exists in config
+        if "tracing" not in self.config:
+            self.config["tracing"] = {
+                "enabled": True,
+                "file": "latency-trace.jsonl"
+            }
+            self.save_config()
+        
+        # Ensure ipa_cache exists in config
+        if "ipa_cache" not in self.config:
+            self.config["ipa_cache"] = {
+                "size": 20000,
+                "file": "ipa-cache.json"
+            }
+            self.save_config()
     
     def save_config(self):
         with open("app-config.yaml", "w", encoding="utf-8") as f:
@@ -612,7 +656,7 @@ class SpeakAndSpeakApp:
                     difficulty_map = {"Auto": 0, "Easy": 1, "Medium": 2, "Hard": 3}
                     lv = difficulty_map.get(self.current_difficulty, 1)
                     
-                    sentence = generate_sentence("user-data.yaml", "eng_sentences.tsv", lv)
+                    sentence = generate_sentence("user-data.jsonl", "eng_sentences.tsv", lv)
                     self.root.after(0, lambda: self._update_sentence_generated(sentence))
                 except Exception as e:
                     self.root.after(0, lambda: messagebox.showerror("Error", f"Failed to generate sentence: {str(e)}"))
@@ -722,70 +766,167 @@ class SpeakAndSpeakApp:
     
     def _record_audio_pyaudio(self, duration, callback):
         """Record audio using PyAudio"""
+        audio = None
+        stream = None
+        transcriber = None
         try:
             progress_bar = self.sentence_progress
             status_label = self.sentence_status
             
             self.root.after(0, lambda: status_label.configure(text=f"Recording for {duration} seconds..."))
             
+            recognition_config = self.config["speech_recognition"]
+            target_text = self._recognition_target()
+            
             # Initialize PyAudio
             audio = pyaudio.PyAudio()
             
+            # Capture at 16 kHz if possible, otherwise resample each chunk once as it arrives
+            capture_rate = self._negotiate_capture_rate(audio)
+            resampler = None
+            if capture_rate != self.rate:
+                resampler = PolyphaseResampler(capture_rate, self.rate)
+            
+            # Detect speech to skip leading silence and stop once the user is done
+            vad = None
+            if recognition_config.get("vad", True):
+                vad = VoiceActivityDetector(
+                    capture_rate,
+                    hangover_ms=recognition_config.get("end_of_speech_hangover_ms", 800)
+                )
+            fed = None  # Index of the next frame to hand to the transcriber
+            
             # Open stream
             stream = audio.open(
                 format=self.audio_format,
                 channels=self.channels,
-                rate=self.rate,
+                rate=capture_rate,
                 input=True,
                 frames_per_buffer=self.chunk
             )
             
-            frames = []
-            total_frames = int(self.rate / self.chunk * duration)
+            # Decode while recording so the result is ready right after the last chunk; created
+            # only once the stream is open, so a missing microphone never holds a recognizer
+            if recognition_config.get("streaming", True):
+                transcriber = StreamingTranscriber(
+                    self.rate,
+                    target_text=target_text,
+                    return_detailed=True,
+                    on_partial=lambda text: self.root.after(
+                        0, lambda t=text: status_label.configure(text=f"Heard: {t}")
+                    )
+                )
+            
+            frames = []  # One entry per captured chunk, always at self.rate
+            total_frames = int(capture_rate / self.chunk * duration)
             
             # Record for the specified duration
             for i in range(total_frames):
                 data = stream.read(self.chunk)
+                if vad:
+                    vad.process(data)
+                if resampler:
+                    data = resampler.process(data)
                 frames.append(data)
                 
+                # Only start feeding the decoder once speech begins
+                if transcriber and (vad is None or vad.speech_started):
+                    if fed is None:
+                        fed = speech_chunk_range(vad.span, self.chunk, len(frames))[0] if vad else 0
+                    for chunk in frames[fed:]:
+                        transcriber.feed(chunk)
+                    fed = len(frames)
+                
                 # Update progress bar
                 progress = (i + 1) / total_frames
                 self.root.after(0, lambda p=progress: progress_bar.set(p))
+                
+                if vad and vad.speech_ended:
+                    break
             
             # Stop and close stream
             stream.stop_stream()
             stream.close()
+            stream = None
             audio.terminate()
-            
-            # Save the recorded data as a WAV file
-            with wave.open("audio.wav", 'wb') as wf:
-                wf.setnchannels(self.channels)
-                wf.setsampwidth(audio.get_sample_size(self.audio_format))
-                wf.setframerate(self.rate)
-                wf.writeframes(b''.join(frames))
+            audio = None
+            
+            if resampler:
+                frames.append(resampler.flush())
+                if transcriber and fed is not None:
+                    transcriber.feed(frames[-1])
+                    fed = len(frames)
+            
+            # Keep only the voiced part of the recording for the decoder
+            if vad:
+                first, end = speech_chunk_range(vad.span, self.chunk, len(frames))
+                frames = frames[first:end]
+            
+            transcript = None
+            if transcriber:
+                if fed is None:
+                    # No speech detected: let the decoder judge the whole recording
+                    for chunk in frames:
+                        transcriber.feed(chunk)
+                transcript = transcriber.finish()
             
             self.root.after(0, lambda: status_label.configure(text="Recording completed!"))
             self.root.after(0, lambda: progress_bar.set(0))
             
-            # Process the recorded audio
-            callback()
+            # Hand the recorded frames (and streamed transcript, if any) to the processing step
+            callback(frames, transcript)
             
         except Exception as e:
             error_msg = f"Recording error: {str(e)}"
             print(error_msg)
             self.root.after(0, lambda: status_label.configure(text=error_msg))
         finally:
+            # Release the recognizer and the device even if capture failed part-way
+            if transcriber is not None:
+                transcriber.close()  # No-op after finish()
+            try:
+                if stream is not None:
+                    stream.close()
+                if audio is not None:
+                    audio.terminate()
+            except Exception:
+                pass
             self.is_recording = False
     
-    def process_sentence_recording(self):
+    def _recognition_target(self):
+        """Sentence to constrain decoding to, or None for open decoding"""
+        if self.config["speech_recognition"].get("constrained_decoding", False):
+            return self.current_sentence or None
+        return None
+    
+    def _negotiate_capture_rate(self, audio):
+        """Use the recognizer's sample rate if the input device supports it"""
+        try:
+            if audio.is_format_supported(
+                self.rate,
+                input_device=audio.get_default_input_device_info()["index"],
+                input_channels=self.channels,
+                input_format=self.audio_format
+            ):
+                return self.rate
+        except (ValueError, IOError):
+            pass
+        return self.fallback_capture_rate
+    
+    def process_sentence_recording(self, frames, transcript=None):
         self.sentence_status.configure(text="Processing...")
         self.start_fake_progress(self.sentence_progress, interval=2.0)
-        threading.Thread(target=self._process_sentence_audio, daemon=True).start()
+        threading.Thread(target=self._process_sentence_audio, args=(frames, transcript), daemon=True).start()
     
-    def _process_sentence_audio(self):
+    def _process_sentence_audio(self, frames, transcript=None):
         try:
-            transcribed_text = transcribe_audio("audio.wav")
-            result = assess_pronunciation(self.current_sentence, transcribed_text)
+            with span("sentence.process", streamed=transcript is not None):
+                # Detailed result: word confidences and timings feed the assessment (no second decode)
+                if transcript is None:
+                    transcript = transcribe_pcm(
+                        frames, self.rate, return_detailed=True, target_text=self._recognition_target()
+                    )
+                result = assess(self.current_sentence, transcript)
             
             self.root.after(0, lambda: self._update_sentence_result(result))
             self.root.after(0, lambda: self.complete_progress(self.sentence_progress))
@@ -798,7 +939,7 @@ class SpeakAndSpeakApp:
     
     def _update_sentence_result(self, result):
         self.sentence_result_text.delete("1.0", "end")
-        self.sentence_result_text.insert("1.0", result)
+        self.sentence_result_text.insert("1.0", result.render())
     
     def load_statistics(self):
         self.stats_status.configure(text="Processing...")
@@ -806,7 +947,11 @@ class SpeakAndSpeakApp:
     
     def _load_stats(self):
         try:
-            result = analyze_pronunciation_data("user-data.yaml")
+            result = analyze_pronunciation_data("user-data.jsonl")
+            
+            trace_file = self.config["tracing"].get("file")
+            spans = tracing.load_trace(trace_file, limit=tracing.MAX_RECENT_SPANS) if trace_file else tracing.recent_spans()
+            result = f"{result}\n\n{tracing.format_summary(spans, title='Latency per stage')}"
             self.root.after(0, lambda: self._update_stats_result(result))
             self.root.after(0, lambda: self.stats_status.configure(text="Statistics loaded!"))
         except Exception as e:
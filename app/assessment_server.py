@@ -0,0 +1,506 @@
+#!/usr/bin/env python3
+"""
+Local pronunciation assessment server
+
+Holds one warm Vosk model for many learners and serves the speech-to-text
+and scoring pipeline over HTTP and WebSocket. Decoding runs in a worker
+thread pool backed by the shared recognizer pool, so the event loop only
+moves bytes around.
+
+Endpoints:
+    GET  /health                       Model, worker and recognizer pool status
+    POST /assess?text=...&rate=16000   Body: raw mono int16 PCM or a WAV file
+    WS   ws://host:ws-port/            Streaming: JSON header, binary PCM, then "end"
+
+WebSocket protocol:
+    -> {"text": "Hello world", "sample_rate": 16000}
+    -> binary PCM chunks (partial results come back as {"partial": "..."})
+    -> "end"
+    <- assessment JSON (same shape as POST /assess)
+
+Usage:
+    Server: python assessment_server.py serve --port 8765 --ws-port 8766 --workers 4
+    Load test: python assessment_server.py loadtest recording.wav --text "Hello world" -n 200 -c 16
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import sys
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+try:
+    import websockets
+except ImportError:
+    websockets = None
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_WS_PORT = 8766
+DEFAULT_WORKERS = 4
+MAX_BODY_BYTES = 16 * 1024 * 1024  # About 8 minutes of 16 kHz audio
+HEADER_TIMEOUT = 10.0
+
+STATUS_TEXT = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    408: "Request Timeout",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+
+
+class HttpError(Exception):
+    """Error that maps directly to an HTTP status code"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def decode_audio_body(body: bytes, default_rate: int) -> Tuple[bytes, int]:
+    """
+    Accept either a WAV file or raw PCM as the request body.
+
+    Returns:
+        tuple: (mono int16 PCM bytes, sample rate)
+    """
+    if body[:4] == b"RIFF":
+        try:
+            with wave.open(io.BytesIO(body), 'rb') as wf:
+                if wf.getnchannels() != 1 or wf.getsampwidth() != 2:
+                    raise HttpError(400, "Audio must be mono 16-bit WAV")
+                return wf.readframes(wf.getnframes()), wf.getframerate()
+        except (wave.Error, EOFError) as e:
+            raise HttpError(400, f"Invalid WAV file format: {e!r}")
+
+    if len(body) % 2:
+        raise HttpError(400, "Raw PCM must be 16-bit (even number of bytes)")
+    return body, default_rate
+
+
+class AssessmentService:
+    """
+    Speech-to-text plus pronunciation scoring shared by all connections.
+
+    Decoding is thread-safe through the recognizer pool. Scoring uses the
+    process-wide assessor, which serializes calls behind its lock (cheap
+    compared to decoding) and returns a structured result per call.
+    """
+
+    def __init__(self, model_path: str, workers: int = DEFAULT_WORKERS):
+        from speech_to_text import get_model, get_recognizer_pool
+        from pronunciation_assessment import get_assessor
+
+        self.model_path = model_path
+        self.workers = workers
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="assess")
+        # Finishing a stream returns its recognizer to the pool and never waits on the
+        # pool, so it gets its own threads: with every assess thread blocked in
+        # pool.acquire(), the finish that would free a recognizer still runs
+        self.finish_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="finish")
+        self._get_model = get_model
+        self._get_recognizer_pool = get_recognizer_pool
+        # No data file: every call passes save_result=False, and the server must not
+        # open or create the learner's user-data.jsonl in its working directory
+        self._assessor = get_assessor("")
+        self.started = time.time()
+        self.requests = 0
+        self.failures = 0
+
+    def warm(self, sample_rate: int = 16000) -> None:
+        """Load the model and build the recognizers before accepting requests"""
+        self._get_model(self.model_path)
+        self._get_recognizer_pool(self.model_path, sample_rate, size=self.workers).warm()
+
+    def _pool(self, sample_rate: int):
+        """Recognizer pool sized to the worker count"""
+        return self._get_recognizer_pool(self.model_path, sample_rate, size=self.workers)
+
+    def score(self, text: str, transcript: Dict[str, Any]) -> Dict[str, Any]:
+        """Assess a detailed transcript (word confidences and timings included) against the expected text"""
+        spoken = transcript.get("text", "")
+        result = self._assessor.assess(text, transcript, save_result=False)
+        structured = result.to_dict()
+        return {
+            "text": text,
+            "transcript": spoken,
+            "confidence": transcript.get("confidence"),
+            "correct": structured["correct"],
+            "score": structured["score"],
+            "errors": [word["error"] for word in structured["words"] if word["error"]],
+            "words": structured["words"],
+            "timings": structured["timings"],
+            "report": result.render(),
+        }
+
+    def assess_pcm(self, pcm: bytes, sample_rate: int, text: str) -> Dict[str, Any]:
+        """Decode a complete recording and score it (runs in a worker thread)"""
+        from speech_to_text import transcribe_pcm
+
+        self._pool(sample_rate)
+        start = time.perf_counter()
+        transcript = transcribe_pcm(pcm, sample_rate, self.model_path, return_detailed=True)
+        decode_time = time.perf_counter() - start
+        if transcript is None:
+            raise HttpError(500, "Transcription failed")
+
+        result = self.score(text, transcript)
+        result["audio_seconds"] = round(len(pcm) / 2 / sample_rate, 3)
+        result["decode_time"] = round(decode_time, 4)
+        return result
+
+    def health(self) -> Dict[str, Any]:
+        """Server status for GET /health"""
+        from speech_to_text import recognizer_pool_stats
+
+        return {
+            "status": "ok",
+            "model": self.model_path,
+            "workers": self.workers,
+            "uptime_seconds": round(time.time() - self.started, 1),
+            "requests": self.requests,
+            "failures": self.failures,
+            "recognizer_pools": recognizer_pool_stats(),
+        }
+
+
+# ---------------------------------------------------------------------------
+# HTTP
+# ---------------------------------------------------------------------------
+
+async def _read_request(reader: asyncio.StreamReader) -> Tuple[str, str, Dict[str, str], bytes]:
+    """Parse one HTTP/1.1 request: (method, target, headers, body)"""
+    try:
+        head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), HEADER_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise HttpError(408, "Timed out reading request headers")
+    except asyncio.LimitOverrunError:
+        raise HttpError(413, "Request headers too large")
+
+    lines = head.decode("latin-1").split("\r\n")
+    try:
+        method, target, _version = lines[0].split(" ", 2)
+    except ValueError:
+        raise HttpError(400, "Malformed request line")
+
+    headers = {}
+    for line in lines[1:]:
+        if ":" in line:
+            name, value = line.split(":", 1)
+            headers[name.strip().lower()] = value.strip()
+
+    try:
+        length = int(headers.get("content-length", "0"))
+    except ValueError:
+        raise HttpError(400, "Invalid Content-Length")
+    if length > MAX_BODY_BYTES:
+        raise HttpError(413, f"Body larger than {MAX_BODY_BYTES} bytes")
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), target, headers, body
+
+
+def _write_json(writer: asyncio.StreamWriter, status: int, payload: Dict[str, Any]) -> None:
+    """Write a JSON response and mark the connection for closing"""
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    head = (
+        f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+        "Content-Type: application/json; charset=utf-8\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        "Connection: close\r\n\r\n"
+    )
+    writer.write(head.encode("latin-1") + body)
+
+
+async def handle_http(service: AssessmentService, reader, writer) -> None:
+    """Serve a single HTTP request per connection"""
+    loop = asyncio.get_running_loop()
+    try:
+        try:
+            method, target, _headers, body = await _read_request(reader)
+            url = urlsplit(target)
+            query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+
+            if url.path == "/health":
+                if method != "GET":
+                    raise HttpError(405, "Use GET")
+                _write_json(writer, 200, service.health())
+
+            elif url.path == "/assess":
+                if method != "POST":
+                    raise HttpError(405, "Use POST")
+                text = query.get("text", "").strip()
+                if not text:
+                    raise HttpError(400, "Missing 'text' query parameter")
+                try:
+                    rate = int(query.get("rate", "16000"))
+                except ValueError:
+                    raise HttpError(400, "Invalid 'rate' query parameter")
+
+                pcm, rate = decode_audio_body(body, rate)
+                service.requests += 1
+                result = await loop.run_in_executor(service.executor, service.assess_pcm, pcm, rate, text)
+                _write_json(writer, 200, result)
+
+            else:
+                raise HttpError(404, f"Unknown path: {url.path}")
+
+        except HttpError as e:
+            if e.status >= 500:
+                service.failures += 1
+            _write_json(writer, e.status, {"error": str(e)})
+        except asyncio.IncompleteReadError:
+            return  # Client went away mid-request
+        except Exception as e:
+            service.failures += 1
+            _write_json(writer, 500, {"error": str(e) or repr(e)})
+
+        await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+# ---------------------------------------------------------------------------
+# WebSocket
+# ---------------------------------------------------------------------------
+
+async def handle_websocket(service: AssessmentService, websocket) -> None:
+    """Stream audio over a WebSocket and return the assessment when it ends"""
+    from speech_to_text import StreamingTranscriber
+
+    loop = asyncio.get_running_loop()
+    transcriber: Optional[StreamingTranscriber] = None
+    try:
+        try:
+            header = json.loads(await websocket.recv())
+            text = str(header.get("text", "")).strip()
+            rate = int(header.get("sample_rate", 16000))
+        except (ValueError, TypeError, AttributeError):
+            await websocket.send(json.dumps({"error": "First message must be a JSON header"}))
+            return
+        if not text:
+            await websocket.send(json.dumps({"error": "Header is missing 'text'"}))
+            return
+
+        def on_partial(partial: str) -> None:
+            # Called from the decoder thread
+            asyncio.run_coroutine_threadsafe(websocket.send(json.dumps({"partial": partial})), loop)
+
+        service.requests += 1
+        service._pool(rate)
+        # Checking out a recognizer may wait for a free one, so do it off the loop
+        transcriber = await loop.run_in_executor(
+            service.executor,
+            lambda: StreamingTranscriber(rate, service.model_path, on_partial=on_partial, return_detailed=True)
+        )
+
+        samples = 0
+        start = time.perf_counter()
+        async for message in websocket:
+            if isinstance(message, bytes):
+                if len(message) % 2:
+                    await websocket.send(json.dumps({"error": "PCM chunks must be 16-bit"}))
+                    return
+                samples += len(message) // 2
+                transcriber.feed(message)
+            elif message.strip() == "end":
+                break
+
+        transcript = await loop.run_in_executor(service.finish_executor, transcriber.finish)
+        transcriber = None
+        if transcript is None:
+            service.failures += 1
+            await websocket.send(json.dumps({"error": "Transcription failed"}))
+            return
+
+        result = await loop.run_in_executor(service.executor, service.score, text, transcript)
+        result["audio_seconds"] = round(samples / rate, 3)
+        result["decode_time"] = round(time.perf_counter() - start, 4)
+        await websocket.send(json.dumps(result, ensure_ascii=False))
+    except websockets.ConnectionClosed:
+        pass
+    finally:
+        if transcriber is not None:
+            # Return the recognizer to the pool even if the client disconnected
+            await loop.run_in_executor(service.finish_executor, transcriber.close)
+
+
+# ---------------------------------------------------------------------------
+# Server
+# ---------------------------------------------------------------------------
+
+async def serve(args) -> None:
+    """Run the HTTP and WebSocket servers until interrupted"""
+    service = AssessmentService(args.model, args.workers)
+    loop = asyncio.get_running_loop()
+
+    print(f"Loading model and warming {args.workers} recognizers...")
+    await loop.run_in_executor(service.executor, service.warm)
+
+    http_server = await asyncio.start_server(
+        lambda r, w: handle_http(service, r, w), args.host, args.port
+    )
+    print(f"HTTP:      http://{args.host}:{args.port}/assess?text=...")
+
+    ws_server = None
+    if websockets is None:
+        print("WebSocket: disabled (install with: pip install websockets)")
+    else:
+        ws_server = await websockets.serve(
+            lambda ws: handle_websocket(service, ws), args.host, args.ws_port, max_size=MAX_BODY_BYTES
+        )
+        print(f"WebSocket: ws://{args.host}:{args.ws_port}/")
+
+    try:
+        async with http_server:
+            await http_server.serve_forever()
+    finally:
+        if ws_server is not None:
+            ws_server.close()
+            await ws_server.wait_closed()
+        service.executor.shutdown(wait=False)
+        service.finish_executor.shutdown(wait=False)
+
+
+# ---------------------------------------------------------------------------
+# Load test client
+# ---------------------------------------------------------------------------
+
+async def _post_assess(host: str, port: int, text: str, wav_bytes: bytes) -> Dict[str, Any]:
+    """Send one POST /assess and return the decoded JSON response"""
+    from urllib.parse import quote
+
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write(
+            f"POST /assess?text={quote(text)} HTTP/1.1\r\n"
+            f"Host: {host}:{port}\r\n"
+            "Content-Type: audio/wav\r\n"
+            f"Content-Length: {len(wav_bytes)}\r\n"
+            "Connection: close\r\n\r\n".encode("latin-1") + wav_bytes
+        )
+        await writer.drain()
+        response = await reader.read()
+    finally:
+        writer.close()
+
+    head, _, body = response.partition(b"\r\n\r\n")
+    status = int(head.split(b" ", 2)[1])
+    payload = json.loads(body or b"{}")
+    if status != 200:
+        raise HttpError(status, payload.get("error", ""))
+    return payload
+
+
+async def _stream_assess(host: str, port: int, text: str, pcm: bytes, rate: int, chunk_bytes: int) -> Dict[str, Any]:
+    """Stream one recording over a WebSocket and return the final JSON message"""
+    async with websockets.connect(f"ws://{host}:{port}/", max_size=MAX_BODY_BYTES) as ws:
+        await ws.send(json.dumps({"text": text, "sample_rate": rate}))
+        for offset in range(0, len(pcm), chunk_bytes):
+            await ws.send(pcm[offset:offset + chunk_bytes])
+        await ws.send("end")
+        async for message in ws:
+            payload = json.loads(message)
+            if "partial" not in payload:
+                if "error" in payload:
+                    raise HttpError(500, payload["error"])
+                return payload
+    raise HttpError(500, "Connection closed before the result")
+
+
+async def load_test(args) -> None:
+    """Fire concurrent requests at a local server and report latency"""
+    with open(args.audio_file, 'rb') as f:
+        wav_bytes = f.read()
+    with wave.open(io.BytesIO(wav_bytes), 'rb') as wf:
+        rate = wf.getframerate()
+        pcm = wf.readframes(wf.getnframes())
+    audio_seconds = len(pcm) / 2 / rate
+
+    if args.websocket and websockets is None:
+        raise ValueError("WebSocket load test needs the websockets package")
+
+    latencies = []
+    errors = []
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def one_request():
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                if args.websocket:
+                    await _stream_assess(args.host, args.ws_port, args.text, pcm, rate, args.chunk_bytes)
+                else:
+                    await _post_assess(args.host, args.port, args.text, wav_bytes)
+                latencies.append(time.perf_counter() - start)
+            except (HttpError, OSError, ValueError) as e:
+                errors.append(str(e) or repr(e))
+
+    mode = "WebSocket" if args.websocket else "HTTP"
+    print(f"{mode} load test: {args.requests} requests, concurrency {args.concurrency}, "
+          f"{audio_seconds:.2f}s of audio each")
+    wall_start = time.perf_counter()
+    await asyncio.gather(*(one_request() for _ in range(args.requests)))
+    wall = time.perf_counter() - wall_start
+
+    print(f"Completed: {len(latencies)}/{args.requests} in {wall:.2f}s "
+          f"({len(latencies) / wall:.2f} req/s, {len(latencies) * audio_seconds / wall:.1f} audio s/s)")
+    if latencies:
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        print(f"Latency: p50 {p50 * 1000:.0f} ms, p95 {p95 * 1000:.0f} ms, "
+              f"p99 {p99 * 1000:.0f} ms, max {max(latencies) * 1000:.0f} ms")
+    if errors:
+        print(f"Errors: {len(errors)} (first: {errors[0]})")
+
+
+def main():
+    """Main function for standalone usage"""
+    parser = argparse.ArgumentParser(description="SpeakAndSpeak local assessment server")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = subparsers.add_parser("serve", help="Run the HTTP/WebSocket assessment server")
+    serve_parser.add_argument("--host", default=DEFAULT_HOST, help="Address to bind (default: localhost only)")
+    serve_parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="HTTP port")
+    serve_parser.add_argument("--ws-port", type=int, default=DEFAULT_WS_PORT, help="WebSocket port")
+    serve_parser.add_argument("--workers", "-w", type=int, default=DEFAULT_WORKERS,
+                              help="Decoding worker threads (and warm recognizers)")
+    serve_parser.add_argument("--model", "-m", default="vosk-model-en-us-0.22-lgraph",
+                              help="Path to Vosk model directory")
+    serve_parser.set_defaults(func=serve)
+
+    load_parser = subparsers.add_parser("loadtest", help="Send concurrent requests to a running server")
+    load_parser.add_argument("audio_file", help="Mono 16-bit WAV recording to send")
+    load_parser.add_argument("--text", "-t", required=True, help="Expected sentence of the recording")
+    load_parser.add_argument("--host", default=DEFAULT_HOST, help="Server address")
+    load_parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="HTTP port")
+    load_parser.add_argument("--ws-port", type=int, default=DEFAULT_WS_PORT, help="WebSocket port")
+    load_parser.add_argument("--requests", "-n", type=int, default=50, help="Total requests")
+    load_parser.add_argument("--concurrency", "-c", type=int, default=8, help="Requests in flight")
+    load_parser.add_argument("--websocket", action="store_true", help="Stream over WebSocket instead of POST")
+    load_parser.add_argument("--chunk-bytes", type=int, default=8000, help="WebSocket chunk size")
+    load_parser.set_defaults(func=load_test)
+
+    args = parser.parse_args()
+    try:
+        asyncio.run(args.func(args))
+    except (FileNotFoundError, ValueError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    except KeyboardInterrupt:
+        print("\nStopped.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Performance benchmarks for the SpeakAndSpeak pipeline
+
+Usage:
+    python benchmark.py decode recording.wav [--repeat 3]
+    python benchmark.py matcher [--corpus alignment_corpus.yaml] [--repeat 20] [--kernel difflib]
+    python benchmark.py similarity [--words 5 10 20 40]
+"""
+
+import argparse
+import difflib
+import random
+import sys
+import time
+import wave
+
+import numpy as np
+import yaml
+
+
+def _load_wav(path):
+    """Read a mono 16-bit WAV file into an int16 array"""
+    with wave.open(path, 'rb') as wf:
+        if wf.getnchannels() != 1 or wf.getsampwidth() != 2:
+            raise ValueError("Audio must be mono 16-bit WAV")
+        sample_rate = wf.getframerate()
+        samples = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+    return samples, sample_rate
+
+
+def _best_of(repeat, func):
+    """Run func `repeat` times and return (best time in seconds, last result)"""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def benchmark_decode(args):
+    """Compare decoding at the capture rate with resampling to 16 kHz first"""
+    from resampling import TARGET_SAMPLE_RATE, resample_pcm
+    from speech_to_text import get_model, transcribe_pcm
+
+    samples, sample_rate = _load_wav(args.audio_file)
+    if sample_rate == TARGET_SAMPLE_RATE:
+        # Simulate a 44.1 kHz microphone so there is something to compare against
+        samples = resample_pcm(samples, TARGET_SAMPLE_RATE, 44100)
+        sample_rate = 44100
+    audio_seconds = len(samples) / sample_rate
+
+    print(f"Audio: {audio_seconds:.2f}s at {sample_rate} Hz")
+    print("Loading model...")
+    get_model(args.model)
+
+    before, text_before = _best_of(
+        args.repeat, lambda: transcribe_pcm(samples, sample_rate, args.model))
+    resample_time, resampled = _best_of(
+        args.repeat, lambda: resample_pcm(samples, sample_rate, TARGET_SAMPLE_RATE))
+    after, text_after = _best_of(
+        args.repeat, lambda: transcribe_pcm(resampled, TARGET_SAMPLE_RATE, args.model))
+
+    print()
+    print(f"{'Pipeline':<32}{'Total (s)':>12}{'s per audio s':>16}")
+    print(f"{'Decode at ' + str(sample_rate) + ' Hz':<32}{before:>12.3f}{before / audio_seconds:>16.4f}")
+    print(f"{'Resample to 16 kHz':<32}{resample_time:>12.3f}{resample_time / audio_seconds:>16.4f}")
+    print(f"{'Decode at 16000 Hz':<32}{after:>12.3f}{after / audio_seconds:>16.4f}")
+    total_after = resample_time + after
+    print(f"{'Resample + decode':<32}{total_after:>12.3f}{total_after / audio_seconds:>16.4f}")
+    print()
+    print(f"Speedup: {before / total_after:.2f}x")
+    print(f"Text at {sample_rate} Hz: {text_before}")
+    print(f"Text at 16000 Hz: {text_after}")
+
+
+def benchmark_matcher(args):
+    """Run the regression corpus through both word matchers and time them"""
+    from pronunciation_assessment import MATCHERS, PronunciationAssessment
+
+    with open(args.corpus, 'r', encoding='utf-8') as f:
+        cases = yaml.safe_load(f) or []
+
+    # Empty data file path: nothing is loaded and nothing is saved
+    assessors = {
+        name: PronunciationAssessment(data_file="", matcher=name, similarity_kernel=args.kernel)
+        for name in MATCHERS
+    }
+    totals = {name: 0.0 for name in MATCHERS}
+    long_totals = {name: 0.0 for name in MATCHERS}
+    passed = {name: 0 for name in MATCHERS}
+    long_cases = 0
+
+    for case in cases:
+        assessor = assessors[MATCHERS[0]]
+        original = assessor._clean_text(case['original']).split()
+        spoken = assessor._clean_text(case['spoken']).split()
+        expected = case.get('expected_errors', [])
+        is_long = len(original) >= args.long_words
+        long_cases += is_long
+
+        errors = {}
+        for name, assessor in assessors.items():
+            # Warm the IPA cache so only the matching itself is timed
+            assessor._identify_word_errors(original, spoken)
+            elapsed, result = _best_of(args.repeat, lambda: assessor._identify_word_errors(original, spoken))
+            errors[name] = [error.word for error in result]
+            totals[name] += elapsed
+            if is_long:
+                long_totals[name] += elapsed
+            passed[name] += errors[name] == expected
+
+        if any(words != expected for words in errors.values()):
+            print(f"- {case.get('note', case['original'][:50])}")
+            print(f"    expected: {expected}")
+            for name in MATCHERS:
+                mark = "ok" if errors[name] == expected else "DIFF"
+                print(f"    {name:<10} {mark:<5} {errors[name]}")
+
+    print()
+    print(f"{'Matcher':<12}{'Passed':>10}{'ms / case':>12}{'ms / long case':>17}")
+    for name in MATCHERS:
+        per_case = totals[name] / max(len(cases), 1) * 1000
+        per_long = long_totals[name] / max(long_cases, 1) * 1000
+        print(f"{name:<12}{passed[name]:>6}/{len(cases):<3}{per_case:>12.3f}{per_long:>17.3f}")
+    print(f"\nLong cases: {long_cases} with at least {args.long_words} words, kernel: {args.kernel}")
+
+
+def benchmark_similarity(args):
+    """Time the full similarity matrix with difflib and with the bit-parallel kernel"""
+    from ipa_cache import convert
+    from ipa_tokenizer import encode
+    from phone_distance import weighted_similarity_matrix
+    from similarity import similarity_matrix
+
+    with open(args.corpus, 'r', encoding='utf-8') as f:
+        cases = yaml.safe_load(f) or []
+    words = sorted({word.strip('.,!?;:"').lower() for case in cases
+                    for word in (case['original'] + " " + case['spoken']).split()} - {""})
+    rng = random.Random(0)
+
+    def difflib_matrix(a_words, b_words):
+        return [[difflib.SequenceMatcher(None, a, b).ratio() for b in b_words] for a in a_words]
+
+    print(f"{'Words':>6}{'Strings':>10}{'difflib (ms)':>15}{'bit-parallel (ms)':>20}{'Speedup':>10}{'Same value':>12}")
+    for count in args.words:
+        for label, convert_word in (("text", str), ("IPA", convert)):
+            a_words = [convert_word(word) for word in rng.choices(words, k=count)]
+            b_words = [convert_word(word) for word in rng.choices(words, k=count)]
+            slow, expected = _best_of(args.repeat, lambda: difflib_matrix(a_words, b_words))
+            fast, actual = _best_of(args.repeat, lambda: similarity_matrix(a_words, b_words))
+            same = np.isclose(np.array(expected), actual).mean()
+            print(f"{count:>6}{label:>10}{slow * 1000:>15.3f}{fast * 1000:>20.3f}"
+                  f"{slow / fast:>9.1f}x{same:>11.1%}")
+            if label == "IPA":
+                # Confusion-weighted phone distance (different values by design)
+                a_codes = [encode(ipa) for ipa in a_words]
+                b_codes = [encode(ipa) for ipa in b_words]
+                weighted, _ = _best_of(args.repeat, lambda: weighted_similarity_matrix(a_codes, b_codes))
+                print(f"{count:>6}{'phones':>10}{slow * 1000:>15.3f}{weighted * 1000:>20.3f}"
+                      f"{slow / weighted:>9.1f}x{'-':>11}")
+    print("\nValues differ only where difflib's greedy matching finds fewer common characters.")
+
+
+def main():
+    """Main function for standalone usage"""
+    parser = argparse.ArgumentParser(description="SpeakAndSpeak performance benchmarks")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    decode_parser = subparsers.add_parser(
+        "decode", help="Decode time per second of audio before/after resampling to 16 kHz")
+    decode_parser.add_argument("audio_file", help="Path to a mono 16-bit WAV recording")
+    decode_parser.add_argument("--model", "-m", default="vosk-model-en-us-0.22-lgraph",
+                               help="Path to Vosk model directory")
+    decode_parser.add_argument("--repeat", "-r", type=int, default=3,
+                               help="Runs per measurement; the best is reported")
+    decode_parser.set_defaults(func=benchmark_decode)
+
+    matcher_parser = subparsers.add_parser(
+        "matcher", help="Compare the alignment and greedy word matchers on the regression corpus")
+    matcher_parser.add_argument("--corpus", default="alignment_corpus.yaml",
+                                help="YAML regression corpus")
+    matcher_parser.add_argument("--repeat", "-r", type=int, default=20,
+                                help="Runs per case; the best is reported")
+    matcher_parser.add_argument("--long-words", type=int, default=15,
+                                help="Sentences with at least this many words count as long")
+    matcher_parser.add_argument("--kernel", choices=["vectorized", "difflib"], default="vectorized",
+                                help="Similarity kernel used by both matchers")
+    matcher_parser.set_defaults(func=benchmark_matcher)
+
+    similarity_parser = subparsers.add_parser(
+        "similarity", help="Micro-benchmark of the similarity matrix: difflib vs bit-parallel NumPy")
+    similarity_parser.add_argument("--corpus", default="alignment_corpus.yaml",
+                                   help="YAML corpus the words are sampled from")
+    similarity_parser.add_argument("--words", type=int, nargs="+", default=[5, 10, 20, 40],
+                                   help="Words per side of the matrix")
+    similarity_parser.add_argument("--repeat", "-r", type=int, default=20,
+                                   help="Runs per measurement; the best is reported")
+    similarity_parser.set_defaults(func=benchmark_similarity)
+
+    args = parser.parse_args()
+    try:
+        args.func(args)
+    except (FileNotFoundError, ValueError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Memoized English → IPA conversion
+
+eng_to_ipa looks every word up in its SQLite dictionary, which has no index
+on the word column, so each lookup scans the whole table. The assessment,
+the sentence scorer and the word generator all convert the same few
+thousand words over and over; this module puts a bounded LRU cache in
+front of eng_to_ipa, shared by all of them, and converts cache misses in a
+single batched query.
+
+The cache can optionally be persisted to a JSON file so it survives
+restarts.
+
+Usage:
+    from ipa_cache import convert, ipa_list, prefetch
+    prefetch(["hello", "world"])   # One query for all missing words
+    convert("hello")               # 'hɛˈloʊ' (same as eng_to_ipa.convert)
+    ipa_list("read")               # [['rid', 'rɛd']] (same as eng_to_ipa.ipa_list)
+
+    configure(maxsize=20000, persist_path="ipa-cache.json")
+    print(cache_stats())
+"""
+
+import atexit
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import eng_to_ipa
+
+DEFAULT_CACHE_SIZE = 20000
+CACHE_FILE_VERSION = 1
+MAX_WORDS_PER_QUERY = 900
+
+
+class IpaCache:
+    """
+    Thread-safe LRU cache of word → IPA variants.
+
+    Values are the variant lists eng_to_ipa.ipa_list() returns for a single
+    word; unknown words map to ["word*"] exactly like eng_to_ipa.
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_CACHE_SIZE, persist_path: Optional[str] = None):
+        """
+        Args:
+            maxsize: Maximum number of words kept
+            persist_path: JSON file the cache is loaded from and saved to (optional)
+        """
+        self.maxsize = max(1, maxsize)
+        self.persist_path = persist_path
+        self._entries: "OrderedDict[str, Tuple[str, ...]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._dirty = False
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.loaded_from_disk = 0
+        if persist_path:
+            self.load()
+
+    def _get(self, word: str) -> Optional[Tuple[str, ...]]:
+        """Look a word up and mark it as recently used (lock must be held)"""
+        variants = self._entries.get(word)
+        if variants is not None:
+            self._entries.move_to_end(word)
+        return variants
+
+    def _put(self, word: str, variants: Tuple[str, ...]) -> None:
+        """Insert a word, evicting the least recently used ones (lock must be held)"""
+        self._entries[word] = variants
+        self._entries.move_to_end(word)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        self._dirty = True
+
+    def lookup(self, words: Iterable[str]) -> List[Tuple[str, ...]]:
+        """
+        IPA variants for each word, converting all cache misses in one query.
+
+        Args:
+            words: Words to convert (case-insensitive)
+
+        Returns:
+            list: One tuple of IPA variants per input word
+        """
+        words = [word.lower() for word in words]
+        results: List[Optional[Tuple[str, ...]]] = []
+        missing = []
+        with self._lock:
+            for word in words:
+                variants = self._get(word)
+                if variants is None:
+                    self.misses += 1
+                    missing.append(word)
+                else:
+                    self.hits += 1
+                results.append(variants)
+
+        if missing:
+            unique = list(dict.fromkeys(missing))
+            converted = {}
+            # Stay below SQLite's limit on query parameters
+            for start in range(0, len(unique), MAX_WORDS_PER_QUERY):
+                batch = unique[start:start + MAX_WORDS_PER_QUERY]
+                converted.update(zip(batch, (tuple(v) for v in eng_to_ipa.ipa_list(batch))))
+            with self._lock:
+                for word, variants in converted.items():
+                    self._put(word, variants)
+            results = [converted[word] if variants is None else variants
+                       for word, variants in zip(words, results)]
+
+        return results
+
+    def clear(self) -> None:
+        """Drop every entry and reset the counters"""
+        with self._lock:
+            self._entries.clear()
+            self._dirty = True
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Size and hit/miss counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "loaded_from_disk": self.loaded_from_disk,
+            }
+
+    def load(self, path: Optional[str] = None) -> None:
+        """
+        Load entries from a cache file, ignoring a missing or unreadable file.
+
+        Args:
+            path: File to read (default: persist_path); reading another file
+                does not make this cache save to it
+        """
+        path = path or self.persist_path
+        if not path or not os.path.exists(path):
+            return
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Warning: Could not read IPA cache {path}: {e}")
+            return
+        if not isinstance(data, dict) or data.get("version") != CACHE_FILE_VERSION:
+            return
+
+        with self._lock:
+            for word, variants in data.get("words", {}).items():
+                if isinstance(variants, list) and variants:
+                    self._put(word, tuple(variants))
+            self.loaded_from_disk = len(self._entries)
+            self._dirty = False
+
+    def save(self) -> None:
+        """Write the cache to persist_path if it changed since the last load/save"""
+        if not self.persist_path:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {
+                "version": CACHE_FILE_VERSION,
+                "words": {word: list(variants) for word, variants in self._entries.items()},
+            }
+            self._dirty = False
+
+        # Write to a temporary file first so a crash never leaves a truncated cache
+        tmp_path = f"{self.persist_path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, self.persist_path)
+        except OSError as e:
+            print(f"Warning: Could not save IPA cache {self.persist_path}: {e}")
+
+
+_cache = IpaCache()
+_cache_lock = threading.Lock()
+
+
+def configure(maxsize: int = DEFAULT_CACHE_SIZE, persist_path: Optional[str] = None) -> IpaCache:
+    """
+    Replace the shared cache, e.g. to enable the on-disk cache.
+
+    The previous cache is saved first if it was persistent. The new one is
+    saved automatically at interpreter exit.
+    """
+    global _cache
+    with _cache_lock:
+        _cache.save()
+        _cache = IpaCache(maxsize, persist_path)
+        return _cache
+
+
+def get_ipa_cache() -> IpaCache:
+    """The shared cache used by convert(), ipa_list() and prefetch()"""
+    return _cache
+
+
+def _split(words_in) -> List[str]:
+    """Accept a whitespace-separated string or a list of words, like eng_to_ipa"""
+    return words_in.split() if isinstance(words_in, str) else list(words_in)
+
+
+def ipa_list(words_in) -> List[List[str]]:
+    """Cached eng_to_ipa.ipa_list(): all IPA variants for each word"""
+    return [list(variants) for variants in _cache.lookup(_split(words_in))]
+
+
+def convert(text) -> str:
+    """Cached eng_to_ipa.convert(): the preferred IPA of each word, space-separated"""
+    return " ".join(variants[-1] for variants in _cache.lookup(_split(text)))
+
+
+def prefetch(words: Iterable[str]) -> None:
+    """Convert all words not cached yet in a single dictionary query"""
+    _cache.lookup(words)
+
+
+def cache_stats() -> Dict[str, Any]:
+    """Hit/miss counters of the shared cache"""
+    return _cache.stats()
+
+
+atexit.register(lambda: _cache.save())
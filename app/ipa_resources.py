@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Shared phonetic resource files
+
+Loads arpabet_ipa_database.csv and ipa_confusion_groups.yaml from the app
+directory once per process.
+
+Usage:
+    from ipa_resources import load_arpabet_ipa_map, load_confusion_groups
+"""
+
+import csv
+import os
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+import yaml
+
+RESOURCE_DIR = os.path.dirname(os.path.abspath(__file__))
+ARPABET_IPA_FILE = os.path.join(RESOURCE_DIR, "arpabet_ipa_database.csv")
+CONFUSION_GROUPS_FILE = os.path.join(RESOURCE_DIR, "ipa_confusion_groups.yaml")
+
+
+@lru_cache(maxsize=None)
+def load_arpabet_ipa_map() -> Dict[str, str]:
+    """Load the ARPAbet -> IPA mapping (e.g. 'TH' -> 'θ')"""
+    mapping = {}
+    try:
+        with open(ARPABET_IPA_FILE, 'r', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                mapping[row['ARPAbet']] = row['IPA']
+    except FileNotFoundError:
+        print(f"Warning: {ARPABET_IPA_FILE} not found")
+    return mapping
+
+
+@lru_cache(maxsize=None)
+def load_confusion_groups() -> Tuple[Tuple[str, ...], ...]:
+    """Load the groups of easily confused IPA sounds"""
+    try:
+        with open(CONFUSION_GROUPS_FILE, 'r', encoding='utf-8') as f:
+            groups = yaml.safe_load(f) or []
+    except FileNotFoundError:
+        print(f"Warning: {CONFUSION_GROUPS_FILE} not found")
+        return ()
+    return tuple(tuple(str(sound) for sound in group) for group in groups)
+
+
+@lru_cache(maxsize=None)
+def confusable_sounds() -> Dict[str, List[str]]:
+    """Map each IPA sound to the other sounds it shares a confusion group with"""
+    neighbours: Dict[str, List[str]] = {}
+    for group in load_confusion_groups():
+        for sound in group:
+            others = neighbours.setdefault(sound, [])
+            for other in group:
+                if other != sound and other not in others:
+                    others.append(other)
+    return neighbours
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Split IPA transcriptions into phoneme segments
+
+Diphthongs and affricates (aɪ, oʊ, tʃ, ...) are written with several code
+points, and length marks and combining diacritics modify the symbol before
+them, so iterating over characters splits real phonemes apart. The
+tokenizer matches the longest known segment at each position using a trie
+built once from arpabet_ipa_database.csv and ipa_confusion_groups.yaml,
+attaches modifiers to the preceding segment and drops stress marks.
+
+Multi-symbol entries of the confusion groups that are just two English
+phonemes in a row (e.g. the German affricate "ts") are left out, so "cats"
+still ends in /t/ /s/.
+
+Segments are interned as small integers, so alignments can run over short
+integer sequences instead of strings.
+
+Usage:
+    from ipa_tokenizer import tokenize, encode, decode, segments
+    tokenize("ˈtʃaɪnə")     # ('tʃ', 'aɪ', 'n', 'ə')
+    encode("ˈtʃaɪnə")       # (4, 7, 12, 3)
+    decode(encode("naʊ"))   # 'naʊ'
+    segments(encode("naʊ")) # ('n', 'aʊ')
+"""
+
+import threading
+import unicodedata
+from functools import lru_cache
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+from ipa_resources import load_arpabet_ipa_map, load_confusion_groups
+
+# Symbols eng_to_ipa writes that are not in the resource files
+EXTRA_SEGMENTS = ("ər", "ʧ", "ʤ")
+
+# Attach to the previous segment (length marks)
+MODIFIERS = frozenset("ːˑ")
+
+# Not part of any segment: stress marks, eng_to_ipa's unknown-word marker, separators
+IGNORED = frozenset("ˈˌ*. -\t\n")
+
+_TERMINAL = ""  # Trie key marking the end of a segment
+
+
+def _build_trie(segments: Iterable[str]) -> Dict[str, dict]:
+    """Character trie of the multi-code-point segments"""
+    trie: Dict[str, dict] = {}
+    for segment in segments:
+        node = trie
+        for char in segment:
+            node = node.setdefault(char, {})
+        node[_TERMINAL] = {}
+    return trie
+
+
+def _is_phoneme_sequence(text: str, phonemes: frozenset) -> bool:
+    """True if text splits into two or more of the given phonemes"""
+    reachable = [True] + [False] * len(text)
+    for end in range(1, len(text) + 1):
+        reachable[end] = any(
+            reachable[start] and text[start:end] in phonemes and (start, end) != (0, len(text))
+            for start in range(end)
+        )
+    return reachable[-1]
+
+
+@lru_cache(maxsize=None)
+def _segment_trie() -> Dict[str, dict]:
+    """Trie of every known segment (built once per process)"""
+    english = frozenset(load_arpabet_ipa_map().values()) | frozenset(EXTRA_SEGMENTS)
+    segments = set(english)
+    for group in load_confusion_groups():
+        segments.update(sound for sound in group if not _is_phoneme_sequence(sound, english))
+    # Single code points need no trie entry: they are segments by default
+    return _build_trie(segment for segment in segments if len(segment) > 1)
+
+
+@lru_cache(maxsize=20000)
+def tokenize(ipa: str) -> Tuple[str, ...]:
+    """
+    Split an IPA string into phoneme segments.
+
+    Args:
+        ipa: IPA transcription, e.g. from eng_to_ipa.convert()
+
+    Returns:
+        tuple: Segments in order, without stress marks
+    """
+    trie = _segment_trie()
+    segments: List[str] = []
+    position = 0
+    length = len(ipa)
+    while position < length:
+        char = ipa[position]
+        if char in IGNORED:
+            position += 1
+            continue
+        if segments and (char in MODIFIERS or unicodedata.combining(char)):
+            segments[-1] += char
+            position += 1
+            continue
+
+        # Longest known segment starting here, else the single character
+        end = position + 1
+        node = trie
+        scan = position
+        while scan < length and ipa[scan] in node:
+            node = node[ipa[scan]]
+            scan += 1
+            if _TERMINAL in node:
+                end = scan
+        segments.append(ipa[position:end])
+        position = end
+
+    return tuple(segments)
+
+
+_segment_ids: Dict[str, int] = {}
+_segment_names: List[str] = []
+_intern_lock = threading.Lock()
+
+
+def segment_id(segment: str) -> int:
+    """Small integer code of a segment (assigned on first use)"""
+    code = _segment_ids.get(segment)
+    if code is None:
+        with _intern_lock:
+            code = _segment_ids.get(segment)
+            if code is None:
+                code = len(_segment_names)
+                _segment_names.append(segment)
+                _segment_ids[segment] = code
+    return code
+
+
+def segment_count() -> int:
+    """Number of segments interned so far (all codes are below this)"""
+    return len(_segment_names)
+
+
+@lru_cache(maxsize=20000)
+def encode(ipa: str) -> Tuple[int, ...]:
+    """Tokenize and encode an IPA string as segment codes"""
+    return tuple(segment_id(segment) for segment in tokenize(ipa))
+
+
+def segments(codes: Sequence[int]) -> Tuple[str, ...]:
+    """The segment of each code, one string per phoneme"""
+    return tuple(_segment_names[code] for code in codes)
+
+
+def decode(codes: Sequence[int]) -> str:
+    """Join segment codes back into an IPA string (without stress marks)"""
+    return "".join(segments(codes))
@@ -12,27 +12,22 @@ Requirements:
 Install with: pip install eng-to-ipa PyYAML
 """
 
-import yaml
 import random
 import csv
 import os
 import re
 import sqlite3
 from collections import Counter
-from eng_to_ipa import ipa_list
 
+from ipa_cache import ipa_list, prefetch
+from results_store import open_store
+from tracing import traced
+from tsv_index import line_count, open_index
 
-def load_user_data(file_path="user-data.yaml"):
-    """Load and parse user data from YAML file."""
-    try:
-        with open(file_path, 'r', encoding='utf-8') as file:
-            return yaml.safe_load(file)
-    except FileNotFoundError:
-        print(f"Warning: {file_path} not found. Using empty data.")
-        return []
-    except Exception as e:
-        print(f"Error loading {file_path}: {e}")
-        return []
+
+def load_user_data(file_path="user-data.jsonl"):
+    """Latest result per sentence from the shared results store (see results_store.py)."""
+    return open_store(file_path).entries()
 
 
 def analyze_last_20_nodes(data):
@@ -99,13 +94,12 @@ def get_file_line_count(file_path):
             return count
         except Exception as e:
             print(f"Error getting DB count: {e}")
-            return 1991044
     
+    # Cached next to the TSV (see tsv_index.py), so only the very first run counts
     try:
-        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-            return sum(1 for line in f)
-    except:
-        return 1991044
+        return line_count(file_path)
+    except OSError:
+        return 0
 
 
 def has_numbers(sentence):
@@ -113,6 +107,106 @@ def has_numbers(sentence):
     return bool(re.search(r'\d', sentence))
 
 
+SAMPLE_BATCH = 64    # Random ids probed per query (at least)
+SAMPLE_MAX_BATCH = 900  # Stays under SQLite's default limit of 999 query parameters
+SAMPLE_ROUNDS = 16   # Probe queries before falling back to the index
+
+# Sentence filter: English, no digits, length in [min_len, max_len]. DBs from
+# build.py store char_len / has_digit (indexed on lang, has_digit, char_len);
+# older DBs compute them per row.
+_INDEXED_FILTER = "lang='eng' AND has_digit=0 AND char_len >= ? AND char_len <= ?"
+_COMPUTED_FILTER = "lang='eng' AND sentence NOT GLOB '*[0-9]*' AND LENGTH(sentence) >= ? AND LENGTH(sentence) <= ?"
+
+
+def _has_length_columns(cursor):
+    """Check if the sentences table has the precomputed char_len / has_digit columns."""
+    cursor.execute("PRAGMA table_info(sentences)")
+    columns = {row[1] for row in cursor.fetchall()}
+    return {'char_len', 'has_digit'} <= columns
+
+
+def _sample_sentences(cursor, count, min_len=0, max_len=999999):
+    """
+    Random English sentences without numbers, without ORDER BY RANDOM().
+    
+    Draws random ids in [min(id), max(id)] and looks them up through the
+    primary key, a batch per query; ids that fall in gaps (other languages,
+    deleted sentences) or fail the filter are simply redrawn. If the filter
+    is too rare for that, the rest is taken at random offsets of its range
+    in the (lang, has_digit, char_len) index, or on older DBs by seeking to
+    the first matching id at or after a random id.
+    
+    Args:
+        cursor: Cursor on the sentences DB
+        count: Number of distinct sentences wanted
+        min_len, max_len: Sentence length range (characters)
+    
+    Returns:
+        list: Up to count sentences, in random order
+    """
+    # Separate subqueries: each is one B-tree seek, while MIN and MAX together scan the table
+    cursor.execute("SELECT (SELECT MIN(id) FROM sentences), (SELECT MAX(id) FROM sentences)")
+    low, high = cursor.fetchone()
+    if low is None:
+        return []
+    
+    indexed = _has_length_columns(cursor)
+    condition = _INDEXED_FILTER if indexed else _COMPUTED_FILTER
+    
+    found = {}
+    for _ in range(SAMPLE_ROUNDS):
+        batch = min(SAMPLE_MAX_BATCH, max(SAMPLE_BATCH, 8 * (count - len(found))))
+        ids = [random.randint(low, high) for _ in range(batch)]
+        # NOT INDEXED: keep the primary-key lookups even where the length index exists
+        cursor.execute(f"""
+            SELECT id, sentence FROM sentences NOT INDEXED 
+            WHERE id IN ({','.join('?' * len(ids))}) 
+            AND {condition}
+        """, (*ids, min_len, max_len))
+        for row_id, sentence in cursor.fetchall():
+            found.setdefault(row_id, sentence)
+        if len(found) >= count:
+            break
+    
+    if len(found) < count and indexed:
+        # Rare filter: few rows match, so walking to a random offset in its index range is short
+        cursor.execute(f"SELECT COUNT(*) FROM sentences WHERE {condition}", (min_len, max_len))
+        total = cursor.fetchone()[0]
+        for offset in random.sample(range(total), min(total, count - len(found))):
+            cursor.execute(f"""
+                SELECT id, sentence FROM sentences 
+                WHERE {condition} 
+                ORDER BY char_len 
+                LIMIT 1 OFFSET ?
+            """, (min_len, max_len, offset))
+            row = cursor.fetchone()
+            if row:
+                found.setdefault(row[0], row[1])
+    
+    elif len(found) < count:
+        for _ in range(count - len(found)):
+            start = random.randint(low, high)
+            row = None
+            for lower, upper in ((start, high), (low, start)):  # Wrap around past the last id
+                cursor.execute(f"""
+                    SELECT id, sentence FROM sentences 
+                    WHERE id >= ? AND id <= ? 
+                    AND {condition} 
+                    ORDER BY id 
+                    LIMIT 1
+                """, (lower, upper, min_len, max_len))
+                row = cursor.fetchone()
+                if row:
+                    break
+            if row is None:
+                break  # Nothing matches the filter at all
+            found.setdefault(row[0], row[1])
+    
+    sentences = list(found.values())
+    random.shuffle(sentences)
+    return sentences[:count]
+
+
 def get_random_words_from_db(file_path="eng_sentences.tsv", count=100, max_attempts=10):
     """
     Extract random words from sentences in SQLite DB.
@@ -140,24 +234,13 @@ def get_random_words_from_db(file_path="eng_sentences.tsv", count=100, max_attem
         fetch_count = count * 3
         
         while len(words) < count and attempts < max_attempts:
-            cursor.execute("""
-                SELECT sentence FROM sentences 
-                WHERE lang='eng' 
-                AND LENGTH(sentence) >= 10
-                AND LENGTH(sentence) <= 100
-                ORDER BY RANDOM() 
-                LIMIT ?
-            """, (fetch_count,))
-            
-            results = cursor.fetchall()
+            results = _sample_sentences(cursor, fetch_count, 10, 100)
             
             for result in results:
                 if len(words) >= count:
                     break
                 
-                sentence = result[0].strip()
-                if has_numbers(sentence):
-                    continue
+                sentence = result.strip()
                 
                 # Split sentence into words and filter
                 sentence_words = sentence.replace('.', '').replace(',', '').replace('!', '').replace('?', '').replace(';', '').replace(':', '').split()
@@ -172,8 +255,8 @@ def get_random_words_from_db(file_path="eng_sentences.tsv", count=100, max_attem
                     if clean_word and clean_word[0].isupper():
                         continue
                     
-                    # Skip words with numbers or too short
-                    if clean_word and len(clean_word) > 2 and not has_numbers(clean_word):
+                    # Skip words too short (sentences come without numbers)
+                    if clean_word and len(clean_word) > 2:
                         if clean_word.lower() not in words:
                             words.append(clean_word.lower())
             
@@ -194,6 +277,7 @@ def get_random_words_from_db(file_path="eng_sentences.tsv", count=100, max_attem
         return ["fallback", "word", "test"]
 
 
+@traced("generate_sentence.sample")
 def get_random_sentence_from_file(file_path="eng_sentences.tsv", max_attempts=10, lv=0):
     """
     Get a random sentence from TSV file or SQLite DB efficiently.
@@ -229,38 +313,20 @@ def get_random_sentence_from_file(file_path="eng_sentences.tsv", max_attempts=10
             conn = sqlite3.connect(db_path)
             cursor = conn.cursor()
             
-            for attempt in range(max_attempts):
-                if lv == 0:
-                    cursor.execute("""
-                        SELECT sentence FROM sentences 
-                        WHERE lang='eng' 
-                        ORDER BY RANDOM() 
-                        LIMIT 1
-                    """)
-                else:
-                    cursor.execute("""
-                        SELECT sentence FROM sentences 
-                        WHERE lang='eng' 
-                        AND LENGTH(sentence) >= ?
-                        AND LENGTH(sentence) <= ?
-                        ORDER BY RANDOM() 
-                        LIMIT 1
-                    """, (min_len, max_len))
-                
-                result = cursor.fetchone()
+            # The sampler only returns sentences without numbers, so no retries are needed
+            results = _sample_sentences(cursor, 1, min_len, max_len)
+            
+            if results and results[0]:
+                sentence = results[0].strip()
+                if lv == 3 and ',' in sentence:
+                    parts = [p.strip() for p in sentence.split(',', 1)]
+                    if len(parts) == 2 and len(parts[0]) > 20 and len(parts[1]) > 20:
+                        sentence = random.choice(parts)
+                        if not sentence[-1] in '.!?':
+                            sentence += '.'
                 
-                if result and result[0]:
-                    sentence = result[0].strip()
-                    if not has_numbers(sentence):
-                        if lv == 3 and ',' in sentence:
-                            parts = [p.strip() for p in sentence.split(',', 1)]
-                            if len(parts) == 2 and len(parts[0]) > 20 and len(parts[1]) > 20:
-                                sentence = random.choice(parts)
-                                if not sentence[-1] in '.!?':
-                                    sentence += '.'
-                        
-                        conn.close()
-                        return sentence
+                conn.close()
+                return sentence
             
             conn.close()
             return "This is a fallback sentence without any numbers."
@@ -273,40 +339,29 @@ def get_random_sentence_from_file(file_path="eng_sentences.tsv", max_attempts=10
         return "This is a fallback sentence for testing purposes."
     
     try:
-        if not hasattr(get_random_sentence_from_file, 'line_count'):
-            print("Counting lines in TSV file...")
-            get_random_sentence_from_file.line_count = get_file_line_count(file_path)
-            print(f"File has {get_random_sentence_from_file.line_count} lines")
-        
-        total_lines = get_random_sentence_from_file.line_count
+        # Line offsets are indexed once, so each attempt slices one row out of the mapped TSV
+        index = open_index(file_path)
         
-        for attempt in range(max_attempts):
-            random_line = random.randint(1, total_lines)
-            
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                for i, line in enumerate(f, 1):
-                    if i == random_line:
-                        try:
-                            columns = line.strip().split('\t')
-                            if len(columns) >= 3 and columns[2].strip():
-                                sentence = columns[2].strip()
-                                sentence_len = len(sentence)
-                                
-                                if lv != 0 and (sentence_len < min_len or sentence_len > max_len):
-                                    break
-                                
-                                if not has_numbers(sentence):
-                                    if lv == 3 and ',' in sentence:
-                                        parts = [p.strip() for p in sentence.split(',', 1)]
-                                        if len(parts) == 2 and len(parts[0]) > 20 and len(parts[1]) > 20:
-                                            sentence = random.choice(parts)
-                                            if not sentence[-1] in '.!?':
-                                                sentence += '.'
-                                    
-                                    return sentence
-                                break
-                        except:
-                            break
+        for attempt in range(max_attempts if index.count else 0):
+            try:
+                sentence = index.random_sentence()
+                if sentence:
+                    sentence_len = len(sentence)
+                    
+                    if lv != 0 and (sentence_len < min_len or sentence_len > max_len):
+                        continue
+                    
+                    if not has_numbers(sentence):
+                        if lv == 3 and ',' in sentence:
+                            parts = [p.strip() for p in sentence.split(',', 1)]
+                            if len(parts) == 2 and len(parts[0]) > 20 and len(parts[1]) > 20:
+                                sentence = random.choice(parts)
+                                if not sentence[-1] in '.!?':
+                                    sentence += '.'
+                        
+                        return sentence
+            except:
+                continue
         
         return "This is a fallback sentence without any numbers."
         
@@ -315,6 +370,7 @@ def get_random_sentence_from_file(file_path="eng_sentences.tsv", max_attempts=10
         return "This is a fallback sentence due to file reading error."
 
 
+@traced("generate_sentence.sample")
 def get_multiple_random_sentences(file_path="eng_sentences.tsv", count=30, max_attempts=100, lv=0):
     """
     Get multiple random sentences from TSV file or SQLite DB efficiently.
@@ -343,27 +399,17 @@ def get_multiple_random_sentences(file_path="eng_sentences.tsv", count=30, max_a
             
             sentences = []
             attempts = 0
-            fetch_count = min(count * 3, 200)
             
             while len(sentences) < count and attempts < max_attempts:
-                cursor.execute("""
-                    SELECT sentence FROM sentences 
-                    WHERE lang='eng' 
-                    AND LENGTH(sentence) >= ? 
-                    AND LENGTH(sentence) <= ?
-                    ORDER BY RANDOM() 
-                    LIMIT ?
-                """, (min_len, max_len, fetch_count))
-                
-                results = cursor.fetchall()
+                results = _sample_sentences(cursor, count - len(sentences), min_len, max_len)
                 
                 for result in results:
                     if len(sentences) >= count:
                         break
                     
-                    sentence = result[0].strip()
+                    sentence = result.strip()
                     if (len(sentence) >= min_len and len(sentence) <= max_len and 
-                        not has_numbers(sentence) and sentence not in sentences):
+                        sentence not in sentences):
                         
                         if lv == 3 and ',' in sentence:
                             parts = [p.strip() for p in sentence.split(',', 1)]
@@ -393,37 +439,28 @@ def get_multiple_random_sentences(file_path="eng_sentences.tsv", count=30, max_a
         return [f"This is fallback sentence number {i+1} without numbers." for i in range(count)]
     
     try:
-        if not hasattr(get_multiple_random_sentences, 'line_count'):
-            print("Counting lines in TSV file...")
-            get_multiple_random_sentences.line_count = get_file_line_count(file_path)
-            print(f"File has {get_multiple_random_sentences.line_count} lines")
-        
-        total_lines = get_multiple_random_sentences.line_count
-        random_lines = sorted(random.sample(range(1, total_lines + 1), min(count * 5, total_lines)))
+        # Random lines are read through the offset index; no need to visit them in file order
+        index = open_index(file_path)
+        random_lines = random.sample(range(index.count), min(count * 5, index.count))
         
         sentences = []
-        current_target = 0
         attempts = 0
         
-        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-            for i, line in enumerate(f, 1):
-                if current_target < len(random_lines) and i == random_lines[current_target]:
-                    attempts += 1
-                    if attempts > max_attempts:
-                        break
-                        
-                    try:
-                        columns = line.strip().split('\t')
-                        if len(columns) >= 3 and columns[2].strip():
-                            sentence = columns[2].strip()
-                            if (len(sentence) > 10 and len(sentence) < 200 and 
-                                not has_numbers(sentence)):
-                                sentences.append(sentence)
-                                if len(sentences) >= count:
-                                    break
-                    except:
-                        pass
-                    current_target += 1
+        for line_number in random_lines:
+            attempts += 1
+            if attempts > max_attempts:
+                break
+            
+            try:
+                sentence = index.sentence(line_number)
+                if sentence:
+                    if (len(sentence) > 10 and len(sentence) < 200 and 
+                        not has_numbers(sentence)):
+                        sentences.append(sentence)
+                        if len(sentences) >= count:
+                            break
+            except:
+                pass
         
         additional_attempts = 0
         while len(sentences) < count and additional_attempts < max_attempts:
@@ -446,6 +483,7 @@ def get_multiple_random_sentences(file_path="eng_sentences.tsv", count=30, max_a
         return [f"Fallback sentence {i+1} due to file reading error." for i in range(count)]
 
 
+@traced("generate_sentence.ipa")
 def generate_random_sentences_with_ipa(count=30, file_path="eng_sentences.tsv", lv=0):
     """Generate random sentences from TSV file or SQLite DB and convert words to IPA.
     Skip sentences containing numbers.
@@ -455,6 +493,15 @@ def generate_random_sentences_with_ipa(count=30, file_path="eng_sentences.tsv",
     sentences = get_multiple_random_sentences(file_path, count, lv=lv)
     print(f"Retrieved {len(sentences)} {'words' if lv == 1 else 'sentences'} from file (no numbers, level {lv})")
     
+    # Convert the words of all sentences in one dictionary query
+    prefetch(
+        clean_word.lower()
+        for sentence in sentences
+        for word in sentence.replace('.', '').replace(',', '').replace('!', '').replace('?', '').split()
+        for clean_word in [word.strip('.,!?;:"()[]{}')]
+        if clean_word
+    )
+    
     for sentence in sentences:
         try:
             # For lv=1, sentence is actually a single word
@@ -539,12 +586,13 @@ def select_best_sentences(sentences_with_ipa, target_ipa_frequencies, top_n=10):
     return scored_sentences[:top_n]
 
 
-def generate_sentence(file_path="user-data.yaml", tsv_file_path="eng_sentences.tsv", lv=0):
+@traced("generate_sentence")
+def generate_sentence(file_path="user-data.jsonl", tsv_file_path="eng_sentences.tsv", lv=0):
     """
     Main function to generate a sentence based on user performance analysis.
     
     Args:
-        file_path: Path to user data YAML file
+        file_path: Path to the user results log (user-data.jsonl)
         tsv_file_path: Path to TSV sentences file (will auto-convert to .db if exists)
         lv: Difficulty level (0=auto, 1=easy/word, 2=medium, 3=hard/long)
     
@@ -12,25 +12,20 @@ Requirements:
 Install with: pip install eng-to-ipa PyYAML
 """
 
-import yaml
 import random
 import os
 import re
 from collections import Counter
-from eng_to_ipa import ipa_list
 
+from ipa_cache import ipa_list, prefetch
+from results_store import open_store
+from tracing import traced
+from tsv_index import line_count, open_index
 
-def load_user_data(file_path="user-data.yaml"):
-    """Load and parse user data from YAML file."""
-    try:
-        with open(file_path, 'r', encoding='utf-8') as file:
-            return yaml.safe_load(file)
-    except FileNotFoundError:
-        print(f"Warning: {file_path} not found. Using empty data.")
-        return []
-    except Exception as e:
-        print(f"Error loading {file_path}: {e}")
-        return []
+
+def load_user_data(file_path="user-data.jsonl"):
+    """Latest result per sentence from the shared results store (see results_store.py)."""
+    return open_store(file_path).entries()
 
 
 def analyze_last_20_nodes(data):
@@ -62,12 +57,11 @@ def analyze_last_20_nodes(data):
 
 
 def get_file_line_count(file_path):
-    """Get total number of lines in file efficiently."""
+    """Get total number of lines in file (cached next to the TSV, see tsv_index.py)."""
     try:
-        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-            return sum(1 for line in f)
-    except:
-        return 1991044  # Default known count
+        return line_count(file_path)
+    except OSError:
+        return 0
 
 
 def has_numbers(text):
@@ -95,48 +89,36 @@ def get_words_from_tsv_sentence(file_path="eng_sentences.tsv"):
         return ["example", "sentence", "with", "sample", "words", "for", "testing"]
     
     try:
-        # Get total line count (cache this if called frequently)
-        if not hasattr(get_words_from_tsv_sentence, 'line_count'):
-            print("Counting lines in TSV file...")
-            get_words_from_tsv_sentence.line_count = get_file_line_count(file_path)
-            print(f"File has {get_words_from_tsv_sentence.line_count} lines")
-        
-        total_lines = get_words_from_tsv_sentence.line_count
-        
-        # Generate random line number
-        random_line = random.randint(1, total_lines)
-        
-        # Read the specific line
-        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-            for i, line in enumerate(f, 1):
-                if i == random_line:
-                    try:
-                        # Parse TSV line and get column C (index 2)
-                        columns = line.strip().split('\t')
-                        if len(columns) >= 3 and columns[2].strip():
-                            sentence = columns[2].strip()
-                            
-                            # Skip sentences with numbers
-                            if has_numbers(sentence):
-                                return []  # Return empty to indicate we need to try again
-                            
-                            # Extract words from sentence
-                            # Remove punctuation and split into words
-                            cleaned_sentence = re.sub(r'[^\w\s]', ' ', sentence)
-                            words = cleaned_sentence.split()
-                            
-                            # Filter out proper nouns and convert to lowercase
-                            filtered_words = []
-                            for word in words:
-                                if word and not is_proper_noun(word) and len(word) > 1:
-                                    filtered_words.append(word.lower())
-                            
-                            return filtered_words
-                            
-                    except Exception as e:
-                        return []  # Return empty on error
-        
-        return []  # If line not found
+        # Line offsets are indexed once, so a random line is one slice of the mapped TSV
+        index = open_index(file_path)
+        if not index.count:
+            return []
+
+        try:
+            # Column C (index 2), sliced from the mapped file
+            sentence = index.random_sentence()
+            if sentence:
+                # Skip sentences with numbers
+                if has_numbers(sentence):
+                    return []  # Return empty to indicate we need to try again
+
+                # Extract words from sentence
+                # Remove punctuation and split into words
+                cleaned_sentence = re.sub(r'[^\w\s]', ' ', sentence)
+                words = cleaned_sentence.split()
+
+                # Filter out proper nouns and convert to lowercase
+                filtered_words = []
+                for word in words:
+                    if word and not is_proper_noun(word) and len(word) > 1:
+                        filtered_words.append(word.lower())
+
+                return filtered_words
+
+        except Exception as e:
+            return []  # Return empty on error
+
+        return []  # If line has no sentence
         
     except Exception as e:
         print(f"Error reading from {file_path}: {e}")
@@ -178,6 +160,7 @@ def collect_random_words_from_tsv(target_count=30, file_path="eng_sentences.tsv"
     return unique_words[:target_count]
 
 
+@traced("generate_word.ipa")
 def generate_random_words_with_ipa(count=30, file_path="eng_sentences.tsv"):
     """Generate random words from TSV file and convert them to IPA."""
     words_with_ipa = []
@@ -186,6 +169,9 @@ def generate_random_words_with_ipa(count=30, file_path="eng_sentences.tsv"):
     random_words = collect_random_words_from_tsv(count * 2, file_path)  # Get more than needed
     print(f"Collected {len(random_words)} words from TSV file")
     
+    # Convert all words in one dictionary query
+    prefetch(random_words)
+    
     for word in random_words:
         try:
             ipa = ipa_list(word)
@@ -247,6 +233,7 @@ def select_words_by_frequency(ipa_to_words, ipa_frequencies):
     return selected_words
 
 
+@traced("generate_word.sample")
 def get_random_word_from_tsv(file_path="eng_sentences.tsv"):
     """
     Get a single random word from TSV file.
@@ -264,13 +251,14 @@ def get_random_word_from_tsv(file_path="eng_sentences.tsv"):
         return "fallback"
 
 
-def generate_word(file_path="user-data.yaml", tsv_file_path="eng_sentences.tsv"):
+@traced("generate_word")
+def generate_word(file_path="user-data.jsonl", tsv_file_path="eng_sentences.tsv"):
     """
     Main function to generate a word based on user performance analysis.
     Now uses eng_sentences.tsv instead of wonderwords.
     
     Args:
-        file_path: Path to user data YAML file
+        file_path: Path to the user results log (user-data.jsonl)
         tsv_file_path: Path to TSV sentences file
     
     Returns:
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Confusion-aware weighted edit distance between phone sequences
+
+Substituting a sound for one in its confusion group (θ → ð, ɪ → i) costs
+less than substituting an unrelated sound (θ → k). Costs come from a
+matrix derived once from ipa_confusion_groups.yaml and indexed by the
+segment codes of ipa_tokenizer, so the inner loop is plain array indexing.
+
+Inserting or deleting a phone costs 1 and an unrelated substitution costs 2
+(a deletion plus an insertion), so
+
+    similarity = 1 - distance / (len(a) + len(b))
+
+is exactly 2·LCS / (len(a) + len(b)) when no confusable sounds are
+involved: the same scale as difflib's ratio() and similarity.py, with
+partial credit for confusable substitutions.
+
+Usage:
+    from ipa_tokenizer import encode
+    sims = weighted_similarity_matrix([encode("θɪŋk")], [encode("sɪŋk"), encode("ðɪŋk")])
+"""
+
+import threading
+from functools import lru_cache
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+from ipa_resources import confusable_sounds
+from ipa_tokenizer import segment_count, segment_id
+
+INDEL_COST = 1.0
+SUBSTITUTION_COST = 2.0
+CONFUSABLE_COST = 1.0  # Half an unrelated substitution
+
+# eng_to_ipa spellings of sounds the resource files write differently
+ALIASES = {"ʧ": "tʃ", "ʤ": "dʒ", "ər": "ɚ", "g": "ɡ"}
+
+_matrix_lock = threading.Lock()
+_cost_matrix = np.zeros((0, 0), dtype=np.float32)
+
+
+@lru_cache(maxsize=None)
+def _confusable_ids() -> Dict[int, List[int]]:
+    """Segment code -> codes of the sounds it is confusable with (aliases included)"""
+    neighbours: Dict[int, List[int]] = {}
+    spellings: Dict[str, List[str]] = {}
+    for alias, canonical in ALIASES.items():
+        spellings.setdefault(canonical, [canonical]).append(alias)
+
+    for sound, others in confusable_sounds().items():
+        for spelling in spellings.get(sound, [sound]):
+            ids = neighbours.setdefault(segment_id(spelling), [])
+            for other in others:
+                ids.extend(segment_id(other_spelling) for other_spelling in spellings.get(other, [other]))
+    # Intern every spelling before the cost matrix is sized
+    for canonical, forms in spellings.items():
+        for form in forms:
+            neighbours.setdefault(segment_id(form), [])
+    return neighbours
+
+
+def substitution_costs() -> np.ndarray:
+    """
+    Cost of substituting segment code a with code b, as a square float32 array.
+
+    Covers every segment interned so far; rebuilt (rarely) when new segments
+    have been seen since the last call.
+    """
+    global _cost_matrix
+    confusable = _confusable_ids()
+    if _cost_matrix.shape[0] >= segment_count():
+        return _cost_matrix
+
+    with _matrix_lock:
+        size = segment_count()
+        if _cost_matrix.shape[0] >= size:
+            return _cost_matrix
+        # Leave room so a few new segments do not force a rebuild each time
+        capacity = size + 32
+        costs = np.full((capacity, capacity), SUBSTITUTION_COST, dtype=np.float32)
+        np.fill_diagonal(costs, 0.0)
+        for code, others in confusable.items():
+            costs[code, others] = CONFUSABLE_COST
+        for alias, canonical in ALIASES.items():
+            a, b = segment_id(alias), segment_id(canonical)
+            costs[a, b] = costs[b, a] = 0.0
+        _cost_matrix = costs
+        return costs
+
+
+def weighted_similarity_matrix(a_seqs: Sequence[Sequence[int]], b_seqs: Sequence[Sequence[int]]) -> np.ndarray:
+    """
+    Weighted similarity of every pair of segment-code sequences.
+
+    The edit-distance DP runs for all pairs at once: each step fills one
+    row of every pair's table with NumPy.
+
+    Args:
+        a_seqs: Sequences for the rows (from ipa_tokenizer.encode)
+        b_seqs: Sequences for the columns
+
+    Returns:
+        np.ndarray: float64 array of shape (len(a_seqs), len(b_seqs))
+    """
+    n, m = len(a_seqs), len(b_seqs)
+    if n == 0 or m == 0:
+        return np.zeros((n, m))
+
+    costs = substitution_costs()
+    flat_costs, width = costs.ravel(), costs.shape[1]
+    a_lengths = np.array([len(seq) for seq in a_seqs], dtype=np.int64)
+    b_lengths = np.array([len(seq) for seq in b_seqs], dtype=np.int64)
+    a_max, b_max = int(a_lengths.max()), int(b_lengths.max())
+
+    # Pad with code 0; padded cells are never read back
+    a_codes = np.zeros((n, a_max), dtype=np.int64)
+    for i, seq in enumerate(a_seqs):
+        a_codes[i, :len(seq)] = seq
+    b_codes = np.zeros((b_max, m), dtype=np.int64)
+    for j, seq in enumerate(b_seqs):
+        b_codes[:len(seq), j] = seq
+
+    # Pair p = q·m + r compares a_q with b_r; pairs run along the last axis so
+    # every step below works on whole contiguous rows
+    pair_a_codes = np.repeat(a_codes, m, axis=0)
+    pair_a_lengths = np.repeat(a_lengths, m)
+    pair_b_codes = np.tile(b_codes, (1, n))
+    pair_b_lengths = np.tile(b_lengths, n)
+    pairs = np.arange(n * m)
+
+    # previous[k, p]: distance between the first i phones of pair p's a and the first k of its b
+    previous = np.broadcast_to((np.arange(b_max + 1, dtype=np.float32) * INDEL_COST)[:, None],
+                               (b_max + 1, n * m)).copy()
+    current = np.empty_like(previous)
+    distance = np.where(pair_a_lengths == 0, pair_b_lengths * INDEL_COST, 0.0)
+
+    for i in range(a_max):
+        substitution = flat_costs.take(pair_a_codes[:, i] * width + pair_b_codes)
+        current[0] = (i + 1) * INDEL_COST
+        np.minimum(previous[:-1] + substitution, previous[1:] + INDEL_COST, out=current[1:])
+        # Horizontal moves: after the passes with shifts 1, 2, 4, ... every cell
+        # holds the best of all cells to its left plus the indels in between
+        shift = 1
+        while shift <= b_max:
+            np.minimum(current[shift:], current[:-shift] + shift * INDEL_COST, out=current[shift:])
+            shift *= 2
+
+        finished = pairs[pair_a_lengths == i + 1]
+        if len(finished):
+            distance[finished] = current[pair_b_lengths[finished], finished]
+        previous, current = current, previous
+
+    totals = pair_a_lengths + pair_b_lengths
+    with np.errstate(invalid="ignore", divide="ignore"):
+        sims = np.where(totals > 0, 1.0 - distance / (totals * INDEL_COST), 1.0)
+    return sims.reshape(n, m)
+
+
+def weighted_similarity(a_seq: Sequence[int], b_seq: Sequence[int]) -> float:
+    """Weighted similarity of one pair of segment-code sequences"""
+    return float(weighted_similarity_matrix([a_seq], [b_seq])[0, 0])
@@ -10,16 +10,86 @@ Usage:
     python pronunciation-assessment.py
     
     Or import as module:
-    from pronunciation_assessment import assess_pronunciation
+    from pronunciation_assessment import assess, assess_pronunciation
+    result = assess(original, spoken)      # AssessmentResult có cấu trúc
+    print(result.render())                 # Báo cáo dạng chữ (tạo khi cần)
+    
+    # spoken có thể là kết quả chi tiết của speech_to_text (return_detailed=True):
+    # khi đó độ tin cậy và thời gian của từng từ cũng được dùng
+    result = assess(original, transcribe_pcm(frames, 16000, return_detailed=True))
 """
 
 import re
 import difflib
-import yaml
 import os
-from typing import List, Tuple, Dict, Optional
-from dataclasses import dataclass
-import eng_to_ipa as ipa
+import threading
+import time
+from typing import Any, List, Sequence, Tuple, Dict, Optional, Union
+from dataclasses import asdict, dataclass, field, fields, replace
+
+import ipa_cache
+from acoustic_evidence import LOW_CONFIDENCE, RecognizedWord, align_recognized_words, timing_flags
+from ipa_tokenizer import encode, segments, tokenize
+from phone_distance import weighted_similarity, weighted_similarity_matrix
+from results_store import RESULTS_FILE, open_store, results_path
+from similarity import pair_similarity, similarity_matrix as batch_similarity_matrix
+from tracing import traced
+from word_alignment import MATCH_THRESHOLD, MERGE_THRESHOLD, SPLIT_THRESHOLD, align_words
+
+# "alignment": quy hoạch động theo thứ tự từ; "greedy": thuật toán 3 lượt cũ
+MATCHERS = ("alignment", "greedy")
+DEFAULT_MATCHER = "alignment"
+
+# "vectorized": chữ viết theo LCS bit-parallel (similarity.py), IPA theo khoảng cách âm vị có trọng số
+# (phone_distance.py), cả hai tính theo lô bằng NumPy; "difflib": SequenceMatcher từng cặp ký tự
+SIMILARITY_KERNELS = ("vectorized", "difflib")
+DEFAULT_SIMILARITY_KERNEL = "vectorized"
+
+@dataclass(frozen=True)
+class Thresholds:
+    """Các ngưỡng độ tương đồng dùng khi khớp từ và phân loại lỗi"""
+    mispronounced: float = 0.8      # Dưới ngưỡng này từ bị coi là phát âm sai
+    severe: float = 0.4             # Dưới ngưỡng này là severely_mispronounced
+    match: float = MATCH_THRESHOLD  # Quy hoạch động: ghép 1-1
+    split: float = SPLIT_THRESHOLD  # Quy hoạch động: 1 từ nghe thành 2-3 từ
+    merge: float = MERGE_THRESHOLD  # Quy hoạch động: 2 từ nghe thành 1 từ
+    greedy_high: float = 0.7        # Matcher greedy: lượt 1
+    greedy_split: float = 0.6       # Matcher greedy: lượt 2 (ghép 2-3 từ)
+    greedy_low: float = 0.4         # Matcher greedy: lượt 3
+    
+    @classmethod
+    def from_dict(cls, values: Dict[str, float]) -> "Thresholds":
+        """Ngưỡng mặc định, thay bằng các giá trị có trong dict"""
+        names = {f.name for f in fields(cls)}
+        unknown = set(values) - names
+        if unknown:
+            raise ValueError(f"Unknown thresholds {sorted(unknown)}, expected some of {sorted(names)}")
+        return replace(cls(), **{name: float(value) for name, value in values.items()})
+
+DEFAULT_THRESHOLDS = Thresholds()
+
+@dataclass
+class PhoneOp:
+    """Một thao tác sửa âm vị khi so IPA mong đợi với IPA thực tế"""
+    op: str         # "replace", "delete" (thiếu âm) hoặc "insert" (thừa âm)
+    expected: str   # Âm mong đợi ("" với insert)
+    actual: str     # Âm thực tế ("" với delete)
+    expected_phones: Tuple[str, ...] = ()  # Các âm vị của expected, tách sẵn khi so khớp
+    actual_phones: Tuple[str, ...] = ()    # Các âm vị của actual
+    
+    @classmethod
+    def from_codes(cls, op: str, expected_codes: Sequence[int], actual_codes: Sequence[int]) -> "PhoneOp":
+        """Tạo từ mã âm vị (ipa_tokenizer.encode), giữ nguyên cách tách âm vị"""
+        expected_phones, actual_phones = segments(expected_codes), segments(actual_codes)
+        return cls(op, "".join(expected_phones), "".join(actual_phones), expected_phones, actual_phones)
+    
+    def describe(self) -> str:
+        """Mô tả dạng chữ như trong báo cáo"""
+        if self.op == "replace":
+            return f"'{self.expected}' → '{self.actual}'"
+        if self.op == "delete":
+            return f"missing '{self.expected}'"
+        return f"extra '{self.actual}'"
 
 @dataclass
 class WordError:
@@ -28,15 +98,203 @@ class WordError:
     expected_ipa: str
     actual_ipa: str
     error_type: str
-    ipa_differences: List[str]
+    phone_ops: List[PhoneOp] = field(default_factory=list)
+    # Độ tin cậy của bộ nhận dạng với từ nghe được (None nếu không có): lỗi trên từ
+    # được nhận dạng chắc chắn là bằng chứng mạnh hơn, nên lỗi được nhân với giá trị này
+    confidence: Optional[float] = None
+    
+    @property
+    def ipa_differences(self) -> List[str]:
+        """Các khác biệt IPA dạng chữ (chỉ tạo khi cần hiển thị)"""
+        if self.error_type == "missing":
+            return [f"missing entire word '{self.expected_ipa}'"]
+        return [op.describe() for op in self.phone_ops]
+
+@dataclass
+class WordAssessment:
+    """Kết quả của một từ trong câu gốc"""
+    word: str                       # Từ đã làm sạch (chữ thường, không dấu câu)
+    index: int                      # Vị trí trong danh sách từ của câu gốc
+    start: int                      # Vị trí ký tự bắt đầu của token trong câu gốc (kể cả dấu câu dính liền)
+    end: int                        # Vị trí ký tự kết thúc (không bao gồm)
+    spoken: Optional[str]           # Từ nhận dạng được khớp với từ này (None nếu thiếu)
+    score: float                    # Độ tương đồng 0..1 (0 nếu thiếu)
+    error: Optional[WordError] = None
+    # Bằng chứng âm học từ kết quả chi tiết của bộ nhận dạng (None nếu chỉ có text)
+    confidence: Optional[float] = None
+    audio_start: Optional[float] = None     # Giây
+    audio_end: Optional[float] = None
+    flags: List[str] = field(default_factory=list)  # "low_confidence", "rushed", "hesitant"
+    
+    @property
+    def weighted_score(self) -> float:
+        """Điểm của từ, với mức phạt lỗi nhân theo độ tin cậy của bộ nhận dạng"""
+        if self.error is None or self.error.confidence is None:
+            return self.score
+        return 1.0 - (1.0 - self.score) * self.error.confidence
+
+@dataclass
+class AssessmentResult:
+    """
+    Kết quả đánh giá có cấu trúc
+    
+    Báo cáo dạng chữ chỉ được tạo khi gọi render() (hoặc str()), nên các
+    pipeline xử lý hàng loạt không phải dựng chuỗi.
+    """
+    original_text: str
+    spoken_text: str
+    words: List[WordAssessment]
+    timings: Dict[str, float] = field(default_factory=dict)  # Thời gian từng bước (ms)
+    _report: Optional[str] = field(default=None, init=False, repr=False, compare=False)
+    
+    @property
+    def errors(self) -> List[WordError]:
+        """Lỗi theo thứ tự từ trong câu"""
+        return [word.error for word in self.words if word.error is not None]
+    
+    @property
+    def correct(self) -> bool:
+        return all(word.error is None for word in self.words)
+    
+    @property
+    def score(self) -> float:
+        """Điểm trung bình của các từ (0..1), lỗi được nhân theo độ tin cậy nếu có"""
+        if not self.words:
+            return 1.0
+        return sum(word.weighted_score for word in self.words) / len(self.words)
+    
+    @property
+    def flagged(self) -> List[WordAssessment]:
+        """Các từ có dấu hiệu âm học đáng chú ý (không tính là lỗi)"""
+        return [word for word in self.words if word.flags]
+    
+    def render(self) -> str:
+        """Báo cáo dạng chữ với câu được đánh dấu và chi tiết lỗi (tạo một lần)"""
+        if self._report is None:
+            self._report = render_report(self.original_text, self.errors, self.flagged)
+        return self._report
+    
+    def __str__(self) -> str:
+        return self.render()
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Dạng dict để xuất JSON"""
+        words = []
+        for word in self.words:
+            data = asdict(word)
+            data["weighted_score"] = round(word.weighted_score, 4)
+            if word.error is not None:
+                data["error"]["ipa_differences"] = word.error.ipa_differences
+            words.append(data)
+        return {
+            "original_text": self.original_text,
+            "spoken_text": self.spoken_text,
+            "correct": self.correct,
+            "score": round(self.score, 4),
+            "words": words,
+            "timings": self.timings,
+        }
+
+def word_spans(text: str) -> List[Tuple[str, int, int]]:
+    """
+    Các từ đã làm sạch của một câu cùng vị trí ký tự trong câu gốc
+    
+    Cho cùng danh sách từ với _clean_text(text).split(); các token chỉ có
+    dấu câu bị bỏ qua.
+    """
+    spans = []
+    for token in re.finditer(r'\S+', text):
+        cleaned = re.sub(r'[^\w\s]', '', token.group().lower())
+        if cleaned:
+            spans.append((cleaned, token.start(), token.end()))
+    return spans
+
+def mark_sentence(original_text: str, errors: List[WordError]) -> str:
+    """Tạo câu được đánh dấu với từ sai (sử dụng một dấu * ở cuối từ)"""
+    words = original_text.split()
+    error_words = {error.word.lower() for error in errors}
+    
+    marked_words = []
+    for word in words:
+        clean_word = re.sub(r'[^\w]', '', word.lower())
+        if clean_word in error_words:
+            marked_words.append(f"{word}*")
+        else:
+            marked_words.append(word)
+    
+    return " ".join(marked_words)
+
+# Tiêu đề trong báo cáo cho các dấu hiệu âm học
+FLAG_TITLES = {
+    "low_confidence": "⚠️ Nhận dạng không chắc chắn",
+    "rushed": "⏩ Nói quá nhanh",
+    "hesitant": "⏸️ Ngập ngừng",
+}
+
+def _render_flags(flagged: List[WordAssessment]) -> List[str]:
+    """Các dòng báo cáo cho từ có dấu hiệu âm học"""
+    lines = []
+    for flag, title in FLAG_TITLES.items():
+        words = [word.word for word in flagged if flag in word.flags]
+        if words:
+            lines.append(f"{title}: {', '.join(words)}")
+    return lines
+
+def render_report(original_text: str, errors: List[WordError],
+                  flagged: Optional[List[WordAssessment]] = None) -> str:
+    """Báo cáo dạng chữ: câu được đánh dấu, chi tiết từng lỗi và các dấu hiệu âm học"""
+    result = [mark_sentence(original_text, errors)]
+    result.append("")  # Dòng trống
+    flag_lines = _render_flags(flagged or [])
+    
+    if not errors:
+        result.append("✅ Phát âm chính xác!")
+        if flag_lines:
+            result.append("")
+            result.extend(flag_lines)
+        return "\n".join(result)
+    
+    result.append("❌ Các lỗi phát âm được phát hiện:")
+    result.append("")
+    
+    for error in errors:
+        result.append(f"🔸 Từ '{error.word}':")
+        result.append(f"   Expected IPA: {error.expected_ipa}")
+        result.append(f"   Actual IPA:   {error.actual_ipa}")
+        result.append(f"   Error type:   {error.error_type}")
+        if error.ipa_differences:
+            result.append(f"   IPA differences: {', '.join(error.ipa_differences)}")
+        if error.confidence is not None:
+            result.append(f"   Confidence:   {error.confidence:.2f}")
+        result.append("")
+    
+    result.extend(flag_lines)
+    return "\n".join(result)
 
 class PronunciationAssessment:
     """Class chính để đánh giá phát âm"""
     
-    def __init__(self, data_file="user-data.yaml"):
+    def __init__(self, data_file=RESULTS_FILE, matcher=DEFAULT_MATCHER,
+                 similarity_kernel=DEFAULT_SIMILARITY_KERNEL, thresholds=DEFAULT_THRESHOLDS):
+        if matcher not in MATCHERS:
+            raise ValueError(f"Unknown matcher '{matcher}', expected one of {MATCHERS}")
+        if similarity_kernel not in SIMILARITY_KERNELS:
+            raise ValueError(f"Unknown similarity kernel '{similarity_kernel}', expected one of {SIMILARITY_KERNELS}")
         self.word_errors = []
         self.data_file = data_file
-        self.user_data = self._load_user_data()
+        self.matcher = matcher
+        self.similarity_kernel = similarity_kernel
+        self.thresholds = thresholds
+        # word_errors là trạng thái của lần gọi gần nhất: giữ lock này khi cần đọc nó
+        # ngay sau assess_pronunciation() từ nhiều luồng
+        self.lock = threading.RLock()
+        # Nhật ký kết quả dùng chung (results_store.py); "" = chỉ giữ trong bộ nhớ
+        self.store = open_store(data_file)
+    
+    @property
+    def user_data(self) -> List[Dict]:
+        """Kết quả mới nhất của từng câu, theo thứ tự câu được kiểm tra lần đầu"""
+        return self.store.entries()
     
     def _clean_text(self, text: str) -> str:
         """Làm sạch text, loại bỏ dấu câu và chuẩn hóa"""
@@ -47,66 +305,109 @@ class PronunciationAssessment:
         return cleaned
     
     def _get_ipa_pronunciation(self, word: str) -> str:
-        """Chuyển từ sang IPA"""
+        """Chuyển từ sang IPA (qua cache dùng chung)"""
         try:
-            return ipa.convert(word)
+            return ipa_cache.convert(word)
         except Exception:
             return word  # Fallback nếu không convert được
     
     def _calculate_word_similarity(self, word1: str, word2: str) -> float:
         """Tính độ tương đồng giữa 2 từ"""
+        if self.similarity_kernel == "vectorized":
+            return pair_similarity(word1.lower(), word2.lower())
         return difflib.SequenceMatcher(None, word1.lower(), word2.lower()).ratio()
     
     def _calculate_ipa_similarity(self, ipa1: str, ipa2: str) -> float:
-        """Tính độ tương đồng IPA giữa 2 từ"""
+        """Tính độ tương đồng IPA giữa 2 từ (âm dễ nhầm lẫn được tính điểm một phần)"""
+        if self.similarity_kernel == "vectorized":
+            return weighted_similarity(encode(ipa1), encode(ipa2))
         return difflib.SequenceMatcher(None, ipa1, ipa2).ratio()
     
-    def _find_ipa_differences(self, expected_ipa: str, actual_ipa: str) -> List[str]:
-        """Tìm các âm IPA khác nhau"""
-        differences = []
-        matcher = difflib.SequenceMatcher(None, expected_ipa, actual_ipa)
+    def _find_phone_ops(self, expected_ipa: str, actual_ipa: str) -> List[PhoneOp]:
+        """Tìm các âm IPA khác nhau (so khớp theo âm vị, không theo ký tự)"""
+        ops = []
+        expected_codes = encode(expected_ipa)
+        actual_codes = encode(actual_ipa)
+        matcher = difflib.SequenceMatcher(None, expected_codes, actual_codes, autojunk=False)
         
         for tag, i1, i2, j1, j2 in matcher.get_opcodes():
-            if tag == 'replace':
-                differences.append(f"'{expected_ipa[i1:i2]}' → '{actual_ipa[j1:j2]}'")
-            elif tag == 'delete':
-                differences.append(f"missing '{expected_ipa[i1:i2]}'")
-            elif tag == 'insert':
-                differences.append(f"extra '{actual_ipa[j1:j2]}'")
+            if tag != 'equal':
+                ops.append(PhoneOp.from_codes(tag, expected_codes[i1:i2], actual_codes[j1:j2]))
         
-        return differences
+        return ops
+
+    def _build_similarity_matrix(self, original_words: List[str], spoken_words: List[str],
+                                 min_similarity: float = 0.0) -> List[List[float]]:
+        """
+        Ma trận độ tương đồng (trung bình text và IPA) giữa từng cặp từ.
+        
+        Với kernel difflib, các ô chắc chắn nhỏ hơn min_similarity (theo cận
+        trên quick_ratio) được gán 0 mà không cần tính ratio() đầy đủ.
+        """
+        # Chuyển mỗi từ sang IPA đúng một lần (một truy vấn cho mọi từ chưa có trong cache)
+        try:
+            ipa_cache.prefetch(original_words + spoken_words)
+        except Exception:
+            pass  # _get_ipa_pronunciation tự fallback từng từ
+        original_ipa = [self._get_ipa_pronunciation(word) for word in original_words]
+        spoken_ipa = [self._get_ipa_pronunciation(word) for word in spoken_words]
+        
+        if self.similarity_kernel == "vectorized":
+            # Tất cả các cặp trong một lượt NumPy, không cần cắt tỉa
+            text_sims = batch_similarity_matrix([word.lower() for word in original_words],
+                                                [word.lower() for word in spoken_words])
+            ipa_sims = weighted_similarity_matrix([encode(ipa) for ipa in original_ipa],
+                                                  [encode(ipa) for ipa in spoken_ipa])
+            return ((text_sims + ipa_sims) / 2).tolist()
+        
+        similarity_matrix = [[0.0] * len(spoken_words) for _ in original_words]
+        for j, spoken_word in enumerate(spoken_words):
+            # difflib chỉ phân tích seq2 một lần, nên giữ từ nói làm seq2 và đổi seq1
+            text_matcher = difflib.SequenceMatcher(None, "", spoken_word.lower())
+            ipa_matcher = difflib.SequenceMatcher(None, "", spoken_ipa[j])
+            for i, orig_word in enumerate(original_words):
+                text_matcher.set_seq1(orig_word.lower())
+                ipa_matcher.set_seq1(original_ipa[i])
+                if min_similarity > 0 and (
+                    text_matcher.real_quick_ratio() + ipa_matcher.real_quick_ratio() < 2 * min_similarity
+                    or text_matcher.quick_ratio() + ipa_matcher.quick_ratio() < 2 * min_similarity
+                ):
+                    continue
+                # So sánh cả text và IPA
+                similarity_matrix[i][j] = (text_matcher.ratio() + ipa_matcher.ratio()) / 2
+        
+        return similarity_matrix
     
     def _advanced_word_matching(self, original_words: List[str], spoken_words: List[str]) -> List[Tuple[int, int, float]]:
         """
-        Thuật toán matching nâng cao để xử lý các trường hợp:
+        Ghép từ gốc với từ nhận dạng được, xử lý các trường hợp:
         - 1 từ thành 2 từ
         - 2 từ thành 1 từ  
         - Từ bị thiếu
         - Từ thừa
+        
+        Returns:
+            List[Tuple[int, int, float]]: (chỉ số từ gốc, chỉ số từ nói đầu tiên, độ tương đồng)
         """
-        matches = []
+        if self.matcher == "greedy":
+            return self._greedy_word_matching(original_words, spoken_words)
         
-        # Tạo ma trận similarity
-        similarity_matrix = []
-        for i, orig_word in enumerate(original_words):
-            row = []
-            for j, spoken_word in enumerate(spoken_words):
-                # So sánh cả text và IPA
-                text_sim = self._calculate_word_similarity(orig_word, spoken_word)
-                ipa_sim = self._calculate_ipa_similarity(
-                    self._get_ipa_pronunciation(orig_word),
-                    self._get_ipa_pronunciation(spoken_word)
-                )
-                combined_sim = (text_sim + ipa_sim) / 2
-                row.append(combined_sim)
-            similarity_matrix.append(row)
+        thresholds = self.thresholds
+        similarity_matrix = self._build_similarity_matrix(original_words, spoken_words, thresholds.match)
+        return align_words(original_words, spoken_words, similarity_matrix, self._calculate_word_similarity,
+                           thresholds.match, thresholds.split, thresholds.merge)
+    
+    def _greedy_word_matching(self, original_words: List[str], spoken_words: List[str]) -> List[Tuple[int, int, float]]:
+        """Thuật toán matching tham lam 3 lượt (ngưỡng 0.7, ghép 2-3 từ, ngưỡng 0.4 mặc định), không xét thứ tự từ"""
+        matches = []
+        similarity_matrix = self._build_similarity_matrix(original_words, spoken_words)
         
         # Tìm best matches sử dụng dynamic programming approach
         used_spoken = set()
         used_original = set()
         
         # Tìm matches với threshold cao trước
-        high_threshold = 0.7
+        high_threshold = self.thresholds.greedy_high
         for i in range(len(original_words)):
             if i in used_original:
                 continue
@@ -139,7 +440,7 @@ class PronunciationAssessment:
                     combined_spoken = ''.join(spoken_words[j:j+window_size])
                     combined_sim = self._calculate_word_similarity(original_words[i], combined_spoken)
                     
-                    if combined_sim >= 0.6:
+                    if combined_sim >= self.thresholds.greedy_split:
                         matches.append((i, j, combined_sim))
                         used_original.add(i)
                         for k in range(j, j + window_size):
@@ -150,7 +451,7 @@ class PronunciationAssessment:
                 break
         
         # Xử lý remaining với threshold thấp hơn
-        low_threshold = 0.4
+        low_threshold = self.thresholds.greedy_low
         for i in range(len(original_words)):
             if i in used_original:
                 continue
@@ -171,49 +472,15 @@ class PronunciationAssessment:
         
         return sorted(matches, key=lambda x: x[0])
     
-    def _load_user_data(self) -> List[Dict]:
-        """Tải dữ liệu user từ file YAML"""
-        if not os.path.exists(self.data_file):
-            return []
-        
-        try:
-            with open(self.data_file, 'r', encoding='utf-8') as f:
-                data = yaml.safe_load(f) or []
-                return data
-        except Exception as e:
-            print(f"Warning: Could not load {self.data_file}: {e}")
-            return []
-    
-    def _save_user_data(self):
-        """Lưu dữ liệu user vào file YAML"""
-        try:
-            with open(self.data_file, 'w', encoding='utf-8') as f:
-                yaml.dump(self.user_data, f, default_flow_style=False, 
-                         allow_unicode=True, indent=2)
-        except Exception as e:
-            print(f"Error saving to {self.data_file}: {e}")
-    
     def _extract_wrong_ipa_sounds(self, error: WordError) -> List[str]:
         """Trích xuất các âm IPA bị sai từ WordError"""
         wrong_sounds = []
         
-        for diff in error.ipa_differences:
-            if '→' in diff:
-                # Trường hợp thay thế: 'expected' → 'actual'
-                parts = diff.split(' → ')
-                if len(parts) == 2:
-                    expected = parts[0].strip("'")
-                    wrong_sounds.extend(list(expected))
-            elif 'missing' in diff:
-                # Trường hợp thiếu âm: missing 'sound'
-                missing_sound = diff.split("'")[1] if "'" in diff else ""
-                if missing_sound:
-                    wrong_sounds.extend(list(missing_sound))
-            elif 'extra' in diff:
-                # Trường hợp thừa âm: extra 'sound'
-                extra_sound = diff.split("'")[1] if "'" in diff else ""
-                if extra_sound:
-                    wrong_sounds.extend(list(extra_sound))
+        for op in error.phone_ops:
+            # Thay thế và thiếu âm: âm mong đợi bị sai; thừa âm: âm bị thêm vào.
+            # Dùng đúng các âm vị đã so khớp, không tách lại chuỗi đã nối
+            # (tokenize() có thể gộp lại 't' + 'ʃ' thành 'tʃ')
+            wrong_sounds.extend(op.actual_phones if op.op == "insert" else op.expected_phones)
         
         # Loại bỏ các ký tự đặc biệt và khoảng trắng
         wrong_sounds = [sound for sound in wrong_sounds if sound.strip() and sound not in [' ', '\t', '\n']]
@@ -228,8 +495,9 @@ class PronunciationAssessment:
         
         return unique_sounds
     
+    @traced("assess.save")
     def _save_assessment_result(self, original_text: str, spoken_text: str):
-        """Lưu kết quả đánh giá vào user-data.yaml"""
+        """Ghi thêm kết quả đánh giá vào nhật ký kết quả (user-data.jsonl)"""
         # Tạo entry mới
         wrong_words_data = []
         
@@ -237,81 +505,151 @@ class PronunciationAssessment:
             if error.error_type != "missing":  # Chỉ lưu từ bị phát âm sai, không lưu từ thiếu
                 wrong_ipa_sounds = self._extract_wrong_ipa_sounds(error)
                 if wrong_ipa_sounds:  # Chỉ thêm nếu có âm bị sai
-                    wrong_words_data.append({
+                    wrong_word = {
                         "word": error.word,
                         "wrong_ipa": wrong_ipa_sounds
-                    })
-        
-        # Tạo node mới
-        new_entry = {
-            "sentence": original_text.strip(),
-            "result": len(self.word_errors) == 0,  # True nếu không có lỗi
-            "wrong_words": wrong_words_data
-        }
-        
-        # Kiểm tra xem câu này đã tồn tại chưa
-        existing_index = -1
-        for i, entry in enumerate(self.user_data):
-            if entry.get("sentence", "").strip().lower() == original_text.strip().lower():
-                existing_index = i
-                break
+                    }
+                    if error.confidence is not None:
+                        wrong_word["confidence"] = error.confidence
+                    wrong_words_data.append(wrong_word)
         
-        if existing_index >= 0:
-            # Cập nhật entry cũ
-            self.user_data[existing_index] = new_entry
+        # Ghi một dòng mới; dòng mới nhất của một câu thay cho các dòng cũ
+        try:
+            existed = self.store.record(
+                original_text,
+                len(self.word_errors) == 0,  # True nếu không có lỗi
+                wrong_words_data,
+                spoken_text  # Để có thể chấm lại sau này (reassess.py)
+            )
+        except OSError as e:
+            print(f"Error saving to {self.store.path}: {e}")
+            return
+        
+        if existed:
             print(f"Updated existing entry for: '{original_text[:50]}...'")
         else:
-            # Thêm entry mới vào cuối
-            self.user_data.append(new_entry)
             print(f"Added new entry for: '{original_text[:50]}...'")
-        
-        # Lưu vào file
-        self._save_user_data()
     
-    def _identify_word_errors(self, original_words: List[str], spoken_words: List[str]) -> List[WordError]:
-        """Xác định các từ bị phát âm sai"""
-        errors = []
+    @traced("assess.match")
+    def _assess_words(self, original_words: List[str], spoken_words: List[str],
+                      spans: Optional[List[Tuple[int, int]]] = None,
+                      recognized: Optional[List[Optional[RecognizedWord]]] = None) -> List[WordAssessment]:
+        """Khớp từ và đánh giá từng từ của câu gốc (kèm bằng chứng âm học nếu có)"""
+        words = []
         matches = self._advanced_word_matching(original_words, spoken_words)
-        
-        matched_original_indices = {match[0] for match in matches}
+        # Mỗi từ gốc lấy match đầu tiên của nó
+        match_by_index = {}
+        for match in matches:
+            match_by_index.setdefault(match[0], match)
         
         for i, original_word in enumerate(original_words):
-            if i not in matched_original_indices:
+            start, end = spans[i] if spans else (0, 0)
+            match = match_by_index.get(i)
+            if match is None:
                 # Từ bị thiếu hoàn toàn
                 expected_ipa = self._get_ipa_pronunciation(original_word)
-                errors.append(WordError(
+                error = WordError(
                     word=original_word,
                     expected_ipa=expected_ipa,
                     actual_ipa="[missing]",
                     error_type="missing",
-                    ipa_differences=[f"missing entire word '{expected_ipa}'"]
-                ))
+                    phone_ops=[PhoneOp.from_codes("delete", encode(expected_ipa), ())]
+                )
+                words.append(WordAssessment(original_word, i, start, end, None, 0.0, error))
                 continue
             
-            # Tìm match tương ứng
-            match = next(match for match in matches if match[0] == i)
             _, spoken_idx, similarity = match
+            spoken_word = spoken_words[spoken_idx] if spoken_idx < len(spoken_words) else None
+            error = None
             
-            if similarity < 0.8:  # Threshold cho từ sai
-                spoken_word = spoken_words[spoken_idx] if spoken_idx < len(spoken_words) else "[missing]"
+            if similarity < self.thresholds.mispronounced:  # Threshold cho từ sai
                 expected_ipa = self._get_ipa_pronunciation(original_word)
-                actual_ipa = self._get_ipa_pronunciation(spoken_word) if spoken_word != "[missing]" else "[missing]"
-                
-                ipa_diffs = self._find_ipa_differences(expected_ipa, actual_ipa)
+                actual_ipa = self._get_ipa_pronunciation(spoken_word) if spoken_word is not None else "[missing]"
                 
                 error_type = "mispronounced"
-                if similarity < 0.4:
+                if similarity < self.thresholds.severe:
                     error_type = "severely_mispronounced"
                 
-                errors.append(WordError(
+                error = WordError(
                     word=original_word,
                     expected_ipa=expected_ipa,
                     actual_ipa=actual_ipa,
                     error_type=error_type,
-                    ipa_differences=ipa_diffs
-                ))
+                    phone_ops=self._find_phone_ops(expected_ipa, actual_ipa)
+                )
+            
+            word = WordAssessment(original_word, i, start, end, spoken_word, float(similarity), error)
+            evidence = recognized[spoken_idx] if recognized and spoken_idx < len(recognized) else None
+            if evidence is not None:
+                self._apply_evidence(word, evidence, first=spoken_idx == 0)
+            words.append(word)
         
-        return errors
+        return words
+    
+    def _apply_evidence(self, word: WordAssessment, evidence: RecognizedWord, first: bool) -> None:
+        """Gắn độ tin cậy và thời gian của từ nghe được, đánh dấu từ đáng chú ý"""
+        word.confidence = round(evidence.confidence, 4)
+        word.audio_start = evidence.start
+        word.audio_end = evidence.end
+        if word.error is not None:
+            word.error.confidence = word.confidence
+        elif evidence.confidence < LOW_CONFIDENCE:
+            # Khớp về chữ nhưng bộ nhận dạng không chắc đã nghe đúng
+            word.flags.append("low_confidence")
+        
+        phone_count = len(tokenize(self._get_ipa_pronunciation(word.word)))
+        word.flags.extend(timing_flags(evidence, phone_count, first))
+    
+    def _identify_word_errors(self, original_words: List[str], spoken_words: List[str]) -> List[WordError]:
+        """Xác định các từ bị phát âm sai"""
+        return [word.error for word in self._assess_words(original_words, spoken_words) if word.error is not None]
+    
+    @traced("assess")
+    def assess(self, original_text: str, spoken: Union[str, Dict[str, Any]],
+               save_result: bool = True) -> AssessmentResult:
+        """
+        Đánh giá phát âm, trả về kết quả có cấu trúc (an toàn khi gọi từ nhiều luồng)
+        
+        Args:
+            original_text: Câu/từ gốc
+            spoken: Kết quả từ Speech-to-Text, dạng text hoặc dict chi tiết
+                (return_detailed=True) để dùng thêm độ tin cậy và thời gian từng từ
+            save_result: Có lưu kết quả vào user-data.jsonl không
+            
+        Returns:
+            AssessmentResult: Từng từ với vị trí, từ nhận dạng, điểm, lỗi và các
+                thao tác âm vị; thời gian từng bước trong timings
+        """
+        with self.lock:
+            started = time.perf_counter()
+            
+            # Làm sạch và tách từ (giữ vị trí của từ trong câu gốc)
+            spans = word_spans(original_text)
+            original_words = [word for word, _, _ in spans]
+            recognized = None
+            if isinstance(spoken, dict):
+                spoken_text = spoken.get("text", "")
+                spoken_words = self._clean_text(spoken_text).split()
+                recognized = align_recognized_words(spoken_words, spoken.get("words") or [])
+            else:
+                spoken_text = spoken
+                spoken_words = self._clean_text(spoken_text).split()
+            
+            # Tìm lỗi
+            words = self._assess_words(original_words, spoken_words,
+                                       [(start, end) for _, start, end in spans], recognized)
+            result = AssessmentResult(original_text, spoken_text, words)
+            self.word_errors = result.errors
+            matched = time.perf_counter()
+            result.timings["match"] = round((matched - started) * 1000, 3)
+            
+            # Lưu kết quả nếu được yêu cầu
+            if save_result:
+                self._save_assessment_result(original_text, spoken_text)
+                result.timings["save"] = round((time.perf_counter() - matched) * 1000, 3)
+            
+            result.timings["total"] = round((time.perf_counter() - started) * 1000, 3)
+            return result
     
     def assess_pronunciation(self, original_text: str, spoken_text: str, save_result: bool = True) -> str:
         """
@@ -319,69 +657,19 @@ class PronunciationAssessment:
         
         Args:
             original_text: Câu/từ gốc
-            spoken_text: Kết quả từ Speech-to-Text
-            save_result: Có lưu kết quả vào user-data.yaml không
+            spoken_text: Kết quả từ Speech-to-Text (text hoặc dict chi tiết)
+            save_result: Có lưu kết quả vào user-data.jsonl không
             
         Returns:
             str: Kết quả đánh giá với câu được đánh dấu và chi tiết lỗi
         """
-        # Làm sạch và tách từ
-        original_clean = self._clean_text(original_text)
-        spoken_clean = self._clean_text(spoken_text)
-        
-        original_words = original_clean.split()
-        spoken_words = spoken_clean.split()
-        
-        # Tìm lỗi
-        self.word_errors = self._identify_word_errors(original_words, spoken_words)
-        
-        # Lưu kết quả nếu được yêu cầu
-        if save_result:
-            self._save_assessment_result(original_text, spoken_text)
-        
-        # Tạo câu được đánh dấu
-        marked_sentence = self._create_marked_sentence(original_text)
-        
-        # Tạo báo cáo chi tiết
-        result = [marked_sentence]
-        result.append("")  # Dòng trống
-        
-        if not self.word_errors:
-            result.append("✅ Phát âm chính xác!")
-            return "\n".join(result)
-        
-        result.append("❌ Các lỗi phát âm được phát hiện:")
-        result.append("")
-        
-        for error in self.word_errors:
-            result.append(f"🔸 Từ '{error.word}':")
-            result.append(f"   Expected IPA: {error.expected_ipa}")
-            result.append(f"   Actual IPA:   {error.actual_ipa}")
-            result.append(f"   Error type:   {error.error_type}")
-            if error.ipa_differences:
-                result.append(f"   IPA differences: {', '.join(error.ipa_differences)}")
-            result.append("")
-        
-        return "\n".join(result)
-    
-    def _create_marked_sentence(self, original_text: str) -> str:
-        """Tạo câu được đánh dấu với từ sai (sử dụng một dấu * ở cuối từ)"""
-        words = original_text.split()
-        error_words = {error.word.lower() for error in self.word_errors}
-        
-        marked_words = []
-        for word in words:
-            clean_word = re.sub(r'[^\w]', '', word.lower())
-            if clean_word in error_words:
-                marked_words.append(f"{word}*")
-            else:
-                marked_words.append(word)
-        
-        return " ".join(marked_words)
+        return self.assess(original_text, spoken_text, save_result).render()
     
     def get_user_statistics(self) -> Dict:
         """Lấy thống kê từ dữ liệu user"""
-        if not self.user_data:
+        # Mỗi lần đọc self.user_data đều đồng bộ lại kho dữ liệu, nên chỉ đọc một lần
+        entries = self.user_data
+        if not entries:
             return {
                 "total_assessments": 0,
                 "correct_assessments": 0,
@@ -390,15 +678,15 @@ class PronunciationAssessment:
                 "most_common_wrong_sounds": []
             }
         
-        total = len(self.user_data)
-        correct = sum(1 for entry in self.user_data if entry.get("result", False))
+        total = len(entries)
+        correct = sum(1 for entry in entries if entry.get("result", False))
         accuracy_rate = (correct / total) * 100 if total > 0 else 0
         
         # Thống kê từ sai nhiều nhất
         wrong_words_count = {}
         wrong_sounds_count = {}
         
-        for entry in self.user_data:
+        for entry in entries:
             for wrong_word in entry.get("wrong_words", []):
                 word = wrong_word.get("word", "")
                 if word:
@@ -445,20 +733,48 @@ class PronunciationAssessment:
         print("="*50)
 
 
+_assessors: Dict[str, PronunciationAssessment] = {}
+_assessors_lock = threading.Lock()
+
+
+def get_assessor(data_file: str = RESULTS_FILE) -> PronunciationAssessment:
+    """
+    Assessor dùng chung cho một file dữ liệu (GUI, CLI và server dùng cùng một instance)
+    
+    Lịch sử nằm trong bộ nhớ và chỉ được đọc lại khi file thay đổi
+    (results_store.py kiểm tra inode, kích thước và mtime).
+    """
+    key = os.path.abspath(results_path(data_file)) if data_file else data_file
+    with _assessors_lock:
+        assessor = _assessors.get(key)
+        if assessor is None:
+            assessor = PronunciationAssessment(data_file)
+            _assessors[key] = assessor
+        return assessor
+
+
+def assess(original_text: str, spoken: Union[str, Dict[str, Any]], save_result: bool = True) -> AssessmentResult:
+    """
+    Đánh giá bằng assessor dùng chung, trả về kết quả có cấu trúc
+    
+    Gọi render() trên kết quả khi cần hiển thị báo cáo dạng chữ.
+    """
+    return get_assessor().assess(original_text, spoken, save_result)
+
+
 def assess_pronunciation(original_text: str, spoken_text: str, save_result: bool = True) -> str:
     """
     Hàm wrapper để dễ import và sử dụng
     
     Args:
         original_text: Câu/từ gốc
-        spoken_text: Kết quả từ Speech-to-Text
-        save_result: Có lưu kết quả vào user-data.yaml không
+        spoken_text: Kết quả từ Speech-to-Text (text hoặc dict chi tiết)
+        save_result: Có lưu kết quả vào user-data.jsonl không
         
     Returns:
         str: Kết quả đánh giá chi tiết
     """
-    assessor = PronunciationAssessment()
-    return assessor.assess_pronunciation(original_text, spoken_text, save_result)
+    return get_assessor().assess_pronunciation(original_text, spoken_text, save_result)
 
 
 def main():
@@ -466,7 +782,7 @@ def main():
     print("=== Pronunciation Assessment Tool ===")
     print()
     
-    assessor = PronunciationAssessment()
+    assessor = get_assessor()
     
     # Test cases
     test_cases = [
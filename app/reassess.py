@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+"""
+Batch re-assessment of past attempts with two threshold sets
+
+Re-scores (target sentence, transcript) pairs with a baseline and a
+candidate set of thresholds (see pronunciation_assessment.Thresholds) and
+reports what the candidate would change: per-item results as JSON lines
+and an aggregate diff.
+
+Input is JSON lines with the target in "text" (or "sentence") and the
+recognized transcript in "transcript" (or "spoken"), either plain text or
+a detailed speech_to_text result. user-data.jsonl can be passed directly:
+every attempt logged with its transcript is re-assessed. Input files are
+only read; assessments are never saved.
+
+Items are spread over a process pool. The parent converts every word to
+IPA once into an on-disk IPA cache, and each worker loads that file at
+start-up, so workers never query the dictionary themselves. The cache is
+reassess-ipa-cache.json by default, not the app's ipa-cache.json: it is
+rewritten with every word of the batch, so sharing the app's file has to
+be asked for with --ipa-cache ipa-cache.json.
+
+Usage:
+    python reassess.py user-data.jsonl --set mispronounced=0.75 severe=0.35
+    python reassess.py pairs.jsonl --baseline old.yaml --candidate new.yaml \\
+        --output items.jsonl --summary summary.json --jobs 4
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import fields
+from typing import Any, Dict, Iterable, List, Optional, TextIO, Tuple
+
+import yaml
+
+import ipa_cache
+from pronunciation_assessment import (
+    DEFAULT_MATCHER, DEFAULT_SIMILARITY_KERNEL, MATCHERS, SIMILARITY_KERNELS,
+    PronunciationAssessment, Thresholds
+)
+
+DEFAULT_IPA_CACHE = "reassess-ipa-cache.json"  # Kept apart from the app's ipa-cache.json
+
+# Assessors of this worker process: (baseline, candidate)
+_worker_assessors: Optional[Tuple[PronunciationAssessment, PronunciationAssessment]] = None
+
+
+def load_thresholds(path: Optional[str], overrides: Iterable[str] = ()) -> Thresholds:
+    """
+    Thresholds from a YAML/JSON mapping file plus name=value overrides.
+
+    Args:
+        path: File with e.g. {mispronounced: 0.75}; None for the defaults
+        overrides: Strings like "severe=0.35" applied on top
+    """
+    values: Dict[str, float] = {}
+    if path:
+        with open(path, "r", encoding="utf-8") as f:
+            values.update(yaml.safe_load(f) or {})
+    for override in overrides:
+        name, sep, value = override.partition("=")
+        if not sep:
+            raise ValueError(f"Expected name=value, got '{override}'")
+        values[name.strip()] = float(value)
+    return Thresholds.from_dict(values)
+
+
+def read_items(path: str) -> List[Dict[str, Any]]:
+    """Read (text, transcript) pairs from a JSONL file, skipping lines without both"""
+    items = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if not isinstance(record, dict):
+                continue
+            text = record.get("text", record.get("sentence"))
+            transcript = record.get("transcript", record.get("spoken"))
+            if not text or transcript is None:
+                continue
+            item = {"line": line_number, "text": text, "transcript": transcript}
+            if "id" in record:
+                item["id"] = record["id"]
+            items.append(item)
+    return items
+
+
+def _item_words(items: Iterable[Dict[str, Any]]) -> List[str]:
+    """Every distinct cleaned word of the targets and transcripts"""
+    words = set()
+    for item in items:
+        transcript = item["transcript"]
+        spoken = transcript.get("text", "") if isinstance(transcript, dict) else transcript
+        for text in (item["text"], spoken):
+            words.update(re.sub(r'[^\w\s]', '', text.lower()).split())
+    return sorted(words)
+
+
+def _init_worker(baseline: Thresholds, candidate: Thresholds, matcher: str, kernel: str,
+                 cache_path: Optional[str], cache_size: int) -> None:
+    """Process pool initializer: warm IPA cache and one assessor per threshold set"""
+    global _worker_assessors
+    # In-memory cache loaded from the parent's file; workers never write it
+    cache = ipa_cache.configure(cache_size)
+    if cache_path:
+        cache.load(cache_path)
+    _worker_assessors = tuple(
+        PronunciationAssessment(data_file="", matcher=matcher, similarity_kernel=kernel, thresholds=thresholds)
+        for thresholds in (baseline, candidate)
+    )
+
+
+def _outcome(result) -> Dict[str, Any]:
+    """Compact view of one assessment"""
+    return {
+        "correct": result.correct,
+        "score": round(result.score, 4),
+        "errors": [
+            {"index": word.index, "word": word.word, "type": word.error.error_type}
+            for word in result.words if word.error is not None
+        ],
+    }
+
+
+def _reassess_item(item: Dict[str, Any]) -> Dict[str, Any]:
+    """Assess one item with both threshold sets and diff the flagged words"""
+    baseline_assessor, candidate_assessor = _worker_assessors
+    try:
+        baseline = _outcome(baseline_assessor.assess(item["text"], item["transcript"], save_result=False))
+        candidate = _outcome(candidate_assessor.assess(item["text"], item["transcript"], save_result=False))
+    except Exception as e:
+        return {**item, "error": str(e) or repr(e)}
+
+    before = {error["index"]: error for error in baseline["errors"]}
+    after = {error["index"]: error for error in candidate["errors"]}
+    transcript = item["transcript"]
+    return {
+        "line": item["line"],
+        **({"id": item["id"]} if "id" in item else {}),
+        "text": item["text"],
+        "transcript": transcript.get("text", "") if isinstance(transcript, dict) else transcript,
+        "baseline": baseline,
+        "candidate": candidate,
+        "added": [after[i]["word"] for i in sorted(after.keys() - before.keys())],
+        "removed": [before[i]["word"] for i in sorted(before.keys() - after.keys())],
+        "retyped": [
+            [after[i]["word"], before[i]["type"], after[i]["type"]]
+            for i in sorted(before.keys() & after.keys()) if before[i]["type"] != after[i]["type"]
+        ],
+        # Error type of every word whose classification changed ("none" = not flagged)
+        "transitions": [
+            f"{before[i]['type'] if i in before else 'none'}→{after[i]['type'] if i in after else 'none'}"
+            for i in sorted(before.keys() | after.keys())
+            if i not in before or i not in after or before[i]["type"] != after[i]["type"]
+        ],
+    }
+
+
+class DiffSummary:
+    """Aggregate of the per-item diffs"""
+
+    def __init__(self):
+        self.items = 0
+        self.failed = 0
+        self.changed = 0
+        self.correct = Counter()        # "baseline" / "candidate" -> items without errors
+        self.flagged = Counter()        # "baseline" / "candidate" -> flagged words
+        self.scores = Counter()         # "baseline" / "candidate" -> summed scores
+        self.flips = Counter()          # "correct→wrong" / "wrong→correct"
+        self.transitions = Counter()    # "mispronounced→severely_mispronounced", ...
+        self.added_words = Counter()
+        self.removed_words = Counter()
+
+    def add(self, item: Dict[str, Any]) -> None:
+        if "error" in item:
+            self.failed += 1
+            return
+        self.items += 1
+        for side in ("baseline", "candidate"):
+            self.correct[side] += item[side]["correct"]
+            self.flagged[side] += len(item[side]["errors"])
+            self.scores[side] += item[side]["score"]
+        if item["added"] or item["removed"] or item["retyped"]:
+            self.changed += 1
+        if item["baseline"]["correct"] != item["candidate"]["correct"]:
+            self.flips["wrong→correct" if item["candidate"]["correct"] else "correct→wrong"] += 1
+        self.added_words.update(item["added"])
+        self.removed_words.update(item["removed"])
+        self.transitions.update(item["transitions"])
+
+    def as_dict(self) -> Dict[str, Any]:
+        items = self.items or 1
+        return {
+            "items": self.items,
+            "failed": self.failed,
+            "changed": self.changed,
+            "correct": dict(self.correct),
+            "flagged_words": dict(self.flagged),
+            "mean_score": {side: round(total / items, 4) for side, total in self.scores.items()},
+            "flips": dict(self.flips),
+            "transitions": dict(self.transitions.most_common()),
+            "most_added": self.added_words.most_common(10),
+            "most_removed": self.removed_words.most_common(10),
+        }
+
+
+def reassess(
+    items: List[Dict[str, Any]],
+    baseline: Thresholds,
+    candidate: Thresholds,
+    matcher: str = DEFAULT_MATCHER,
+    kernel: str = DEFAULT_SIMILARITY_KERNEL,
+    jobs: int = 1,
+    cache_path: Optional[str] = DEFAULT_IPA_CACHE,
+    cache_size: int = ipa_cache.DEFAULT_CACHE_SIZE,
+    output: Optional[TextIO] = None
+) -> Dict[str, Any]:
+    """
+    Re-assess items with both threshold sets across a process pool.
+
+    Args:
+        items: From read_items()
+        baseline: Previous thresholds
+        candidate: Thresholds being evaluated
+        matcher: Word matcher for both sets
+        kernel: Similarity kernel for both sets
+        jobs: Number of worker processes
+        cache_path: IPA cache file shared with the workers (None: no file)
+        cache_size: IPA cache size (must hold every word of the batch to stay warm)
+        output: Text stream for per-item JSONL results, in input order (optional)
+
+    Returns:
+        dict: DiffSummary.as_dict() plus wall time and throughput
+    """
+    start = time.perf_counter()
+
+    # Convert every word once and share the result through the cache file
+    words = _item_words(items)
+    cache = ipa_cache.configure(max(cache_size, len(words)), cache_path)
+    cache.lookup(words)
+    cache.save()
+
+    summary = DiffSummary()
+    initargs = (baseline, candidate, matcher, kernel, cache_path, max(cache_size, len(words)))
+
+    def emit(item):
+        summary.add(item)
+        if output is not None:
+            output.write(json.dumps(item, ensure_ascii=False) + "\n")
+
+    if jobs <= 1:
+        _init_worker(*initargs)
+        for item in items:
+            emit(_reassess_item(item))
+    else:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=initargs) as executor:
+            chunksize = max(1, len(items) // (jobs * 8))
+            for result in executor.map(_reassess_item, items, chunksize=chunksize):
+                emit(result)
+
+    wall_seconds = time.perf_counter() - start
+    result = summary.as_dict()
+    result["wall_seconds"] = round(wall_seconds, 3)
+    result["items_per_second"] = round(summary.items / wall_seconds, 1) if wall_seconds > 0 else 0.0
+    return result
+
+
+def _print_summary(summary: Dict[str, Any], baseline: Thresholds, candidate: Thresholds) -> None:
+    """Human-readable aggregate diff"""
+    print(f"Items: {summary['items']} ({summary['failed']} failed), "
+          f"{summary['wall_seconds']}s, {summary['items_per_second']} items/s")
+    changed = {f.name: (getattr(baseline, f.name), getattr(candidate, f.name))
+               for f in fields(Thresholds) if getattr(baseline, f.name) != getattr(candidate, f.name)}
+    print("Changed thresholds: " + (", ".join(f"{name} {old} → {new}" for name, (old, new) in changed.items())
+                                    or "none"))
+    print()
+    print(f"{'':<16}{'Baseline':>10}{'Candidate':>11}")
+    for label, key in (("Correct items", "correct"), ("Flagged words", "flagged_words"), ("Mean score", "mean_score")):
+        values = summary[key]
+        print(f"{label:<16}{values.get('baseline', 0):>10}{values.get('candidate', 0):>11}")
+    print()
+    print(f"Items with a different result: {summary['changed']}")
+    for flip, count in summary["flips"].items():
+        print(f"  {flip}: {count}")
+    for transition, count in summary["transitions"].items():
+        print(f"  {transition}: {count}")
+    if summary["most_added"]:
+        print("Most newly flagged: " + ", ".join(f"{word} ({count})" for word, count in summary["most_added"]))
+    if summary["most_removed"]:
+        print("Most no longer flagged: " + ", ".join(f"{word} ({count})" for word, count in summary["most_removed"]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-assess past attempts with a candidate threshold set")
+    parser.add_argument("input", help="JSONL with text/transcript pairs (user-data.jsonl works)")
+    parser.add_argument("--baseline", metavar="FILE",
+                        help="YAML/JSON thresholds to compare against (default: current defaults)")
+    parser.add_argument("--candidate", metavar="FILE",
+                        help="YAML/JSON thresholds to evaluate (default: the baseline)")
+    parser.add_argument("--set", nargs="+", default=[], metavar="NAME=VALUE",
+                        help="Candidate threshold overrides, e.g. mispronounced=0.75")
+    parser.add_argument("--matcher", choices=MATCHERS, default=DEFAULT_MATCHER)
+    parser.add_argument("--kernel", choices=SIMILARITY_KERNELS, default=DEFAULT_SIMILARITY_KERNEL)
+    parser.add_argument("--jobs", "-j", type=int, default=os.cpu_count() or 1, help="Worker processes")
+    parser.add_argument("--ipa-cache", default=DEFAULT_IPA_CACHE,
+                        help="IPA cache file shared with the workers ('' to disable; "
+                             "ipa-cache.json reuses the app's cache and rewrites it with every word of the batch)")
+    parser.add_argument("--output", "-o", help="Write per-item results as JSON lines")
+    parser.add_argument("--summary", help="Write the aggregate diff as JSON")
+    args = parser.parse_args()
+
+    try:
+        baseline = load_thresholds(args.baseline)
+        candidate = load_thresholds(args.candidate or args.baseline, args.set)
+        items = read_items(args.input)
+    except (OSError, ValueError, yaml.YAMLError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    if not items:
+        print(f"No text/transcript pairs found in {args.input}", file=sys.stderr)
+        sys.exit(1)
+
+    output = open(args.output, "w", encoding="utf-8") if args.output else None
+    try:
+        summary = reassess(items, baseline, candidate, args.matcher, args.kernel,
+                           jobs=args.jobs, cache_path=args.ipa_cache or None, output=output)
+    finally:
+        if output is not None:
+            output.close()
+
+    _print_summary(summary, baseline, candidate)
+    if args.summary:
+        with open(args.summary, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
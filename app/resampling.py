@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Polyphase resampling of 16-bit PCM audio with NumPy
+
+Vosk models are trained on 16 kHz audio. When the microphone cannot capture
+at 16 kHz, the recorder captures at the device rate and converts each chunk
+with PolyphaseResampler, so every sample is resampled exactly once and the
+decoder (and the in-memory frame list) only ever sees 16 kHz audio.
+
+Usage:
+    Streaming:
+        resampler = PolyphaseResampler(44100, 16000)
+        out = [resampler.process(chunk) for chunk in chunks]
+        out.append(resampler.flush())
+
+    One shot:
+        samples_16k = resample_pcm(samples, 44100, 16000)
+"""
+
+from math import gcd
+
+import numpy as np
+
+TARGET_SAMPLE_RATE = 16000
+
+
+def design_lowpass(up: int, down: int, half_len_factor: int = 10, beta: float = 5.0) -> np.ndarray:
+    """
+    Design the Kaiser-windowed sinc anti-aliasing filter for an up/down ratio.
+
+    The filter runs at the upsampled rate and already includes the gain of
+    `up` lost by zero-stuffing.
+    """
+    max_rate = max(up, down)
+    half_len = half_len_factor * max_rate
+    n = np.arange(-half_len, half_len + 1, dtype=np.float64)
+    h = np.sinc(n / max_rate) / max_rate * np.kaiser(len(n), beta)
+    return h * up
+
+
+class PolyphaseResampler:
+    """
+    Stateful polyphase resampler for chunked mono int16 audio.
+
+    Only the output samples actually needed are computed: for each one, the
+    matching filter phase is applied to a short window of input samples, and
+    all outputs of a chunk are computed together as one matrix product.
+    """
+
+    def __init__(self, from_rate: int, to_rate: int = TARGET_SAMPLE_RATE):
+        """
+        Args:
+            from_rate: Input sample rate in Hz
+            to_rate: Output sample rate in Hz
+        """
+        divisor = gcd(from_rate, to_rate)
+        self.from_rate = from_rate
+        self.to_rate = to_rate
+        self.up = to_rate // divisor
+        self.down = from_rate // divisor
+
+        h = design_lowpass(self.up, self.down)
+        self.delay = (len(h) - 1) // 2  # Filter delay at the upsampled rate
+
+        # Split the filter into `up` phases of `taps` coefficients each
+        self.taps = -(-len(h) // self.up)
+        padded = np.zeros(self.taps * self.up)
+        padded[:len(h)] = h
+        self._phases = padded.reshape(self.taps, self.up).T.copy()
+        self._tap_offsets = np.arange(self.taps)
+
+        self.reset()
+
+    def reset(self):
+        """Forget buffered input and start a new stream"""
+        # Buffer starts with `taps` zeros so early outputs see silence before the signal
+        self._buffer = np.zeros(self.taps, dtype=np.float64)
+        self._buffer_start = -self.taps
+        self._samples_in = 0
+        self._samples_out = 0
+
+    def _produce(self, last_output: int) -> np.ndarray:
+        """Compute outputs up to and including index last_output"""
+        if last_output < self._samples_out:
+            return np.empty(0, dtype=np.int16)
+
+        n = np.arange(self._samples_out, last_output + 1, dtype=np.int64)
+        t = n * self.down + self.delay
+        base = t // self.up
+        phase = t % self.up
+
+        indices = (base - self._buffer_start)[:, None] - self._tap_offsets[None, :]
+        window = self._buffer[indices]
+        values = np.einsum('ij,ij->i', window, self._phases[phase])
+
+        self._samples_out = last_output + 1
+
+        # Drop input that no future output can reach
+        next_base = (self._samples_out * self.down + self.delay) // self.up
+        keep_from = next_base - (self.taps - 1)
+        if keep_from > self._buffer_start:
+            self._buffer = self._buffer[keep_from - self._buffer_start:]
+            self._buffer_start = keep_from
+
+        return np.clip(np.rint(values), -32768, 32767).astype(np.int16)
+
+    def _append(self, samples: np.ndarray):
+        """Append input samples to the buffer"""
+        self._buffer = np.concatenate((self._buffer, samples.astype(np.float64)))
+        self._samples_in += len(samples)
+
+    def process(self, data) -> bytes:
+        """
+        Resample the next chunk.
+
+        Args:
+            data: bytes or int16 array at from_rate
+
+        Returns:
+            bytes: int16 PCM at to_rate (may be slightly shorter or longer than
+                the exact ratio; the remainder is produced by later calls)
+        """
+        samples = np.frombuffer(data, dtype=np.int16) if not isinstance(data, np.ndarray) else data
+        self._append(samples)
+
+        # Outputs whose newest input sample has already arrived
+        last_output = (self._samples_in * self.up - 1 - self.delay) // self.down
+        return self._produce(last_output).tobytes()
+
+    def flush(self) -> bytes:
+        """Produce the remaining output at the end of the stream"""
+        total_out = -(-self._samples_in * self.up // self.down)
+        self._append(np.zeros(self.delay // self.up + self.taps, dtype=np.int16))
+        out = self._produce(total_out - 1).tobytes()
+        self.reset()
+        return out
+
+
+def resample_pcm(samples: np.ndarray, from_rate: int, to_rate: int = TARGET_SAMPLE_RATE) -> np.ndarray:
+    """
+    Resample a complete int16 recording in a single pass.
+
+    Args:
+        samples: 1-D int16 array at from_rate
+        from_rate: Input sample rate in Hz
+        to_rate: Output sample rate in Hz
+
+    Returns:
+        np.ndarray: int16 array at to_rate
+    """
+    if from_rate == to_rate:
+        return samples
+    resampler = PolyphaseResampler(from_rate, to_rate)
+    out = resampler.process(samples) + resampler.flush()
+    return np.frombuffer(out, dtype=np.int16)
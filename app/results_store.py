@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""
+Append-only store of assessment results
+
+Each assessment is one JSON line appended to user-data.jsonl, so saving a
+result costs one small write no matter how long the history is. The latest
+line for a sentence wins; an in-memory index keyed by the normalized
+sentence (stripped, lower-case) keeps lookups O(1). Entries keep the
+position of the first time the sentence was assessed, which is the order
+the old user-data.yaml list had.
+
+Superseded lines are dropped by compaction, which rewrites the live
+entries to a temporary file and atomically replaces the log. It runs
+automatically once the log holds enough stale lines. Appends and
+compaction take an exclusive lock on user-data.jsonl.lock, so a line
+another process appends while the log is being rewritten waits for the
+new file instead of landing in the old one and getting lost.
+
+Every read starts with one stat() of the log. Lines other processes
+appended since the last read are parsed incrementally; a log that was
+replaced (new inode, e.g. compacted elsewhere), truncated or rewritten
+in place (same size, new mtime) is read again from the start. Unchanged
+logs are never re-read.
+
+The first time a store is opened and no log exists yet, entries are
+imported once from the old user-data.yaml next to it (the YAML file is
+left untouched).
+
+Usage:
+    from results_store import open_store
+    store = open_store("user-data.jsonl")
+    store.record("Hello world", False, [{"word": "world", "wrong_ipa": ["ɜr"]}])
+    store.last(20)      # Latest entries, oldest first
+    store.compact(keep_last=20)
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+import yaml
+
+from tracing import span
+
+RESULTS_FILE = "user-data.jsonl"
+LOCK_SUFFIX = ".lock"
+
+# Compact once at least this many lines are stale and they outnumber the live entries
+COMPACT_MIN_STALE = 200
+
+
+def normalize_sentence(sentence: str) -> str:
+    """Index key of a sentence (the comparison user-data.yaml updates used)"""
+    return sentence.strip().lower()
+
+
+def results_path(file_path: str) -> str:
+    """Log path for a data file path; old .yaml paths map to the .jsonl next to them"""
+    root, ext = os.path.splitext(file_path)
+    return root + ".jsonl" if ext in (".yaml", ".yml") else file_path
+
+
+@contextmanager
+def file_lock(path: str) -> Iterator[None]:
+    """
+    Exclusive lock between processes, held on path + ".lock" (blocks until acquired).
+
+    The lock file itself is left in place: deleting it would let two
+    processes lock different files under the same name.
+    """
+    with open(path + LOCK_SUFFIX, "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue  # LK_LOCK gives up after about 10 seconds
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class ResultsStore:
+    """
+    Thread-safe append-only log of the latest result per sentence.
+
+    Entries are dicts with the user-data.yaml fields (sentence, result,
+    wrong_words) plus the time they were recorded.
+    """
+
+    def __init__(self, path: Optional[str] = RESULTS_FILE, legacy_path: Optional[str] = None):
+        """
+        Args:
+            path: JSONL log file; None keeps the results in memory only
+            legacy_path: user-data.yaml to import from if the log does not exist yet
+                (default: the .yaml file next to the log)
+        """
+        self.path = path
+        if legacy_path is None and path:
+            legacy_path = os.path.splitext(path)[0] + ".yaml"
+        self.legacy_path = legacy_path
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.RLock()
+        self._lines = 0
+        # What has been read so far: file identity, bytes of complete lines, mtime
+        self._file_id: Optional[Tuple[int, int]] = None
+        self._offset = 0
+        self._mtime_ns = 0
+        self._torn_tail = False
+        self.imported = 0
+        self.reloads = 0
+        if path:
+            self.load()
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._sync()
+            return len(self._entries)
+
+    def _index(self, entry: Dict[str, Any]) -> None:
+        """Make entry the latest for its sentence (lock must be held)"""
+        # Replacing a dict value keeps the key's original position
+        self._entries[normalize_sentence(entry.get("sentence", ""))] = entry
+
+    def load(self) -> None:
+        """Read the whole log, importing user-data.yaml first if there is no log yet"""
+        if not os.path.exists(self.path):
+            self._import_legacy()
+        with span("user_data.load", path=self.path), self._lock:
+            self._reset()
+            self._sync()
+
+    def _reset(self) -> None:
+        """Forget everything read so far (lock must be held)"""
+        self._entries.clear()
+        self._lines = 0
+        self._file_id = None
+        self._offset = 0
+        self._mtime_ns = 0
+        self._torn_tail = False
+
+    def _sync(self) -> None:
+        """
+        Catch up with changes other processes made to the log (lock must be held).
+
+        One stat() per call: lines appended since the last read are parsed
+        incrementally; a replaced (compacted), truncated or rewritten file is
+        read again from the start.
+        """
+        if not self.path:
+            return
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            if self._file_id is not None:
+                self._reset()
+            return
+        except OSError as e:
+            print(f"Warning: Could not stat {self.path}: {e}")
+            return
+
+        file_id = (stat.st_dev, stat.st_ino)
+        if self._file_id is not None:
+            if file_id != self._file_id or stat.st_size < self._offset or (
+                    stat.st_size == self._offset and stat.st_mtime_ns != self._mtime_ns):
+                # Replaced, truncated or rewritten in place
+                self._reset()
+                self.reloads += 1
+            elif stat.st_size == self._offset:
+                return  # Unchanged
+
+        try:
+            with open(self.path, "rb") as f:
+                f.seek(self._offset)
+                data = f.read()
+        except OSError as e:
+            print(f"Warning: Could not load {self.path}: {e}")
+            return
+
+        # A line without its newline is still being written (or was torn by a
+        # crash): leave it for the next read
+        complete = data.rfind(b"\n") + 1
+        for line in data[:complete].splitlines():
+            self._lines += 1
+            try:
+                entry = json.loads(line.decode("utf-8"))
+            except ValueError:
+                continue  # Torn line from a crash
+            if isinstance(entry, dict):
+                self._index(entry)
+        self._file_id = file_id
+        self._offset += complete
+        self._mtime_ns = stat.st_mtime_ns
+        self._torn_tail = complete < len(data)
+
+    def _import_legacy(self) -> None:
+        """Convert user-data.yaml into a new log (runs once, when the log is missing)"""
+        if not self.legacy_path or not os.path.exists(self.legacy_path):
+            return
+        try:
+            with open(self.legacy_path, "r", encoding="utf-8") as f:
+                data = yaml.safe_load(f) or []
+        except Exception as e:
+            print(f"Warning: Could not import {self.legacy_path}: {e}")
+            return
+
+        entries = [entry for entry in data if isinstance(entry, dict) and entry.get("sentence")]
+        with file_lock(self.path):
+            if os.path.exists(self.path):
+                return  # Another process imported it first
+            self._write_atomic(entries)
+        self.imported = len(entries)
+        if entries:
+            print(f"Imported {len(entries)} entries from {self.legacy_path} into {self.path}")
+
+    def _write_atomic(self, entries: List[Dict[str, Any]]) -> None:
+        """Replace the log with the given entries via a temporary file"""
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for entry in entries:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def get(self, sentence: str) -> Optional[Dict[str, Any]]:
+        """Latest entry for a sentence, or None"""
+        with self._lock:
+            self._sync()
+            return self._entries.get(normalize_sentence(sentence))
+
+    def entries(self) -> List[Dict[str, Any]]:
+        """All latest entries, in the order the sentences were first assessed"""
+        with self._lock:
+            self._sync()
+            return list(self._entries.values())
+
+    def last(self, count: int) -> List[Dict[str, Any]]:
+        """The last count entries of entries()"""
+        entries = self.entries()
+        return entries[-count:] if count > 0 else []
+
+    def record(self, sentence: str, result: bool, wrong_words: List[Dict[str, Any]],
+               spoken: Optional[str] = None) -> bool:
+        """
+        Append a result for a sentence.
+
+        Args:
+            sentence: Assessed sentence
+            result: True if it was pronounced without errors
+            wrong_words: [{"word": ..., "wrong_ipa": [...]}, ...]
+            spoken: Recognized transcript, kept so the attempt can be re-assessed later
+
+        Returns:
+            bool: True if the sentence had been assessed before
+        """
+        entry = {
+            "sentence": sentence.strip(),
+            "result": result,
+            "wrong_words": wrong_words,
+            "time": round(time.time(), 3),
+        }
+        if spoken is not None:
+            entry["spoken"] = spoken
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._sync()
+            existed = normalize_sentence(sentence) in self._entries
+            if self.path:
+                # One write() per line: appends never interleave or rewrite old data.
+                # The lock keeps the line out of a log that is being compacted
+                with file_lock(self.path), open(self.path, "a", encoding="utf-8") as f:
+                    f.write("\n" + line if self._torn_tail else line)
+                # Read our own line back, together with anything appended meanwhile
+                self._sync()
+            else:
+                self._index(entry)
+            stale = self._lines - len(self._entries)
+            should_compact = self.path and stale >= COMPACT_MIN_STALE and stale > len(self._entries)
+
+        if should_compact:
+            self.compact()
+        return existed
+
+    def compact(self, keep_last: Optional[int] = None) -> None:
+        """
+        Rewrite the log with only the latest entry per sentence.
+
+        Args:
+            keep_last: Also drop all but this many most recent entries
+        """
+        with span("user_data.compact", path=self.path), self._lock:
+            if not self.path:
+                self._trim(keep_last)
+                return
+            try:
+                # Held from the last read until the new log is in place, so no
+                # other process can append to the old file in between
+                with file_lock(self.path):
+                    self._sync()
+                    self._trim(keep_last)
+                    self._write_atomic(list(self._entries.values()))
+            except OSError as e:
+                print(f"Warning: Could not compact {self.path}: {e}")
+                return
+            # The new file has a new identity: read it back like any replaced log
+            self._reset()
+            self._sync()
+
+    def _trim(self, keep_last: Optional[int]) -> None:
+        """Keep only the keep_last most recent entries, if given (lock must be held)"""
+        if keep_last is None:
+            return
+        entries = list(self._entries.values())
+        entries = entries[-keep_last:] if keep_last > 0 else []
+        self._entries = {normalize_sentence(entry["sentence"]): entry for entry in entries}
+
+
+_stores: Dict[str, ResultsStore] = {}
+_stores_lock = threading.Lock()
+
+
+def open_store(file_path: str = RESULTS_FILE) -> ResultsStore:
+    """
+    Shared store for a data file (one instance per path and process).
+
+    Old user-data.yaml paths are accepted and mean the .jsonl log next to
+    them. An empty path gives a private in-memory store.
+    """
+    if not file_path:
+        return ResultsStore(None)
+    path = os.path.abspath(results_path(file_path))
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = ResultsStore(path)
+            _stores[path] = store
+        return store
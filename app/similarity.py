@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Bit-parallel string similarity for word alignment
+
+The similarity of two strings is 1 - indel / (len(a) + len(b)), where indel
+is the insert/delete edit distance. Since indel = len(a) + len(b) - 2·LCS,
+this equals 2·LCS / (len(a) + len(b)): the same scale as difflib's ratio(),
+which counts matching characters the same way but finds them greedily
+(so ratio() can only be lower). The thresholds tuned for difflib therefore
+keep their meaning.
+
+The LCS is computed with the bit-parallel algorithm of Allison & Dix /
+Hyyrö: one machine word holds a whole row of the DP table, so each
+character of the second string costs a handful of integer operations.
+similarity_matrix() runs it for all pairs at once on NumPy uint64 arrays,
+one step per character of the longest second string.
+
+Usage:
+    sims = similarity_matrix(["weather", "today"], ["wether", "to", "day"])
+    pair_similarity("coffee", "coffe")   # 0.909...
+"""
+
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+WORD_BITS = 64  # Strings up to this length fit in one uint64 row
+
+if hasattr(np, "bitwise_count"):
+    _popcount = np.bitwise_count
+else:
+    _BYTE_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+    def _popcount(values: np.ndarray) -> np.ndarray:
+        """Set bits per uint64 for NumPy < 2.0"""
+        as_bytes = values.reshape(values.shape + (1,)).view(np.uint8)
+        return _BYTE_POPCOUNT[as_bytes].sum(axis=-1, dtype=np.uint8)
+
+
+def lcs_length(a: str, b: str) -> int:
+    """Length of the longest common subsequence (Python ints, any length)"""
+    if not a or not b:
+        return 0
+    match_masks: Dict[str, int] = {}
+    for i, char in enumerate(a):
+        match_masks[char] = match_masks.get(char, 0) | (1 << i)
+
+    full = (1 << len(a)) - 1
+    row = full
+    for char in b:
+        matched = row & match_masks.get(char, 0)
+        row = ((row + matched) | (row - matched)) & full
+    return len(a) - bin(row).count("1")
+
+
+def pair_similarity(a: str, b: str) -> float:
+    """2·LCS / (len(a) + len(b)); 1.0 for two empty strings"""
+    total = len(a) + len(b)
+    return 2.0 * lcs_length(a, b) / total if total else 1.0
+
+
+def similarity_matrix(a_words: Sequence[str], b_words: Sequence[str]) -> np.ndarray:
+    """
+    Similarity of every pair of strings, computed in one batched pass.
+
+    Args:
+        a_words: Strings for the rows
+        b_words: Strings for the columns
+
+    Returns:
+        np.ndarray: float64 array of shape (len(a_words), len(b_words))
+    """
+    n, m = len(a_words), len(b_words)
+    if n == 0 or m == 0:
+        return np.zeros((n, m))
+
+    a_lengths = np.array([len(word) for word in a_words], dtype=np.int64)
+    b_lengths = np.array([len(word) for word in b_words], dtype=np.int64)
+
+    # Map every character in the batch to a column; the extra last column is
+    # all zeros and pads the shorter column strings (a no-op step)
+    alphabet: Dict[str, int] = {}
+    for word in b_words:
+        for char in word:
+            alphabet.setdefault(char, len(alphabet))
+    pad = len(alphabet)
+
+    # match_masks[i, c]: bit k set where a_words[i][k] is character c
+    match_masks = np.zeros((n, pad + 1), dtype=np.uint64)
+    long_rows: List[int] = []
+    for i, word in enumerate(a_words):
+        if len(word) > WORD_BITS:
+            long_rows.append(i)
+            continue
+        for k, char in enumerate(word):
+            column = alphabet.get(char)
+            if column is not None:
+                match_masks[i, column] |= np.uint64(1 << k)
+
+    codes = np.full((m, int(b_lengths.max())), pad, dtype=np.int64)
+    for j, word in enumerate(b_words):
+        codes[j, :len(word)] = [alphabet[char] for char in word]
+
+    rows = np.full((n, m), np.iinfo(np.uint64).max, dtype=np.uint64)
+    for step in range(codes.shape[1]):
+        matched = rows & match_masks[:, codes[:, step]]
+        rows = (rows + matched) | (rows - matched)
+
+    # Zero bits within each row string's length count LCS characters
+    full = np.where(
+        a_lengths >= WORD_BITS,
+        np.iinfo(np.uint64).max,
+        (np.uint64(1) << np.minimum(a_lengths, WORD_BITS - 1).astype(np.uint64)) - np.uint64(1)
+    ).astype(np.uint64)
+    lcs = a_lengths[:, None] - _popcount(rows & full[:, None]).astype(np.int64)
+
+    # Rows too long for one machine word fall back to Python integers
+    for i in long_rows:
+        lcs[i] = [lcs_length(a_words[i], word) for word in b_words]
+
+    totals = a_lengths[:, None] + b_lengths[None, :]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        sims = np.where(totals > 0, 2.0 * lcs / totals, 1.0)
+    return sims
@@ -7,7 +7,8 @@ Requires vosk-model-en-us-0.22-lgraph folder in the same directory.
 
 Usage:
     Standalone: python speech_to_text.py audio_file.wav
-    Import: from speech_to_text import transcribe_audio
+    Batch: python speech_to_text.py --batch recordings/ --jobs 4 -o results.jsonl
+    Import: from speech_to_text import transcribe_audio, transcribe_pcm
 """
 
 import json
@@ -15,7 +16,14 @@ import os
 import sys
 import wave
 import argparse
-from typing import Optional, Dict, Any
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+from typing import Optional, Dict, Any, Callable, List, TextIO, Tuple
+
+import numpy as np
 
 try:
     import vosk
@@ -23,11 +31,323 @@ except ImportError:
     print("Error: vosk library not installed. Install with: pip install vosk")
     sys.exit(1)
 
+from target_grammar import UNKNOWN_WORD, build_target_grammar
+from tracing import span, traced
+
+
+DEFAULT_MODEL_PATH = "vosk-model-en-us-0.22-lgraph"
+CHUNK_FRAMES = 4000  # Samples fed to the recognizer per call
+
+# Warm recognizers kept per (model, sample rate)
+DEFAULT_POOL_SIZE = 4
+DEFAULT_CHECKOUT_TIMEOUT = 30.0
+
+# Grammar-constrained results that look like this mean the learner said something else
+MAX_UNKNOWN_RATIO = 0.5
+MIN_CONSTRAINED_CONFIDENCE = 0.5
+
+# Process-wide model registry: resolved model path -> loaded vosk.Model
+_model_cache: Dict[str, "vosk.Model"] = {}
+_model_locks: Dict[str, threading.Lock] = {}
+_registry_lock = threading.Lock()
+
+# Recognizer pools: (resolved model path, sample rate) -> RecognizerPool
+_recognizer_pools: Dict[Tuple[str, int], "RecognizerPool"] = {}
+
+
+def _resolve_model_path(model_path: str) -> str:
+    """Resolve a model path (relative to this script) to a canonical absolute path"""
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    return os.path.realpath(os.path.join(script_dir, model_path))
+
+
+def _get_model_lock(full_model_path: str) -> threading.Lock:
+    """Get the per-model load lock so different models can load in parallel"""
+    with _registry_lock:
+        lock = _model_locks.get(full_model_path)
+        if lock is None:
+            lock = threading.Lock()
+            _model_locks[full_model_path] = lock
+        return lock
+
+
+def get_model(model_path: str = DEFAULT_MODEL_PATH) -> "vosk.Model":
+    """
+    Get a shared Vosk model, loading it on first use.
+    
+    The model is loaded at most once per resolved path and shared by all threads.
+    
+    Args:
+        model_path (str): Path to Vosk model directory
+        
+    Returns:
+        vosk.Model: Loaded model
+        
+    Raises:
+        FileNotFoundError: If model directory not found
+    """
+    full_model_path = _resolve_model_path(model_path)
+    
+    model = _model_cache.get(full_model_path)
+    if model is not None:
+        return model
+    
+    with _get_model_lock(full_model_path):
+        # Another thread may have finished loading while we waited
+        model = _model_cache.get(full_model_path)
+        if model is not None:
+            return model
+        
+        if not os.path.exists(full_model_path):
+            raise FileNotFoundError(f"Vosk model not found: {full_model_path}")
+        
+        vosk.SetLogLevel(-1)  # Suppress Vosk logs
+        with span("stt.model_load", model=os.path.basename(full_model_path)):
+            model = vosk.Model(full_model_path)
+        _model_cache[full_model_path] = model
+        return model
+
+
+def preload_model(model_path: str = DEFAULT_MODEL_PATH) -> threading.Thread:
+    """
+    Load a model in a background thread so the first transcription does not wait for it.
+    
+    Args:
+        model_path (str): Path to Vosk model directory
+        
+    Returns:
+        threading.Thread: The (daemon) loader thread
+    """
+    def _load():
+        try:
+            get_model(model_path)
+        except Exception as e:
+            print(f"Warning: Could not preload Vosk model: {e}")
+    
+    thread = threading.Thread(target=_load, daemon=True)
+    thread.start()
+    return thread
+
+
+def unload_model(model_path: Optional[str] = None) -> None:
+    """
+    Drop a cached model (or all cached models if model_path is None).
+    
+    Transcriptions already running keep their own reference until they finish.
+    """
+    if model_path is None:
+        with _registry_lock:
+            paths = list(_model_cache.keys())
+    else:
+        paths = [_resolve_model_path(model_path)]
+    
+    for full_model_path in paths:
+        with _get_model_lock(full_model_path):
+            _model_cache.pop(full_model_path, None)
+            # Pooled recognizers keep the model alive, so drop them as well
+            with _registry_lock:
+                for key in [key for key in _recognizer_pools if key[0] == full_model_path]:
+                    del _recognizer_pools[key]
+
+
+def reload_model(model_path: str = DEFAULT_MODEL_PATH) -> "vosk.Model":
+    """
+    Reload a model from disk, e.g. after it was replaced.
+    
+    The old model is released before the new one is loaded so the process
+    never holds two copies of it.
+    """
+    unload_model(model_path)
+    return get_model(model_path)
+
+
+class RecognizerPoolTimeout(TimeoutError):
+    """Raised when no recognizer becomes free within the checkout timeout"""
+
+
+class RecognizerPool:
+    """
+    Bounded pool of warm KaldiRecognizer instances for one model and sample rate.
+    
+    Recognizers are created lazily up to `size`, Reset() when returned and
+    handed out again, so concurrent transcriptions do not build a new decoder
+    for every request. When all are in use, callers wait up to the checkout
+    timeout.
+    
+    Usage:
+        pool = get_recognizer_pool(DEFAULT_MODEL_PATH, 16000)
+        with pool.recognizer() as rec:
+            rec.AcceptWaveform(data)
+    """
+    
+    def __init__(self, model_path: str, sample_rate: int, size: int = DEFAULT_POOL_SIZE):
+        """
+        Args:
+            model_path (str): Path to Vosk model directory
+            sample_rate (int): Sample rate the recognizers decode at
+            size (int): Maximum number of recognizers
+        """
+        self.model_path = model_path
+        self.sample_rate = sample_rate
+        self.size = max(1, size)
+        
+        # LIFO so the most recently used (warmest) recognizer is reused first.
+        # Waiters sleep on the condition and re-check both ways to get one
+        # (an idle recognizer, or room to create one) each time they wake
+        self._idle: List["vosk.KaldiRecognizer"] = []
+        self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock)
+        self._created = 0
+        self._metrics = {
+            "checkouts": 0,
+            "created": 0,
+            "reused": 0,
+            "waits": 0,
+            "wait_seconds_total": 0.0,
+            "wait_seconds_max": 0.0,
+            "timeouts": 0,
+            "discarded": 0,
+        }
+    
+    def acquire(self, timeout: Optional[float] = DEFAULT_CHECKOUT_TIMEOUT) -> "vosk.KaldiRecognizer":
+        """
+        Check out a recognizer, creating one if the pool is not full yet.
+        
+        Raises:
+            RecognizerPoolTimeout: If none becomes free within `timeout` seconds
+        """
+        start = time.monotonic()
+        deadline = None if timeout is None else start + timeout
+        waited = False
+        with self._available:
+            while True:
+                if self._idle:
+                    rec = self._idle.pop()
+                    self._record_checkout("reused", waited, start)
+                    return rec
+                if self._created < self.size:
+                    self._created += 1
+                    break
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    self._metrics["timeouts"] += 1
+                    raise RecognizerPoolTimeout(
+                        f"No recognizer free after {timeout}s (pool size {self.size})"
+                    )
+                waited = True
+                self._available.wait(remaining)
+        
+        # Build outside the lock; the slot is already reserved
+        try:
+            rec = _make_recognizer(get_model(self.model_path), self.sample_rate)
+        except Exception:
+            with self._available:
+                self._created -= 1
+                self._available.notify()
+            raise
+        with self._lock:
+            self._record_checkout("created", waited, start)
+        return rec
+    
+    def _record_checkout(self, kind: str, waited: bool, start: float) -> None:
+        """Update checkout metrics (lock must be held)"""
+        self._metrics["checkouts"] += 1
+        self._metrics[kind] += 1
+        if waited:
+            wait_seconds = time.monotonic() - start
+            self._metrics["waits"] += 1
+            self._metrics["wait_seconds_total"] += wait_seconds
+            self._metrics["wait_seconds_max"] = max(self._metrics["wait_seconds_max"], wait_seconds)
+    
+    def release(self, rec: "vosk.KaldiRecognizer", discard: bool = False) -> None:
+        """
+        Reset a recognizer and return it to the pool (or drop it if it failed).
+        
+        Either way one waiting acquire() is woken: a discarded recognizer
+        frees a slot to create a new one.
+        """
+        if not discard:
+            try:
+                rec.Reset()
+            except Exception:
+                discard = True
+        
+        with self._available:
+            if discard:
+                self._created -= 1
+                self._metrics["discarded"] += 1
+            else:
+                self._idle.append(rec)
+            self._available.notify()
+    
+    @contextmanager
+    def recognizer(self, timeout: Optional[float] = DEFAULT_CHECKOUT_TIMEOUT):
+        """Context manager: check out a recognizer and always return it"""
+        rec = self.acquire(timeout)
+        try:
+            yield rec
+        except BaseException:
+            # Its decoder state is unknown after a failure
+            self.release(rec, discard=True)
+            raise
+        else:
+            self.release(rec)
+    
+    def warm(self, count: Optional[int] = None) -> None:
+        """Pre-build recognizers so the first requests do not pay for it"""
+        count = self.size if count is None else min(count, self.size)
+        recognizers = []
+        try:
+            for _ in range(count):
+                recognizers.append(self.acquire(timeout=0))
+        except RecognizerPoolTimeout:
+            pass
+        for rec in recognizers:
+            self.release(rec)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Pool metrics: sizes, checkouts and time spent waiting"""
+        with self._lock:
+            stats = dict(self._metrics)
+            stats["size"] = self.size
+            stats["idle"] = len(self._idle)
+            stats["in_use"] = self._created - stats["idle"]
+        stats["wait_seconds_total"] = round(stats["wait_seconds_total"], 4)
+        stats["wait_seconds_max"] = round(stats["wait_seconds_max"], 4)
+        return stats
+
+
+def get_recognizer_pool(
+    model_path: str = DEFAULT_MODEL_PATH,
+    sample_rate: int = 16000,
+    size: int = DEFAULT_POOL_SIZE
+) -> RecognizerPool:
+    """
+    Get the shared recognizer pool for a model and sample rate.
+    
+    `size` only applies when the pool is first created.
+    """
+    key = (_resolve_model_path(model_path), sample_rate)
+    with _registry_lock:
+        pool = _recognizer_pools.get(key)
+        if pool is None:
+            pool = RecognizerPool(model_path, sample_rate, size)
+            _recognizer_pools[key] = pool
+        return pool
+
+
+def recognizer_pool_stats() -> Dict[str, Dict[str, Any]]:
+    """Metrics of every recognizer pool, keyed by 'model path@sample rate'"""
+    with _registry_lock:
+        pools = list(_recognizer_pools.items())
+    return {f"{path}@{rate}": pool.stats() for (path, rate), pool in pools}
+
 
 def transcribe_audio(
     audio_file_path: str, 
-    model_path: str = "vosk-model-en-us-0.22-lgraph",
-    return_detailed: bool = False
+    model_path: str = DEFAULT_MODEL_PATH,
+    return_detailed: bool = False,
+    target_text: Optional[str] = None
 ) -> Optional[str | Dict[Any, Any]]:
     """
     Transcribe audio file to text using Vosk speech recognition.
@@ -36,6 +356,9 @@ def transcribe_audio(
         audio_file_path (str): Path to the WAV audio file
         model_path (str): Path to Vosk model directory (default: vosk-model-en-us-0.22-lgraph)
         return_detailed (bool): If True, return full JSON response; if False, return only text
+        target_text (str): Sentence the speaker is expected to say. If given, decode
+            against a grammar of its words and their confusable neighbours, falling
+            back to open decoding when the speech clearly does not match it
         
     Returns:
         str | Dict | None: Transcribed text or detailed JSON response, None if error
@@ -49,76 +372,22 @@ def transcribe_audio(
     if not os.path.exists(audio_file_path):
         raise FileNotFoundError(f"Audio file not found: {audio_file_path}")
     
-    # Get absolute path for model directory
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    full_model_path = os.path.join(script_dir, model_path)
-    
-    # Check if model directory exists
-    if not os.path.exists(full_model_path):
-        raise FileNotFoundError(f"Vosk model not found: {full_model_path}")
+    # Make sure the shared model is loaded (raises if it is missing)
+    get_model(model_path)
     
     try:
-        # Initialize Vosk model
-        vosk.SetLogLevel(-1)  # Suppress Vosk logs
-        model = vosk.Model(full_model_path)
-        
         # Open and validate WAV file
         with wave.open(audio_file_path, 'rb') as wf:
-            # Check audio format
-            if wf.getnchannels() != 1:
-                raise ValueError("Audio must be mono (1 channel)")
-            if wf.getsampwidth() != 2:
-                raise ValueError("Audio must be 16-bit")
-            if wf.getcomptype() != 'NONE':
-                raise ValueError("Audio must be uncompressed WAV")
-                
+            _check_wav_format(wf)
             sample_rate = wf.getframerate()
             
-            # Create recognizer
-            rec = vosk.KaldiRecognizer(model, sample_rate)
-            rec.SetWords(True)  # Enable word-level timestamps
-            
-            results = []
-            
-            # Process audio in chunks
-            chunk_size = 4000
-            while True:
-                data = wf.readframes(chunk_size)
-                if len(data) == 0:
-                    break
-                    
-                if rec.AcceptWaveform(data):
-                    result = json.loads(rec.Result())
-                    if result.get('text', '').strip():
-                        results.append(result)
-            
-            # Get final result
-            final_result = json.loads(rec.FinalResult())
-            if final_result.get('text', '').strip():
-                results.append(final_result)
-            
-            # Combine all results
-            if not results:
-                return "" if not return_detailed else {"text": "", "words": []}
-            
-            # Combine text from all results
-            full_text = " ".join(result.get('text', '') for result in results if result.get('text', '').strip())
-            print(full_text)
+            if target_text:
+                def wav_chunks():
+                    wf.rewind()
+                    return _iter_wav_chunks(wf)
+                return _decode_with_target(model_path, sample_rate, wav_chunks, target_text, return_detailed)
             
-            if return_detailed:
-                # Combine all word-level information
-                all_words = []
-                for result in results:
-                    if 'result' in result:
-                        all_words.extend(result['result'])
-                
-                return {
-                    "text": full_text,
-                    "words": all_words,
-                    "confidence": sum(word.get('conf', 0) for word in all_words) / len(all_words) if all_words else 0
-                }
-            else:
-                return full_text
+            return _decode_chunks(model_path, sample_rate, _iter_wav_chunks(wf), return_detailed)
                 
     except wave.Error as e:
         raise ValueError(f"Invalid WAV file format: {e}")
@@ -127,23 +396,509 @@ def transcribe_audio(
         return None
 
 
+def _check_wav_format(wf: wave.Wave_read) -> None:
+    """Check that an open WAV file is mono 16-bit uncompressed PCM"""
+    if wf.getnchannels() != 1:
+        raise ValueError("Audio must be mono (1 channel)")
+    if wf.getsampwidth() != 2:
+        raise ValueError("Audio must be 16-bit")
+    if wf.getcomptype() != 'NONE':
+        raise ValueError("Audio must be uncompressed WAV")
+
+
+def _iter_wav_chunks(wf: wave.Wave_read):
+    """Read an open WAV file in recognizer-sized chunks"""
+    while True:
+        data = wf.readframes(CHUNK_FRAMES)
+        if len(data) == 0:
+            break
+        yield data
+
+
+def transcribe_pcm(
+    buffer: Any,
+    sample_rate: int,
+    model_path: str = DEFAULT_MODEL_PATH,
+    return_detailed: bool = False,
+    target_text: Optional[str] = None
+) -> Optional[str | Dict[Any, Any]]:
+    """
+    Transcribe raw mono 16-bit PCM audio held in memory.
+    
+    The audio is fed to the recognizer chunk by chunk straight from the given
+    buffer, without writing a WAV file or joining it into one big copy.
+    
+    Args:
+        buffer: PCM data as bytes, bytearray, memoryview, a NumPy int16 array,
+            or a list of such chunks (e.g. the frames read from PyAudio)
+        sample_rate (int): Sample rate of the audio in Hz
+        model_path (str): Path to Vosk model directory (default: vosk-model-en-us-0.22-lgraph)
+        return_detailed (bool): If True, return full JSON response; if False, return only text
+        target_text (str): Expected sentence for grammar-constrained decoding (see transcribe_audio)
+        
+    Returns:
+        str | Dict | None: Transcribed text or detailed JSON response, None if error
+        
+    Raises:
+        FileNotFoundError: If model directory not found
+        ValueError: If the buffer is not mono 16-bit PCM
+    """
+    chunks = _iter_pcm_chunks(buffer)
+    
+    # Make sure the shared model is loaded (raises if it is missing)
+    get_model(model_path)
+    
+    try:
+        if target_text:
+            return _decode_with_target(
+                model_path, sample_rate, lambda: _iter_pcm_chunks(buffer), target_text, return_detailed
+            )
+        return _decode_chunks(model_path, sample_rate, chunks, return_detailed)
+    except Exception as e:
+        print(f"Error during transcription: {e}")
+        return None
+
+
+class StreamingTranscriber:
+    """
+    Decode audio while it is still being recorded.
+    
+    Chunks handed to feed() are queued and decoded by a background thread, so
+    the recorder never blocks on the recognizer. By the time recording stops
+    only the last few chunks remain, and finish() returns almost immediately.
+    
+    Usage:
+        transcriber = StreamingTranscriber(16000, on_partial=print)
+        for data in chunks:
+            transcriber.feed(data)
+        text = transcriber.finish()
+    
+    If the audio source fails before finish(), call close() so the decoder
+    thread ends and the pooled recognizer is returned.
+    """
+    
+    def __init__(
+        self,
+        sample_rate: int,
+        model_path: str = DEFAULT_MODEL_PATH,
+        on_partial: Optional[Callable[[str], None]] = None,
+        return_detailed: bool = False,
+        target_text: Optional[str] = None
+    ):
+        """
+        Args:
+            sample_rate (int): Sample rate of the fed audio in Hz
+            model_path (str): Path to Vosk model directory
+            on_partial: Called from the decoder thread with the text heard so far
+            return_detailed (bool): If True, finish() returns the detailed dict
+            target_text (str): Expected sentence for grammar-constrained decoding
+        """
+        self.sample_rate = sample_rate
+        self.on_partial = on_partial
+        self.return_detailed = return_detailed
+        
+        self.model_path = model_path
+        grammar = _target_grammar(get_model(model_path), target_text) if target_text else []
+        if grammar:
+            self._pool = None
+            self._rec = _make_recognizer(get_model(model_path), sample_rate, grammar)
+        else:
+            # Open decoding uses a warm recognizer, returned to the pool when decoding ends
+            self._pool = get_recognizer_pool(model_path, sample_rate)
+            self._rec = self._pool.acquire()
+        # Constrained decoding may need a second, open pass over the same audio
+        self._fed_chunks: Optional[List[bytes]] = [] if grammar else None
+        
+        self._queue: "queue.Queue[Optional[bytes]]" = queue.Queue()
+        self._results = []
+        self._error: Optional[Exception] = None
+        self._finished = False
+        self._aborted = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+    
+    def feed(self, data: bytes) -> None:
+        """Queue a chunk of mono 16-bit PCM for decoding (safe to call from the audio thread)"""
+        if self._finished:
+            raise RuntimeError("Cannot feed audio after finish()")
+        if self._fed_chunks is not None:
+            self._fed_chunks.append(data)
+        self._queue.put(data)
+    
+    def _run(self):
+        """Decoder thread: feed queued chunks to the recognizer until finish()"""
+        last_partial = ""
+        while True:
+            data = self._queue.get()
+            if data is None:
+                break
+            if self._error is not None or self._aborted:
+                continue  # Drain the queue after a failure or close()
+            
+            try:
+                if self._rec.AcceptWaveform(data):
+                    result = json.loads(self._rec.Result())
+                    if result.get('text', '').strip():
+                        self._results.append(result)
+                elif self.on_partial and self._queue.empty():
+                    # Only report partials when caught up, so decoding keeps pace with recording
+                    partial = json.loads(self._rec.PartialResult()).get('partial', '')
+                    heard = " ".join([r['text'] for r in self._results] + ([partial] if partial else []))
+                    if heard != last_partial:
+                        last_partial = heard
+                        self.on_partial(heard)
+            except Exception as e:
+                self._error = e
+        
+        if self._error is None and not self._aborted:
+            try:
+                final_result = json.loads(self._rec.FinalResult())
+                if final_result.get('text', '').strip():
+                    self._results.append(final_result)
+            except Exception as e:
+                self._error = e
+        
+        if self._pool is not None:
+            self._pool.release(self._rec, discard=self._error is not None)
+        self._rec = None
+    
+    def close(self) -> None:
+        """
+        Abandon decoding without a result: stop the decoder thread and return
+        the recognizer to the pool. Safe to call more than once or after finish().
+        """
+        self._aborted = True
+        if not self._finished:
+            self._finished = True
+            self._queue.put(None)
+        self._thread.join()
+    
+    @traced("stt.stream_finish")
+    def finish(self, timeout: Optional[float] = None) -> Optional[str | Dict[Any, Any]]:
+        """
+        Signal the end of the audio and wait for the final result.
+        
+        Returns:
+            str | Dict | None: Transcribed text or detailed JSON response, None if error
+        """
+        if not self._finished:
+            self._finished = True
+            self._queue.put(None)
+        self._thread.join(timeout)
+        
+        if self._thread.is_alive():
+            print("Error during transcription: decoder did not finish in time")
+            return None
+        if self._error is not None:
+            print(f"Error during transcription: {self._error}")
+            return None
+        
+        if self._fed_chunks is None:
+            return _combine_results(self._results, self.return_detailed)
+        
+        result = _combine_results(self._results, return_detailed=True, echo=False)
+        if not _is_off_target(result):
+            return _strip_unknown(result, self.return_detailed)
+        
+        print("Speech does not match the target sentence, decoding without grammar")
+        try:
+            return _decode_chunks(self.model_path, self.sample_rate, iter(self._fed_chunks), self.return_detailed)
+        except Exception as e:
+            print(f"Error during transcription: {e}")
+            return None
+
+
+def _as_pcm_view(buffer: Any) -> memoryview:
+    """Get a flat byte view over a PCM buffer without copying it"""
+    if isinstance(buffer, np.ndarray):
+        if buffer.dtype != np.int16:
+            raise ValueError("Audio must be 16-bit (int16 array)")
+        if buffer.ndim == 2 and 1 in buffer.shape:
+            buffer = buffer.reshape(-1)
+        if buffer.ndim != 1:
+            raise ValueError("Audio must be mono (1 channel)")
+        # Only copies if the array is a non-contiguous slice
+        buffer = np.ascontiguousarray(buffer)
+    
+    view = memoryview(buffer)
+    if view.format != 'B' or view.ndim != 1:
+        view = view.cast('B')
+    if len(view) % 2:
+        raise ValueError("PCM buffer must contain whole 16-bit samples")
+    return view
+
+
+def _iter_pcm_chunks(buffer: Any):
+    """Split a PCM buffer (or list of buffers) into recognizer-sized chunks"""
+    if isinstance(buffer, (list, tuple)):
+        views = [_as_pcm_view(part) for part in buffer]
+    else:
+        views = [_as_pcm_view(buffer)]
+    
+    chunk_bytes = CHUNK_FRAMES * 2
+    
+    def chunks():
+        for view in views:
+            for offset in range(0, len(view), chunk_bytes):
+                # Only one chunk is copied at a time
+                yield bytes(view[offset:offset + chunk_bytes])
+    
+    return chunks()
+
+
+@traced("stt.decode")
+def _decode_chunks(
+    model_path: str,
+    sample_rate: int,
+    chunks,
+    return_detailed: bool = False
+) -> str | Dict[Any, Any]:
+    """Run a pooled recognizer over PCM chunks and combine the results"""
+    with get_recognizer_pool(model_path, sample_rate).recognizer() as rec:
+        return _run_recognizer(rec, chunks, return_detailed)
+
+
+def _make_recognizer(model: "vosk.Model", sample_rate: int, grammar: Optional[List[str]] = None) -> "vosk.KaldiRecognizer":
+    """Create a recognizer with word timestamps, optionally restricted to a grammar"""
+    if grammar:
+        rec = vosk.KaldiRecognizer(model, sample_rate, json.dumps(grammar, ensure_ascii=False))
+    else:
+        rec = vosk.KaldiRecognizer(model, sample_rate)
+    rec.SetWords(True)  # Enable word-level timestamps
+    return rec
+
+
+def _target_grammar(model: "vosk.Model", target_text: str) -> List[str]:
+    """Grammar for the target sentence, limited to words the model knows"""
+    return build_target_grammar(
+        target_text, is_known_word=lambda word: model.vosk_model_find_word(word) != -1
+    )
+
+
+def _is_off_target(result: Dict[Any, Any]) -> bool:
+    """Decide from a constrained result whether the speaker said something else entirely"""
+    words = result.get("words", [])
+    if not words:
+        return True
+    unknown = sum(1 for word in words if word.get("word") == UNKNOWN_WORD)
+    if unknown / len(words) > MAX_UNKNOWN_RATIO:
+        return True
+    return result.get("confidence", 0) < MIN_CONSTRAINED_CONFIDENCE
+
+
+def _strip_unknown(result: Dict[Any, Any], return_detailed: bool = False) -> str | Dict[Any, Any]:
+    """Remove [unk] from a constrained result's text (word details keep it as evidence)"""
+    text = " ".join(word for word in result["text"].split() if word != UNKNOWN_WORD)
+    print(text)
+    if return_detailed:
+        return {**result, "text": text}
+    return text
+
+
+@traced("stt.decode_constrained")
+def _decode_with_target(
+    model_path: str,
+    sample_rate: int,
+    make_chunks: Callable[[], Any],
+    target_text: str,
+    return_detailed: bool = False
+) -> str | Dict[Any, Any]:
+    """Decode against the target grammar, re-decoding openly if the speech is off target"""
+    model = get_model(model_path)
+    grammar = _target_grammar(model, target_text)
+    if grammar:
+        rec = _make_recognizer(model, sample_rate, grammar)
+        result = _run_recognizer(rec, make_chunks(), return_detailed=True, echo=False)
+        if not _is_off_target(result):
+            return _strip_unknown(result, return_detailed)
+        print("Speech does not match the target sentence, decoding without grammar")
+    
+    return _decode_chunks(model_path, sample_rate, make_chunks(), return_detailed)
+
+
+def _run_recognizer(rec: "vosk.KaldiRecognizer", chunks, return_detailed: bool = False, echo: bool = True) -> str | Dict[Any, Any]:
+    """Feed PCM chunks to a recognizer and combine its results"""
+    results = []
+    
+    # Process audio in chunks
+    for data in chunks:
+        if rec.AcceptWaveform(data):
+            result = json.loads(rec.Result())
+            if result.get('text', '').strip():
+                results.append(result)
+    
+    # Get final result
+    final_result = json.loads(rec.FinalResult())
+    if final_result.get('text', '').strip():
+        results.append(final_result)
+    
+    return _combine_results(results, return_detailed, echo)
+
+
+def _combine_results(results, return_detailed: bool = False, echo: bool = True) -> str | Dict[Any, Any]:
+    """Combine the recognizer's utterance results into text or a detailed dict"""
+    if not results:
+        return "" if not return_detailed else {"text": "", "words": []}
+    
+    # Combine text from all results
+    full_text = " ".join(result.get('text', '') for result in results if result.get('text', '').strip())
+    if echo:
+        print(full_text)
+    
+    if return_detailed:
+        # Combine all word-level information
+        all_words = []
+        for result in results:
+            if 'result' in result:
+                all_words.extend(result['result'])
+        
+        return {
+            "text": full_text,
+            "words": all_words,
+            "confidence": sum(word.get('conf', 0) for word in all_words) / len(all_words) if all_words else 0
+        }
+    else:
+        return full_text
+
+
+# Model used by this batch worker process (each worker loads its own copy once)
+_worker_model_path = DEFAULT_MODEL_PATH
+
+
+def _init_batch_worker(model_path: str) -> None:
+    """Process pool initializer: load the model once per worker"""
+    global _worker_model_path
+    _worker_model_path = model_path
+    get_model(model_path)
+
+
+def _transcribe_batch_item(audio_file_path: str) -> Dict[str, Any]:
+    """Transcribe one file in a batch worker, reusing the worker's recognizer"""
+    start = time.perf_counter()
+    try:
+        with wave.open(audio_file_path, 'rb') as wf:
+            _check_wav_format(wf)
+            sample_rate = wf.getframerate()
+            duration = wf.getnframes() / sample_rate
+            
+            # One recognizer per worker, reset and reused for every file
+            pool = get_recognizer_pool(_worker_model_path, sample_rate, size=1)
+            with pool.recognizer() as rec:
+                result = _run_recognizer(rec, _iter_wav_chunks(wf), return_detailed=True, echo=False)
+        
+        return {
+            "file": audio_file_path,
+            "duration": round(duration, 3),
+            "decode_time": round(time.perf_counter() - start, 3),
+            "text": result["text"],
+            "confidence": result.get("confidence", 0),
+            "words": result["words"],
+        }
+    except (wave.Error, EOFError) as e:
+        return {"file": audio_file_path, "error": f"Invalid WAV file format: {e!r}"}
+    except Exception as e:
+        return {"file": audio_file_path, "error": str(e) or repr(e)}
+
+
+def find_audio_files(directory: str) -> List[str]:
+    """Find all WAV files under a directory, sorted by path"""
+    audio_files = []
+    for root, _, files in os.walk(directory):
+        for name in files:
+            if name.lower().endswith('.wav'):
+                audio_files.append(os.path.join(root, name))
+    return sorted(audio_files)
+
+
+def transcribe_batch(
+    directory: str,
+    model_path: str = DEFAULT_MODEL_PATH,
+    jobs: int = 1,
+    output: Optional[TextIO] = None
+) -> Dict[str, Any]:
+    """
+    Transcribe every WAV file under a directory across a process pool.
+    
+    Each worker loads the model once and keeps its own recognizer. Results are
+    written as JSON lines (one per file, in completion order) as soon as each
+    file is done.
+    
+    Args:
+        directory (str): Directory searched recursively for .wav files
+        model_path (str): Path to Vosk model directory
+        jobs (int): Number of worker processes
+        output: Text stream for JSONL results (default: stdout)
+        
+    Returns:
+        Dict: Summary with file counts, audio seconds, wall seconds and throughput
+    """
+    if not os.path.isdir(directory):
+        raise FileNotFoundError(f"Directory not found: {directory}")
+    # Fail fast in the parent instead of once per worker
+    if not os.path.exists(_resolve_model_path(model_path)):
+        raise FileNotFoundError(f"Vosk model not found: {_resolve_model_path(model_path)}")
+    
+    output = output or sys.stdout
+    audio_files = find_audio_files(directory)
+    summary = {"files": len(audio_files), "failed": 0, "audio_seconds": 0.0}
+    
+    start = time.perf_counter()
+    
+    def emit(item):
+        if "error" in item:
+            summary["failed"] += 1
+        else:
+            summary["audio_seconds"] += item["duration"]
+        output.write(json.dumps(item, ensure_ascii=False) + "\n")
+        output.flush()
+    
+    if jobs <= 1:
+        _init_batch_worker(model_path)
+        for audio_file_path in audio_files:
+            emit(_transcribe_batch_item(audio_file_path))
+    else:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_batch_worker,
+                                 initargs=(model_path,)) as executor:
+            futures = [executor.submit(_transcribe_batch_item, path) for path in audio_files]
+            for future in as_completed(futures):
+                emit(future.result())
+    
+    wall_seconds = time.perf_counter() - start
+    summary["audio_seconds"] = round(summary["audio_seconds"], 3)
+    summary["wall_seconds"] = round(wall_seconds, 3)
+    summary["throughput"] = round(summary["audio_seconds"] / wall_seconds, 2) if wall_seconds > 0 else 0.0
+    return summary
+
+
 def main():
     """Main function for standalone usage"""
     parser = argparse.ArgumentParser(description="Convert speech to text using Vosk")
-    parser.add_argument("audio_file", help="Path to WAV audio file")
-    parser.add_argument("--model", "-m", default="vosk-model-en-us-0.22-lgraph", 
+    parser.add_argument("audio_file", nargs="?", help="Path to WAV audio file")
+    parser.add_argument("--model", "-m", default=DEFAULT_MODEL_PATH, 
                        help="Path to Vosk model directory (default: vosk-model-en-us-0.22-lgraph)")
     parser.add_argument("--detailed", "-d", action="store_true", 
                        help="Return detailed JSON output with word-level info")
     parser.add_argument("--output", "-o", help="Output file path (optional)")
+    parser.add_argument("--target", "-t", metavar="TEXT",
+                       help="Expected sentence; decode against its words and confusable neighbours")
+    parser.add_argument("--batch", "-b", metavar="DIR",
+                       help="Transcribe every WAV file under DIR and write JSONL results")
+    parser.add_argument("--jobs", "-j", type=int, default=1,
+                       help="Worker processes for --batch (default: 1)")
     
     args = parser.parse_args()
     
+    if args.batch:
+        _run_batch_cli(args)
+        return
+    if not args.audio_file:
+        parser.error("audio_file is required unless --batch is given")
+    
     try:
         print(f"Transcribing: {args.audio_file}")
         print("Processing... Please wait.")
         
-        result = transcribe_audio(args.audio_file, args.model, args.detailed)
+        result = transcribe_audio(args.audio_file, args.model, args.detailed, args.target)
         
         if result is None:
             print("Transcription failed!")
@@ -176,5 +931,25 @@ def main():
         sys.exit(1)
 
 
+def _run_batch_cli(args):
+    """Run --batch mode: JSONL to --output (or stdout), summary to stderr"""
+    try:
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                summary = transcribe_batch(args.batch, args.model, args.jobs, f)
+        else:
+            summary = transcribe_batch(args.batch, args.model, args.jobs)
+    except FileNotFoundError as e:
+        print(f"File not found: {e}", file=sys.stderr)
+        sys.exit(1)
+    except KeyboardInterrupt:
+        print("\nTranscription cancelled by user.", file=sys.stderr)
+        sys.exit(1)
+    
+    print(f"Transcribed {summary['files'] - summary['failed']}/{summary['files']} files: "
+          f"{summary['audio_seconds']:.1f}s of audio in {summary['wall_seconds']:.1f}s "
+          f"({summary['throughput']:.2f} audio-seconds per wall-second)", file=sys.stderr)
+
+
 if __name__ == "__main__":
     main()
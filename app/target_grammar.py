@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Vosk grammar for the sentence the learner is expected to say
+
+Instead of decoding against the full language model, the recognizer can be
+restricted to the target words, their minimal-pair neighbours (words that
+differ by one sound from the same ipa_confusion_groups.yaml group, e.g.
+"think" -> "sink", closest-sounding first) and an [unk] token. This decodes faster and turns a
+mispronunciation into a concrete wrong word instead of an unrelated one.
+
+Usage:
+    from target_grammar import build_target_grammar
+    grammar = build_target_grammar("I think so", is_known_word=model_has_word)
+"""
+
+import os
+import re
+import sqlite3
+from typing import Callable, Dict, List, Optional
+
+import eng_to_ipa
+
+import ipa_cache
+from ipa_resources import confusable_sounds, load_arpabet_ipa_map
+from ipa_tokenizer import encode
+from phone_distance import weighted_similarity_matrix
+from similarity import pair_similarity
+
+UNKNOWN_WORD = "[unk]"
+MAX_NEIGHBOURS_PER_WORD = 8
+
+CMU_DICT_DB = os.path.join(os.path.dirname(eng_to_ipa.__file__), "resources", "CMU_dict.db")
+
+_WORD_PATTERN = re.compile(r"[a-z']+")
+
+# word -> confusion neighbours (process-wide, words never change)
+_neighbour_cache: Dict[str, List[str]] = {}
+
+
+def target_words(text: str) -> List[str]:
+    """Split a sentence into lowercase words, keeping apostrophes (don't, it's)"""
+    return _WORD_PATTERN.findall(text.lower().replace("’", "'"))
+
+
+def _confusable_arpabet() -> Dict[str, List[str]]:
+    """Map each ARPAbet phone to the ARPAbet phones it can be confused with"""
+    arpabet_to_ipa = load_arpabet_ipa_map()
+    ipa_to_arpabet = {ipa: arpabet for arpabet, ipa in arpabet_to_ipa.items()}
+    neighbours = confusable_sounds()
+
+    result = {}
+    for arpabet, ipa in arpabet_to_ipa.items():
+        others = [ipa_to_arpabet[other] for other in neighbours.get(ipa, []) if other in ipa_to_arpabet]
+        if others:
+            result[arpabet] = others
+    return result
+
+
+def _phone_variants(phonemes: str, confusable: Dict[str, List[str]]) -> List[str]:
+    """All pronunciations that differ from `phonemes` by one confusable phone"""
+    phones = phonemes.split()
+    variants = []
+    for i, phone in enumerate(phones):
+        base = phone.rstrip("012")
+        stress = phone[len(base):]
+        for other in confusable.get(base.upper(), []):
+            replaced = phones[:i] + [other.lower() + stress] + phones[i + 1:]
+            variants.append(" ".join(replaced))
+    return variants
+
+
+def _rank_neighbours(word: str, neighbours: List[str]) -> List[str]:
+    """
+    Order neighbours closest-sounding first, so truncating keeps the likely ones.
+
+    Ranked by weighted phone similarity to the word (a confusable sound
+    costs less than an unrelated one), then by spelling similarity, which
+    puts "right" before "wright" for "light"; ties stay alphabetical.
+    """
+    if not neighbours:
+        return []
+    neighbours = sorted(neighbours)
+    ipa_cache.prefetch([word] + neighbours)
+    phone_sims = weighted_similarity_matrix(
+        [encode(ipa_cache.convert(word))], [encode(ipa_cache.convert(n)) for n in neighbours]
+    )[0]
+    order = sorted(range(len(neighbours)),
+                   key=lambda k: (-phone_sims[k], -pair_similarity(word, neighbours[k])))
+    return [neighbours[k] for k in order]
+
+
+def find_confusion_neighbours(words: List[str]) -> Dict[str, List[str]]:
+    """
+    Find minimal-pair neighbours for each word using the CMU dictionary.
+
+    All uncached words are looked up with two queries in total. Each word's
+    neighbours are ranked by _rank_neighbours().
+    """
+    missing = [w for w in dict.fromkeys(words) if w not in _neighbour_cache]
+    if missing:
+        try:
+            conn = sqlite3.connect(CMU_DICT_DB)
+            try:
+                placeholders = ", ".join("?" * len(missing))
+                rows = conn.execute(
+                    f"SELECT word, phonemes FROM dictionary WHERE word IN ({placeholders})", missing
+                ).fetchall()
+
+                confusable = _confusable_arpabet()
+                variant_owner: Dict[str, List[str]] = {}
+                for word, phonemes in rows:
+                    for variant in _phone_variants(phonemes, confusable):
+                        variant_owner.setdefault(variant, []).append(word)
+
+                found: Dict[str, List[str]] = {word: [] for word in missing}
+                variants = list(variant_owner)
+                # SQLite limits the number of bound parameters per statement
+                for start in range(0, len(variants), 900):
+                    batch = variants[start:start + 900]
+                    placeholders = ", ".join("?" * len(batch))
+                    for neighbour, phonemes in conn.execute(
+                        f"SELECT word, phonemes FROM dictionary WHERE phonemes IN ({placeholders})", batch
+                    ):
+                        if not _WORD_PATTERN.fullmatch(neighbour):
+                            continue  # Skip abbreviations like "e.s"
+                        for word in variant_owner[phonemes]:
+                            if neighbour != word and neighbour not in found[word]:
+                                found[word].append(neighbour)
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            print(f"Warning: Could not look up confusion neighbours: {e}")
+            found = {word: [] for word in missing}
+
+        for word, neighbours in found.items():
+            _neighbour_cache[word] = _rank_neighbours(word, neighbours)
+
+    return {word: _neighbour_cache[word] for word in words}
+
+
+def build_target_grammar(
+    text: str,
+    is_known_word: Optional[Callable[[str], bool]] = None,
+    max_neighbours: int = MAX_NEIGHBOURS_PER_WORD
+) -> List[str]:
+    """
+    Build a Vosk grammar (list of phrases) for a target sentence.
+
+    Args:
+        text: The sentence the learner is expected to say
+        is_known_word: Returns True if the recognizer's vocabulary has a word;
+            unknown words are left out since Vosk cannot use them
+        max_neighbours: Maximum confusion neighbours added per target word
+            (the closest-sounding ones)
+
+    Returns:
+        list: Phrases for KaldiRecognizer's grammar (empty if nothing usable)
+    """
+    words = target_words(text)
+    if is_known_word:
+        words = [w for w in words if is_known_word(w)]
+    if not words:
+        return []
+
+    phrases = [" ".join(words)]
+    seen = set()
+    for word, neighbours in find_confusion_neighbours(words).items():
+        if word not in seen:
+            seen.add(word)
+            phrases.append(word)
+        added = 0
+        for neighbour in neighbours:
+            if added >= max_neighbours:
+                break
+            if neighbour in seen or (is_known_word and not is_known_word(neighbour)):
+                continue
+            seen.add(neighbour)
+            phrases.append(neighbour)
+            added += 1
+
+    phrases.append(UNKNOWN_WORD)
+    return phrases
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+Lightweight latency tracing for the record → transcribe → assess path
+
+Stages are wrapped in spans that measure wall time with a monotonic clock.
+Spans started inside another span on the same thread become its children,
+so a trace shows e.g. how much of "sentence.process" went to decoding and
+how much to IPA matching. Finished spans are kept in memory and, when an
+export file is configured, appended to it as one JSON object per line.
+Exports are buffered and written in batches (and at exit), and the file is
+rotated to <file>.1 once it reaches MAX_TRACE_BYTES.
+
+Usage:
+    from tracing import span, traced
+    with span("stt.decode", sample_rate=16000):
+        ...
+
+    @traced("assess.match")
+    def _identify_word_errors(...):
+        ...
+
+    configure("latency-trace.jsonl")
+    print(format_summary(load_trace("latency-trace.jsonl", limit=1000)))
+
+    Standalone: python tracing.py latency-trace.jsonl
+"""
+
+import atexit
+import functools
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+MAX_RECENT_SPANS = 5000
+FLUSH_SPANS = 50                    # Export after this many buffered spans...
+FLUSH_SECONDS = 5.0                 # ...or once the oldest has waited this long
+MAX_TRACE_BYTES = 5 * 1024 * 1024   # Rotate the export file beyond this size
+TAIL_BLOCK_BYTES = 64 * 1024
+
+_lock = threading.Lock()
+_write_lock = threading.Lock()
+_pending: List[str] = []
+_pending_since = 0.0
+_local = threading.local()
+_recent: "deque[Dict[str, Any]]" = deque(maxlen=MAX_RECENT_SPANS)
+_enabled = True
+_export_path: Optional[str] = None
+
+
+def configure(export_path: Optional[str] = None, enabled: bool = True) -> None:
+    """
+    Set where finished spans are exported.
+
+    Args:
+        export_path: JSONL file to append spans to (None keeps them in memory only)
+        enabled: False turns every span into a no-op
+    """
+    global _enabled, _export_path
+    flush()  # Buffered spans belong to the previous file
+    with _lock:
+        _enabled = enabled
+        _export_path = export_path
+
+
+def _stack() -> List[Dict[str, Any]]:
+    """Open spans of the current thread, innermost last"""
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """
+    Time a stage of the pipeline.
+
+    Extra keyword arguments are stored with the span; more can be added
+    inside the block through the yielded dict's "attributes".
+    """
+    if not _enabled:
+        yield {"attributes": {}}
+        return
+
+    stack = _stack()
+    parent = stack[-1] if stack else None
+    record = {
+        "trace_id": parent["trace_id"] if parent else uuid.uuid4().hex[:16],
+        "span_id": uuid.uuid4().hex[:16],
+        "parent_id": parent["span_id"] if parent else None,
+        "name": name,
+        "timestamp": time.time(),
+        "thread": threading.current_thread().name,
+        "attributes": dict(attributes),
+    }
+    stack.append(record)
+    start = time.monotonic()
+    try:
+        yield record
+    except BaseException as e:
+        record["error"] = repr(e)
+        raise
+    finally:
+        record["duration_ms"] = round((time.monotonic() - start) * 1000, 3)
+        stack.pop()
+        _finish(record)
+
+
+def traced(name: str):
+    """Decorator: run every call of the function inside span(name)"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _finish(record: Dict[str, Any]) -> None:
+    """Keep a finished span and buffer it for export if configured"""
+    global _pending_since
+    with _lock:
+        _recent.append(record)
+        if not _export_path:
+            return
+        if not _pending:
+            _pending_since = time.monotonic()
+        _pending.append(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+        due = len(_pending) >= FLUSH_SPANS or time.monotonic() - _pending_since >= FLUSH_SECONDS
+    if due:
+        flush()
+
+
+def flush() -> None:
+    """Write buffered spans to the export file, rotating it when it is full"""
+    with _write_lock:
+        with _lock:
+            lines = list(_pending)
+            _pending.clear()
+            path = _export_path
+        if not lines or not path:
+            return
+        try:
+            if os.path.exists(path) and os.path.getsize(path) >= MAX_TRACE_BYTES:
+                os.replace(path, f"{path}.1")  # Keep one previous file
+            with open(path, "a", encoding="utf-8") as f:
+                f.writelines(lines)
+        except OSError as e:
+            print(f"Warning: Could not write trace: {e}")
+
+
+def recent_spans() -> List[Dict[str, Any]]:
+    """Spans finished in this process (most recent MAX_RECENT_SPANS)"""
+    with _lock:
+        return list(_recent)
+
+
+def _tail_lines(path: str, limit: int) -> List[bytes]:
+    """Last limit lines of a file, reading blocks backwards from the end"""
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        data = b""
+        while position > 0 and data.count(b"\n") <= limit:
+            size = min(TAIL_BLOCK_BYTES, position)
+            position -= size
+            f.seek(position)
+            data = f.read(size) + data
+    lines = data.splitlines()
+    if position > 0:
+        lines = lines[1:]  # First line may be cut
+    return lines[-limit:]
+
+
+def load_trace(path: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Read spans from a JSONL trace file, skipping malformed lines.
+
+    Args:
+        path: Trace file
+        limit: Only read the most recent limit spans (None reads the whole file)
+    """
+    spans = []
+    if path == _export_path:
+        flush()
+    if not os.path.exists(path):
+        return spans
+    if limit is None:
+        with open(path, "rb") as f:
+            lines = f.readlines()
+    else:
+        lines = _tail_lines(path, limit)
+    for line in lines:
+        try:
+            spans.append(json.loads(line))
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            continue
+    return spans
+
+
+def summarize(spans: Iterable[Dict[str, Any]]) -> Dict[str, Dict[str, float]]:
+    """
+    Latency per stage.
+
+    Returns:
+        dict: name -> {"count", "p50_ms", "p95_ms", "max_ms", "errors"}
+    """
+    durations: Dict[str, List[float]] = {}
+    errors: Dict[str, int] = {}
+    for record in spans:
+        name = record.get("name")
+        if name is None or "duration_ms" not in record:
+            continue
+        durations.setdefault(name, []).append(record["duration_ms"])
+        if "error" in record:
+            errors[name] = errors.get(name, 0) + 1
+
+    summary = {}
+    for name, values in durations.items():
+        p50, p95 = np.percentile(values, [50, 95])
+        summary[name] = {
+            "count": len(values),
+            "p50_ms": round(float(p50), 1),
+            "p95_ms": round(float(p95), 1),
+            "max_ms": round(max(values), 1),
+            "errors": errors.get(name, 0),
+        }
+    return summary
+
+
+def format_summary(spans: Iterable[Dict[str, Any]], title: str = "Latency per stage") -> str:
+    """Render summarize() as a fixed-width table"""
+    summary = summarize(spans)
+    if not summary:
+        return f"{title}: no traced stages yet"
+
+    width = max(len(name) for name in summary) + 2
+    lines = [
+        title,
+        f"{'Stage':<{width}}{'Count':>7}{'p50 (ms)':>11}{'p95 (ms)':>11}{'Max (ms)':>11}",
+    ]
+    for name in sorted(summary):
+        stats = summary[name]
+        line = (f"{name:<{width}}{stats['count']:>7}{stats['p50_ms']:>11.1f}"
+                f"{stats['p95_ms']:>11.1f}{stats['max_ms']:>11.1f}")
+        if stats["errors"]:
+            line += f"  ({stats['errors']} failed)"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def main():
+    """Print the per-stage summary of a trace file"""
+    path = sys.argv[1] if len(sys.argv) > 1 else "latency-trace.jsonl"
+    if not os.path.exists(path):
+        print(f"Error: trace file not found: {path}")
+        sys.exit(1)
+    print(format_summary(load_trace(path), title=f"Latency per stage ({path})"))
+
+
+atexit.register(flush)
+
+
+if __name__ == "__main__":
+    main()
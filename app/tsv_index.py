@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+Line-offset index for random access into eng_sentences.tsv
+
+The generators pick a random line number and used to iterate the ~2M-line
+TSV from the top until they reached it. This module stores the byte
+offset of every line start once, as a compact binary file next to the TSV
+(eng_sentences.tsv.idx), and memory-maps both the index and the TSV, so
+reading line k slices its bytes straight out of the mapped file and decodes
+only that row. The mapped pages live in the OS page cache and are shared by
+every process that reads the same file.
+
+Index file layout (little-endian):
+
+    8s  magic "TSVIDX2\\0"
+    Q   size of the TSV in bytes  \\  the index is rebuilt when these
+    q   mtime of the TSV in ns    /  no longer match the TSV
+    Q   number of lines
+    Q   CRC32 of the offsets
+    Q[] byte offset of each line start
+
+Next to it, eng_sentences.tsv.idx.json records the same size, mtime, line
+count and CRC32. line_count() answers from that small file alone, so the
+line count costs nothing after the first run (or after build.py, which
+builds the index ahead of time). Opening the index only compares the
+header with the sidecar; the offsets are read and checksummed only when
+the two disagree, so a mismatched or damaged index is rebuilt without
+every start-up paying for a full pass over the offsets.
+
+Usage:
+    from tsv_index import open_index
+    index = open_index("eng_sentences.tsv")
+    index.count              # Number of lines
+    index.line(12345)        # Line 12345 (0-based) without its newline
+    index.sentence(12345)    # Its sentence column (Tatoeba: id, lang, sentence)
+    index.random_line()
+    line_count("eng_sentences.tsv")  # Cached count, without mapping anything
+
+    python tsv_index.py eng_sentences.tsv   # Build the index ahead of time
+"""
+
+import argparse
+import json
+import mmap
+import os
+import random
+import struct
+import threading
+import zlib
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from tracing import span
+
+MAGIC = b"TSVIDX2\0"
+HEADER = struct.Struct("<8sQqQQ")
+INDEX_SUFFIX = ".idx"
+META_SUFFIX = ".idx.json"
+SENTENCE_COLUMN = 2
+BUILD_CHUNK_BYTES = 16 * 1024 * 1024
+
+
+def index_path(tsv_path: str) -> str:
+    """Index file that belongs to a TSV"""
+    return tsv_path + INDEX_SUFFIX
+
+
+def meta_path(tsv_path: str) -> str:
+    """Metadata sidecar that belongs to a TSV"""
+    return tsv_path + META_SUFFIX
+
+
+def offsets_checksum(offsets: np.ndarray) -> int:
+    """CRC32 of the offsets as stored in the index file"""
+    return zlib.crc32(np.ascontiguousarray(offsets, dtype="<u8").tobytes())
+
+
+def read_meta(tsv_path: str) -> Optional[Dict[str, int]]:
+    """
+    Sidecar metadata of a TSV, if it still describes the TSV on disk.
+
+    Returns:
+        dict: size, mtime_ns, count and checksum, or None if missing or stale
+    """
+    try:
+        with open(meta_path(tsv_path), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        stat = os.stat(tsv_path)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(meta, dict) or (meta.get("size"), meta.get("mtime_ns")) != (stat.st_size, stat.st_mtime_ns):
+        return None
+    return meta
+
+
+def _write_meta(tsv_path: str, size: int, mtime_ns: int, count: int, checksum: int) -> None:
+    """Write the sidecar metadata atomically"""
+    path = meta_path(tsv_path)
+    meta = {"size": size, "mtime_ns": mtime_ns, "count": count, "checksum": checksum}
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, path)
+
+
+def build_index(tsv_path: str, path: Optional[str] = None) -> str:
+    """
+    Scan a TSV once and write its line-offset index and metadata sidecar.
+
+    Args:
+        tsv_path: Text file to index
+        path: Index file (default: tsv_path + ".idx"); the sidecar is only
+            written for the default location
+
+    Returns:
+        str: Path of the written index
+    """
+    path = path or index_path(tsv_path)
+    stat = os.stat(tsv_path)
+
+    with span("tsv_index.build", path=tsv_path):
+        # Every line starts at 0 or right after a newline (except after the final one)
+        starts: List[np.ndarray] = [np.zeros(1, dtype=np.uint64)]
+        position = 0
+        with open(tsv_path, "rb") as f:
+            while True:
+                chunk = f.read(BUILD_CHUNK_BYTES)
+                if not chunk:
+                    break
+                newlines = np.flatnonzero(np.frombuffer(chunk, dtype=np.uint8) == 0x0A)
+                starts.append((newlines + position + 1).astype(np.uint64))
+                position += len(chunk)
+        offsets = np.concatenate(starts)
+        if len(offsets) and offsets[-1] >= position:
+            offsets = offsets[:-1]  # Nothing after the final newline (or an empty file)
+
+        # Write next to the TSV and swap in atomically so readers never see half an index
+        checksum = offsets_checksum(offsets)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, stat.st_size, stat.st_mtime_ns, len(offsets), checksum))
+            f.write(offsets.astype("<u8").tobytes())
+        os.replace(tmp_path, path)
+        if path == index_path(tsv_path):
+            _write_meta(tsv_path, stat.st_size, stat.st_mtime_ns, len(offsets), checksum)
+    return path
+
+
+def line_count(tsv_path: str) -> int:
+    """
+    Number of lines of a TSV, from the metadata sidecar when it is current,
+    otherwise by (re)building the index once.
+    """
+    meta = read_meta(tsv_path)
+    if meta is not None:
+        return int(meta["count"])
+    return open_index(tsv_path).count
+
+
+class TsvIndex:
+    """Random access to the lines of a memory-mapped TSV through its offset index"""
+
+    def __init__(self, tsv_path: str):
+        """
+        Args:
+            tsv_path: Indexed TSV; the index is built or rebuilt if missing or stale
+        """
+        self.tsv_path = tsv_path
+        self.path = index_path(tsv_path)
+        self._lock = threading.Lock()
+        self._view = (b"", np.zeros(0, dtype="<u8"))   # (mapped TSV, offsets), swapped together on refresh
+        self.offsets = self._view[1]
+        self._open()
+
+    def _read_header(self):
+        """(size, mtime_ns, count, checksum) from the index file, or None if unusable"""
+        try:
+            with open(self.path, "rb") as f:
+                magic, size, mtime_ns, count, checksum = HEADER.unpack(f.read(HEADER.size))
+        except (OSError, struct.error):
+            return None
+        if magic != MAGIC or os.path.getsize(self.path) != HEADER.size + 8 * count:
+            return None
+        return size, mtime_ns, count, checksum
+
+    def _open(self) -> None:
+        """
+        Map the index, rebuilding it first if it does not match the TSV
+        (lock must be held, or the index not yet shared).
+        """
+        # Unmap first: Windows refuses to replace or resize a file that is still mapped
+        self._release()
+        stat = os.stat(self.tsv_path)
+        header = self._read_header()
+        if header is None or header[:2] != (stat.st_size, stat.st_mtime_ns):
+            build_index(self.tsv_path, self.path)
+            header = self._read_header()
+
+        self.size, self.mtime_ns, self.count, checksum = header
+        offsets = self._map_offsets()
+        # Header and sidecar written by the same build vouch for each other; otherwise
+        # (older, damaged or copied index) the offsets are checked and rebuilt if wrong
+        meta = read_meta(self.tsv_path)
+        if meta is None or (meta.get("count"), meta.get("checksum")) != (self.count, checksum):
+            if meta is None or meta.get("count") != self.count or meta.get("checksum") != offsets_checksum(offsets):
+                del offsets
+                build_index(self.tsv_path, self.path)
+                self.size, self.mtime_ns, self.count, _ = self._read_header()
+                offsets = self._map_offsets()
+        data = b""
+        if stat.st_size:
+            with open(self.tsv_path, "rb") as f:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.offsets = offsets
+        self._view = (data, offsets)
+
+    def _release(self) -> None:
+        """
+        Drop the maps of the TSV and the index (lock must be held).
+
+        np.memmap cannot be closed while its array exists, so the index is
+        unmapped by dropping the last reference; line() only touches the
+        view under the lock, so none is left behind.
+        """
+        data = self._view[0]
+        self._view = (b"", np.zeros(0, dtype="<u8"))
+        self.offsets = self._view[1]
+        if isinstance(data, mmap.mmap):
+            data.close()
+
+    def _map_offsets(self) -> np.ndarray:
+        """Memory-map the offsets stored after the header"""
+        if not self.count:
+            return np.zeros(0, dtype="<u8")
+        return np.memmap(self.path, dtype="<u8", mode="r", offset=HEADER.size, shape=(self.count,))
+
+    def is_stale(self) -> bool:
+        """True if the TSV changed since the index was built"""
+        try:
+            stat = os.stat(self.tsv_path)
+        except OSError:
+            return True
+        return (stat.st_size, stat.st_mtime_ns) != (self.size, self.mtime_ns)
+
+    def refresh(self) -> None:
+        """Rebuild and remap the index if the TSV changed"""
+        with self._lock:
+            if self.is_stale():
+                self._open()
+
+    def line(self, number: int) -> str:
+        """
+        One line of the TSV, decoded, without its line ending.
+
+        Args:
+            number: 0-based line number (below count)
+        """
+        with self._lock:
+            data, offsets = self._view
+            start = int(offsets[number])
+            end = int(offsets[number + 1]) if number + 1 < len(offsets) else len(data)
+            raw = data[start:end]
+        return raw.decode("utf-8", errors="ignore").rstrip("\r\n")
+
+    def sentence(self, number: int) -> str:
+        """
+        Sentence column of one line (empty if the line has none).
+
+        Args:
+            number: 0-based line number (below count)
+        """
+        columns = self.line(number).split("\t")
+        return columns[SENTENCE_COLUMN].strip() if len(columns) > SENTENCE_COLUMN else ""
+
+    def random_line(self) -> str:
+        """A uniformly random line"""
+        return self.line(random.randrange(self.count))
+
+    def random_sentence(self) -> str:
+        """Sentence column of a uniformly random line"""
+        return self.sentence(random.randrange(self.count))
+
+    def close(self) -> None:
+        with self._lock:
+            self._release()
+
+
+_indexes: Dict[str, TsvIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def open_index(tsv_path: str) -> TsvIndex:
+    """
+    Shared index for a TSV (one per path and process), rebuilt when the TSV
+    size or mtime changes.
+    """
+    path = os.path.abspath(tsv_path)
+    with _indexes_lock:
+        index = _indexes.get(path)
+        if index is None:
+            index = TsvIndex(path)
+            _indexes[path] = index
+        else:
+            index.refresh()
+        return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the line-offset index of a TSV")
+    parser.add_argument("tsv", nargs="?", default="eng_sentences.tsv", help="TSV file to index")
+    args = parser.parse_args()
+
+    index = open_index(args.tsv)
+    print(f"{index.count} lines indexed in {index.path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,46 +1,44 @@
 #!/usr/bin/env python3
 """
-Công cụ phân tích và đánh giá dữ liệu phát âm từ user-data.yaml
+Công cụ phân tích và đánh giá dữ liệu phát âm từ nhật ký kết quả (user-data.jsonl)
 """
 
-import yaml
+import os
 import sys
 from collections import Counter, defaultdict
 import argparse
 
+from results_store import open_store, results_path
 
-def analyze_pronunciation_data(yaml_file_path="user-data.yaml", keep_only_last_20=True):
+
+def analyze_pronunciation_data(yaml_file_path="user-data.jsonl", keep_only_last_20=True):
     """
-    Phân tích dữ liệu phát âm từ file YAML và đưa ra đánh giá, lời khuyên.
+    Phân tích dữ liệu phát âm từ nhật ký kết quả và đưa ra đánh giá, lời khuyên.
     
     Args:
-        yaml_file_path (str): Đường dẫn đến file user-data.yaml
+        yaml_file_path (str): Đường dẫn đến user-data.jsonl (đường dẫn user-data.yaml
+            cũ cũng được, dữ liệu sẽ được nhập sang file .jsonl cạnh nó)
         keep_only_last_20 (bool): Có xóa các node thừa, chỉ giữ 20 node cuối không
         
     Returns:
         str: Kết quả phân tích dạng chuỗi nhiều dòng
     """
     
-    try:
-        with open(yaml_file_path, 'r', encoding='utf-8') as file:
-            data = yaml.safe_load(file)
-    except FileNotFoundError:
-        return f"Lỗi: Không tìm thấy file {yaml_file_path}"
-    except yaml.YAMLError as e:
-        return f"Lỗi đọc file YAML: {e}"
+    store = open_store(yaml_file_path)
+    if not os.path.exists(store.path):
+        return f"Lỗi: Không tìm thấy file {results_path(yaml_file_path)}"
     
+    data = store.entries()
     if not data or len(data) < 20:
         return "Chưa đủ dữ liệu để đánh giá :("
     
     # Lấy 20 câu cuối cùng
     last_20_sentences = data[-20:]
     
-    # Xóa các node thừa nếu được yêu cầu
+    # Xóa các node thừa nếu được yêu cầu (ghi lại nhật ký chỉ với 20 câu cuối)
     if keep_only_last_20 and len(data) > 20:
         try:
-            with open(yaml_file_path, 'w', encoding='utf-8') as file:
-                yaml.dump(last_20_sentences, file, default_flow_style=False, 
-                         allow_unicode=True, sort_keys=False)
+            store.compact(keep_last=20)
         except Exception as e:
             return f"Lỗi khi ghi file: {e}"
     
@@ -100,9 +98,9 @@ def analyze_pronunciation_data(yaml_file_path="user-data.yaml", keep_only_last_2
 
 def main():
     """Hàm main để chạy script từ command line"""
-    parser = argparse.ArgumentParser(description='Phân tích dữ liệu phát âm từ user-data.yaml')
-    parser.add_argument('--file', '-f', default='user-data.yaml', 
-                       help='Đường dẫn đến file YAML (mặc định: user-data.yaml)')
+    parser = argparse.ArgumentParser(description='Phân tích dữ liệu phát âm từ user-data.jsonl')
+    parser.add_argument('--file', '-f', default='user-data.jsonl', 
+                       help='Đường dẫn đến nhật ký kết quả (mặc định: user-data.jsonl)')
     parser.add_argument('--no-delete', action='store_true',
                        help='Không xóa các node cũ, chỉ phân tích')
     
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Voice Activity Detection (VAD) for recorded speech
+
+Detects where the learner actually speaks in a recording using short-time
+energy and zero-crossing rate, computed for all frames of a chunk at once
+with NumPy. Used by the recorder to skip leading silence and to stop
+recording once the learner has finished speaking.
+
+Usage:
+    Streaming:
+        vad = VoiceActivityDetector(16000, hangover_ms=800)
+        for data in chunks:
+            vad.process(data)
+            if vad.speech_ended:
+                break
+        print(vad.span)
+
+    Offline:
+        span = detect_speech_span(samples, 16000)
+"""
+
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+@dataclass
+class SpeechSpan:
+    """Span of detected speech, in samples"""
+    start_sample: int
+    end_sample: int
+    sample_rate: int
+
+    @property
+    def start(self) -> float:
+        """Start time in seconds"""
+        return self.start_sample / self.sample_rate
+
+    @property
+    def end(self) -> float:
+        """End time in seconds"""
+        return self.end_sample / self.sample_rate
+
+    @property
+    def duration(self) -> float:
+        """Duration in seconds"""
+        return (self.end_sample - self.start_sample) / self.sample_rate
+
+
+def frame_features(samples: np.ndarray, frame_length: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Compute energy (dBFS) and zero-crossing rate for every full frame.
+
+    Args:
+        samples: 1-D int16 array
+        frame_length: Samples per frame
+
+    Returns:
+        tuple: (energy_db, zcr) arrays with one value per frame
+    """
+    num_frames = len(samples) // frame_length
+    if num_frames == 0:
+        return np.empty(0, dtype=np.float32), np.empty(0, dtype=np.float32)
+
+    frames = samples[:num_frames * frame_length].reshape(num_frames, frame_length).astype(np.float32)
+
+    rms = np.sqrt(np.mean(frames * frames, axis=1))
+    energy_db = 20.0 * np.log10(rms / 32768.0 + 1e-10)
+
+    signs = np.signbit(frames)
+    zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (frame_length - 1)
+
+    return energy_db, zcr.astype(np.float32)
+
+
+class VoiceActivityDetector:
+    """
+    Streaming energy / zero-crossing VAD with an end-of-speech hangover.
+
+    A frame counts as speech when its energy is clearly above the tracked
+    noise floor, or when it is only slightly above it but has a high
+    zero-crossing rate (unvoiced sounds such as /s/, /f/, /θ/).
+    """
+
+    def __init__(
+        self,
+        sample_rate: int,
+        frame_ms: int = 30,
+        hangover_ms: int = 800,
+        min_speech_ms: int = 90,
+        margin_db: float = 12.0,
+        min_threshold_db: float = -50.0,
+        zcr_threshold: float = 0.25
+    ):
+        """
+        Args:
+            sample_rate: Sample rate of the audio in Hz
+            frame_ms: Analysis frame length in milliseconds
+            hangover_ms: Silence after speech before speech is considered ended
+            min_speech_ms: Consecutive speech needed to start a span (ignores clicks)
+            margin_db: How far above the noise floor speech must be
+            min_threshold_db: Lowest energy (dBFS) ever considered speech
+            zcr_threshold: Zero-crossing rate above which quiet frames count as fricatives
+        """
+        self.sample_rate = sample_rate
+        self.frame_length = max(1, int(sample_rate * frame_ms / 1000))
+        self.hangover_frames = max(1, int(round(hangover_ms / frame_ms)))
+        self.min_speech_frames = max(1, int(round(min_speech_ms / frame_ms)))
+        self.margin_db = margin_db
+        self.min_threshold_db = min_threshold_db
+        self.zcr_threshold = zcr_threshold
+        self.reset()
+
+    def reset(self):
+        """Forget all state and start a new recording"""
+        self._pending = np.empty(0, dtype=np.int16)
+        self._frame_index = 0
+        # Start from the quietest speech level rather than the first frame,
+        # so a recording that opens with speech does not take it as noise
+        self._noise_db = self.min_threshold_db
+        self._run_start = -1
+        self._run_length = 0
+        self._silence_frames = 0
+        self._start_frame = -1
+        self._end_frame = -1
+        self.speech_started = False
+        self.speech_ended = False
+
+    def process(self, data) -> bool:
+        """
+        Analyse the next chunk of mono 16-bit PCM.
+
+        Args:
+            data: bytes or int16 array
+
+        Returns:
+            bool: True once the end of speech has been detected
+        """
+        samples = np.frombuffer(data, dtype=np.int16) if not isinstance(data, np.ndarray) else data
+        if len(self._pending):
+            samples = np.concatenate((self._pending, samples))
+
+        energy_db, zcr = frame_features(samples, self.frame_length)
+        self._pending = samples[len(energy_db) * self.frame_length:].copy()
+
+        for energy, rate in zip(energy_db.tolist(), zcr.tolist()):
+            self._update(energy, rate)
+            self._frame_index += 1
+
+        return self.speech_ended
+
+    def _update(self, energy: float, rate: float):
+        """Advance the state machine by one frame"""
+        threshold = max(self.min_threshold_db, self._noise_db + self.margin_db)
+        is_speech = energy >= threshold or (
+            energy >= threshold - self.margin_db / 2 and rate >= self.zcr_threshold
+        )
+
+        if is_speech:
+            if self._run_length == 0:
+                self._run_start = self._frame_index
+            self._run_length += 1
+            self._silence_frames = 0
+
+            if not self.speech_started and self._run_length >= self.min_speech_frames:
+                self.speech_started = True
+                self._start_frame = self._run_start
+            if self.speech_started and not self.speech_ended:
+                self._end_frame = self._frame_index
+        else:
+            self._run_length = 0
+            self._silence_frames += 1
+
+            # Track the noise floor only from non-speech frames
+            if energy < self._noise_db:
+                self._noise_db = energy
+            else:
+                self._noise_db = 0.9 * self._noise_db + 0.1 * energy
+
+            if self.speech_started and self._silence_frames >= self.hangover_frames:
+                self.speech_ended = True
+
+    @property
+    def span(self) -> Optional[SpeechSpan]:
+        """Detected speech span so far, or None if no speech was found"""
+        if not self.speech_started:
+            return None
+        return SpeechSpan(
+            start_sample=self._start_frame * self.frame_length,
+            end_sample=(self._end_frame + 1) * self.frame_length,
+            sample_rate=self.sample_rate
+        )
+
+
+def detect_speech_span(samples: np.ndarray, sample_rate: int, **kwargs) -> Optional[SpeechSpan]:
+    """
+    Find the speech span in a complete recording.
+
+    Args:
+        samples: 1-D int16 array
+        sample_rate: Sample rate in Hz
+        **kwargs: Passed to VoiceActivityDetector
+
+    Returns:
+        SpeechSpan | None: Span of speech, None if no speech was found
+    """
+    vad = VoiceActivityDetector(sample_rate, **kwargs)
+    vad.process(samples)
+    return vad.span
+
+
+def speech_chunk_range(
+    span: Optional[SpeechSpan],
+    chunk_size: int,
+    num_chunks: int,
+    padding_ms: int = 200
+) -> Tuple[int, int]:
+    """
+    Convert a speech span into a range of fixed-size recording chunks.
+
+    A little padding is kept around the speech so word onsets and endings are
+    not clipped. Without a span the whole recording is returned, so the
+    decoder still gets a chance when the VAD misses quiet speech.
+
+    Returns:
+        tuple: (first_chunk, end_chunk) suitable for frames[first:end]
+    """
+    if span is None:
+        return 0, num_chunks
+
+    padding = int(span.sample_rate * padding_ms / 1000)
+    first = max(0, (span.start_sample - padding) // chunk_size)
+    end = min(num_chunks, -(-(span.end_sample + padding) // chunk_size))
+    return first, end
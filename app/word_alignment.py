@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Order-aware alignment of expected words with recognized words
+
+A Needleman–Wunsch style dynamic program over the word similarity matrix.
+Words can be matched one-to-one, skipped on either side (missing or extra
+words), split (one expected word heard as 2–3 words, "today" → "to day") or
+merged (two expected words heard as one, "a lot" → "alot"). Every cell is
+filled once, so the alignment costs O(n·m) and never pairs words out of
+order.
+
+Split and merge candidates are found before the table is filled. Their
+similarity can only be as high as the characters they share allow, which
+NumPy bounds for all candidates at once from per-word character counts;
+only the few that can reach their threshold are compared exactly, once.
+
+Usage:
+    matches = align_words(original_words, spoken_words, similarity_matrix, text_similarity)
+    # [(original_index, spoken_start_index, score), ...] sorted by original_index
+"""
+
+from itertools import accumulate, chain
+from typing import Callable, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+MATCH_THRESHOLD = 0.4   # Lowest similarity accepted as a one-to-one match
+SPLIT_THRESHOLD = 0.6   # Lowest text similarity for split words
+MERGE_THRESHOLD = 0.8   # Lowest text similarity for merged words (short words merge too easily)
+MAX_SPLIT_WORDS = 3     # One expected word may be heard as up to this many words
+SPLIT_PENALTY = 0.2     # Split / merged matches must beat one-to-one matches by this much
+
+# Back-pointer operations
+_START, _MATCH, _MISSING, _EXTRA, _SPLIT, _MERGE = range(6)
+_SKIP = (_START, 0, 0.0)  # Cell without a back-pointer: skipped a word, direction from the scores
+
+
+def _character_counts(words: Sequence[str], alphabet: Dict[str, int]) -> np.ndarray:
+    """How often each character of the alphabet occurs in each word"""
+    size = len(alphabet)
+    cells = [row * size + alphabet[char] for row, word in enumerate(words) for char in word]
+    return np.bincount(np.array(cells, dtype=np.int64), minlength=len(words) * size).reshape(len(words), size)
+
+
+def _reachable(counts_a: np.ndarray, counts_b: np.ndarray, threshold: float) -> np.ndarray:
+    """
+    Pairs whose similarity can reach the threshold.
+
+    Two strings have at most sum(min(count_a, count_b)) characters in common,
+    so 2·that / (len_a + len_b) bounds difflib's ratio() and the LCS
+    similarity alike.
+    """
+    common = np.minimum(counts_a[:, None, :], counts_b[None, :, :]).sum(axis=2)
+    totals = counts_a.sum(axis=1)[:, None] + counts_b.sum(axis=1)[None, :]
+    return 2 * common >= threshold * totals - 1e-9
+
+
+def _find_candidates(
+    original_words: Sequence[str],
+    spoken_words: Sequence[str],
+    text_similarity: Callable[[str, str], float],
+    split_threshold: float,
+    merge_threshold: float
+) -> Tuple[Dict[int, Dict[int, List[Tuple[int, float]]]], Dict[int, Dict[int, float]]]:
+    """
+    Split and merge candidates that reach their threshold.
+
+    Returns:
+        tuple: (splits, merges) where splits[i][j] lists (width, similarity)
+            for original word i heard as spoken words j-width+1..j, by width,
+            and merges[i][j] is the similarity of original words i-1 and i
+            heard as spoken word j
+    """
+    # Case is ignored so the bound also holds for similarities that lowercase
+    original_lower = [word.lower() for word in original_words]
+    spoken_lower = [word.lower() for word in spoken_words]
+    alphabet: Dict[str, int] = {}
+    for char in chain.from_iterable(original_lower + spoken_lower):
+        alphabet.setdefault(char, len(alphabet))
+    original_counts = _character_counts(original_lower, alphabet)
+    spoken_counts = _character_counts(spoken_lower, alphabet)
+
+    splits: Dict[int, Dict[int, List[Tuple[int, float]]]] = {}
+    widths = range(2, min(MAX_SPLIT_WORDS, len(spoken_words)) + 1)
+    if widths:
+        # Every run of 2..MAX_SPLIT_WORDS spoken words, as (width, last word) in the order of the rows
+        running = np.vstack((np.zeros((1, len(alphabet)), dtype=np.int64), np.cumsum(spoken_counts, axis=0)))
+        joined_counts = np.vstack([running[width:] - running[:-width] for width in widths])
+        runs = [(width, j) for width in widths for j in range(width - 1, len(spoken_words))]
+        for i, k in zip(*np.nonzero(_reachable(original_counts, joined_counts, split_threshold))):
+            width, j = runs[k]
+            split_sim = text_similarity(original_words[i], "".join(spoken_words[j - width + 1:j + 1]))
+            if split_sim >= split_threshold:
+                splits.setdefault(int(i), {}).setdefault(j, []).append((width, split_sim))
+
+    merges: Dict[int, Dict[int, float]] = {}
+    if len(original_words) >= 2:
+        pair_counts = original_counts[:-1] + original_counts[1:]  # Row r: original words r and r+1
+        for r, j in zip(*np.nonzero(_reachable(pair_counts, spoken_counts, merge_threshold))):
+            joined = original_words[r] + original_words[r + 1]
+            merge_sim = text_similarity(joined, spoken_words[j])
+            if merge_sim >= merge_threshold:
+                merges.setdefault(int(r) + 1, {})[int(j)] = merge_sim
+    return splits, merges
+
+
+def align_words(
+    original_words: Sequence[str],
+    spoken_words: Sequence[str],
+    similarity: Sequence[Sequence[float]],
+    text_similarity: Callable[[str, str], float],
+    match_threshold: float = MATCH_THRESHOLD,
+    split_threshold: float = SPLIT_THRESHOLD,
+    merge_threshold: float = MERGE_THRESHOLD
+) -> List[Tuple[int, int, float]]:
+    """
+    Find the highest-scoring monotonic alignment.
+
+    Args:
+        original_words: Expected words
+        spoken_words: Recognized words
+        similarity: similarity[i][j] between original word i and spoken word j
+        text_similarity: Similarity of two spellings, used for split / merged words
+        match_threshold: Minimum similarity of a one-to-one match
+        split_threshold: Minimum similarity of a split match
+        merge_threshold: Minimum similarity of a merged match
+
+    Returns:
+        list: (original_index, spoken_start_index, score) for every matched
+            original word, in order. Split words point at their first spoken
+            word; both words of a merge point at the same spoken word.
+    """
+    n, m = len(original_words), len(spoken_words)
+    splits, merges = _find_candidates(original_words, spoken_words, text_similarity,
+                                      split_threshold, merge_threshold)
+
+    # score[i][j]: best total for the first i original and first j spoken words.
+    # Back-pointers are only kept for cells that can take a match, split or
+    # merge; every other cell just skips a word and is rebuilt on the way back
+    score = [[0.0] * (m + 1) for _ in range(n + 1)]
+    back: Dict[Tuple[int, int], Tuple[int, int, float]] = {}
+
+    for i in range(1, n + 1):
+        row = score[i]
+        previous_row = score[i - 1]
+        sim_row = similarity[i - 1]
+        row_splits = splits.get(i - 1, {})
+        row_merges = merges.get(i - 1, {})
+        candidates = {j + 1 for j, sim in enumerate(sim_row) if sim >= match_threshold}
+        candidates.update(j + 1 for j in row_splits)
+        candidates.update(j + 1 for j in row_merges)
+
+        filled = 0
+        for j in sorted(candidates):
+            # Skip-only cells before this one: the better of the cell above and the one to the left
+            if j > filled + 1:
+                row[filled:j] = accumulate(previous_row[filled + 1:j], max, initial=row[filled])
+
+            # Skipping a word costs nothing, so any acceptable match is preferred
+            best, step = previous_row[j], (_MISSING, 1, 0.0)
+            if row[j - 1] > best:
+                best, step = row[j - 1], (_EXTRA, 1, 0.0)
+
+            sim = sim_row[j - 1]
+            if sim >= match_threshold and previous_row[j - 1] + sim >= best:
+                best, step = previous_row[j - 1] + sim, (_MATCH, 1, sim)
+
+            # One expected word heard as several words
+            for width, split_sim in row_splits.get(j - 1, ()):
+                total = previous_row[j - width] + split_sim - SPLIT_PENALTY
+                if total > best:
+                    best, step = total, (_SPLIT, width, split_sim)
+
+            # Two expected words heard as one (counts for both words)
+            merge_sim = row_merges.get(j - 1)
+            if merge_sim is not None:
+                total = score[i - 2][j - 1] + 2 * merge_sim - SPLIT_PENALTY
+                if total > best:
+                    best, step = total, (_MERGE, 1, merge_sim)
+
+            row[j] = best
+            back[(i, j)] = step
+            filled = j
+        if filled < m:
+            row[filled:] = accumulate(previous_row[filled + 1:], max, initial=row[filled])
+
+    # Trace the best path back from the end
+    matches = []
+    i, j = n, m
+    while i > 0 or j > 0:
+        op, width, value = back.get((i, j), _SKIP)
+        if op == _MATCH:
+            matches.append((i - 1, j - 1, value))
+            i, j = i - 1, j - 1
+        elif op == _SPLIT:
+            matches.append((i - 1, j - width, value))
+            i, j = i - 1, j - width
+        elif op == _MERGE:
+            matches.append((i - 1, j - 1, value))
+            matches.append((i - 2, j - 1, value))
+            i, j = i - 2, j - 1
+        elif op == _MISSING or (op == _START and (j == 0 or (i > 0 and score[i - 1][j] >= score[i][j - 1]))):
+            i -= 1  # Ties go to the cell above, as in the fill
+        else:
+            j -= 1
+
+    matches.reverse()
+    return matches
@@ -14,6 +14,7 @@ import zipfile
 import bz2
 import shutil
 import sqlite3
+import re
 from pathlib import Path
 
 # Configuration
@@ -141,16 +142,21 @@ def tsv_to_sqlite(tsv_path, db_path):
     """Convert TSV file to SQLite database"""
     print_step("Converting TSV to SQLite database")
     try:
-        # Create database
+        # Start from an empty database (the table layout may differ from an older build)
+        if os.path.exists(db_path):
+            os.remove(db_path)
         conn = sqlite3.connect(db_path)
         cursor = conn.cursor()
         
-        # Create table
+        # Create table; length, word count and digits are precomputed for level filtering
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS sentences (
                 id INTEGER PRIMARY KEY,
                 lang TEXT,
-                sentence TEXT
+                sentence TEXT,
+                char_len INTEGER,
+                word_count INTEGER,
+                has_digit INTEGER
             )
         ''')
         
@@ -166,9 +172,11 @@ def tsv_to_sqlite(tsv_path, db_path):
             for line in lines[i:i+batch_size]:
                 parts = line.strip().split('\t')
                 if len(parts) >= 3:
-                    batch.append((int(parts[0]), parts[1], parts[2]))
+                    sentence = parts[2]
+                    batch.append((int(parts[0]), parts[1], sentence, len(sentence),
+                                  len(sentence.split()), int(bool(re.search(r'\d', sentence)))))
             
-            cursor.executemany('INSERT OR REPLACE INTO sentences VALUES (?, ?, ?)', batch)
+            cursor.executemany('INSERT OR REPLACE INTO sentences VALUES (?, ?, ?, ?, ?, ?)', batch)
             percent = min(100, int((i + batch_size) * 100 / len(lines)))
             sys.stdout.write(f"\r   Progress: {percent}% ")
             sys.stdout.flush()
@@ -176,9 +184,9 @@ def tsv_to_sqlite(tsv_path, db_path):
         print()  # New line
         conn.commit()
         
-        # Create index for faster queries
+        # Create index for faster queries (its lang prefix also serves plain lang lookups)
         print("🔍 Creating index...")
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_lang ON sentences(lang)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_lang_digit_len ON sentences(lang, has_digit, char_len)')
         conn.commit()
         
         conn.close()
@@ -217,8 +225,19 @@ def check_resources():
     else:
         print_success(f"Sentences file found: {SENTENCES_FILE}")
     
+    index_sentences()
     return True
 
+def index_sentences():
+    """Build the TSV line-offset index and line count ahead of the first run"""
+    print("📑 Indexing sentences file...")
+    try:
+        subprocess.run([sys.executable, "tsv_index.py", SENTENCES_FILE], check=True)
+        print_success(f"Indexed: {SENTENCES_FILE}")
+    except Exception as e:
+        # Not fatal: the app builds the index itself on first use
+        print_warning(f"Failed to index {SENTENCES_FILE}: {e}")
+
 def get_vosk_lib_path():
     """Get platform-specific Vosk library path"""
     system = platform.system()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The app modules import each other as top-level modules (they run from app/)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app"))
@@ -0,0 +1,63 @@
+import threading
+import time
+
+import pytest
+
+import speech_to_text
+from speech_to_text import RecognizerPool, RecognizerPoolTimeout
+
+
+class FakeRecognizer:
+    def Reset(self):
+        pass
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setattr(speech_to_text, "get_model", lambda path: None)
+    monkeypatch.setattr(speech_to_text, "_make_recognizer", lambda model, rate: FakeRecognizer())
+    return RecognizerPool("model", 16000, size=1)
+
+
+def test_discard_wakes_a_waiting_acquire(pool):
+    held = pool.acquire()
+    result = {}
+
+    def waiter():
+        start = time.monotonic()
+        result["rec"] = pool.acquire(timeout=3.0)
+        result["seconds"] = time.monotonic() - start
+
+    thread = threading.Thread(target=waiter)
+    thread.start()
+    time.sleep(0.1)  # Let the waiter block on the full pool
+    pool.release(held, discard=True)
+    thread.join(timeout=5.0)
+
+    assert isinstance(result.get("rec"), FakeRecognizer)
+    assert result["rec"] is not held
+    assert result["seconds"] < 1.0
+    stats = pool.stats()
+    assert stats["discarded"] == 1
+    assert stats["created"] == 2
+    assert stats["in_use"] == 1
+
+
+def test_release_hands_the_recognizer_to_a_waiter(pool):
+    held = pool.acquire()
+    result = {}
+    thread = threading.Thread(target=lambda: result.update(rec=pool.acquire(timeout=3.0)))
+    thread.start()
+    time.sleep(0.1)
+    pool.release(held)
+    thread.join(timeout=5.0)
+
+    assert result.get("rec") is held
+    assert pool.stats()["waits"] == 1
+
+
+def test_full_pool_times_out(pool):
+    pool.acquire()
+    with pytest.raises(RecognizerPoolTimeout):
+        pool.acquire(timeout=0.05)
+    assert pool.stats()["timeouts"] == 1
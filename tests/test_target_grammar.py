@@ -0,0 +1,15 @@
+from target_grammar import _rank_neighbours, build_target_grammar
+
+
+def test_closer_sounding_neighbours_come_first():
+    # /aɪ/ → /ɔɪ/ is one confusable vowel, /aɪ/ → /oʊ/ shares no sound
+    assert _rank_neighbours("i", ["ow", "oi"]) == ["oi", "ow"]
+
+
+def test_spelling_breaks_phone_ties():
+    assert _rank_neighbours("light", ["wright", "lout", "right"]) == ["right", "wright", "lout"]
+
+
+def test_grammar_keeps_the_closest_neighbours():
+    grammar = build_target_grammar("I", max_neighbours=1)
+    assert grammar == ["i", "i", "oi", "[unk]"]
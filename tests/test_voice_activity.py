@@ -0,0 +1,33 @@
+import numpy as np
+
+from voice_activity import detect_speech_span
+
+RATE = 16000
+
+
+def tone(seconds, amplitude):
+    t = np.arange(int(RATE * seconds)) / RATE
+    return (amplitude * np.sin(2 * np.pi * 220 * t)).astype(np.int16)
+
+
+def noise(seconds, amplitude=30):
+    rng = np.random.default_rng(0)
+    return rng.normal(0, amplitude, int(RATE * seconds)).astype(np.int16)
+
+
+def test_speech_after_silence():
+    span = detect_speech_span(np.concatenate((noise(0.5), tone(0.6, 8000), noise(0.5))), RATE)
+    assert span is not None
+    assert abs(span.start - 0.5) < 0.05
+    assert abs(span.end - 1.1) < 0.05
+
+
+def test_clip_that_starts_with_speech():
+    span = detect_speech_span(np.concatenate((tone(0.6, 8000), noise(0.5), noise(0.5))), RATE)
+    assert span is not None
+    assert span.start_sample == 0
+    assert abs(span.end - 0.6) < 0.05
+
+
+def test_silence_has_no_span():
+    assert detect_speech_span(noise(1.0), RATE) is None